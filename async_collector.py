@@ -0,0 +1,324 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import json_codec
+from frame_router import CHANNEL_WEBDATA2, classify
+
+logger = logging.getLogger(__name__)
+
+# Streaming reconnect backoff (seconds)
+STREAM_BACKOFF_MIN = 1
+STREAM_BACKOFF_MAX = 60
+
+# Callback signatures
+ConnectFn = Callable[[], Awaitable[Any]]                      # -> open WebSocket
+SnapshotHandler = Callable[[str, str], Awaitable[bool]]       # (wallet, raw msg) -> success
+ResultHandler = Callable[[str, bool], Awaitable[None]]        # (wallet, success)
+ErrorHandler = Callable[[str, Exception], Awaitable[None]]    # (reason, error)
+
+
+def frame_user(msg: str) -> Optional[str]:
+    """
+    `data.user` of a webData2 frame, normally without decoding the frame.
+
+    Only the values of its "user" keys are decoded (json_codec.field_values).
+    Nested objects may carry a "user" too (e.g. TWAP states, which name the
+    same owner); if the values do not all name one address, the frame is
+    decoded in full to read `data.user` itself.
+
+    Raises:
+        json_codec.DecodeError: The frame is not valid JSON.
+    """
+    values = json_codec.field_values(msg, "user")
+    if not values:
+        return None
+    if all(isinstance(v, str) for v in values) and len({v.lower() for v in values}) == 1:
+        return values[0]
+    data = json_codec.loads(msg).get("data")
+    user = data.get("user") if isinstance(data, dict) else None
+    return user if isinstance(user, str) else None
+
+
+@dataclass
+class WalletStats:
+    """Per-wallet collection counters."""
+    successful: int = 0
+    failed: int = 0
+    last_success_time: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+class WriteThrottle:
+    """Caps how often each wallet's streamed updates are written."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.skipped = 0
+        self._last_write: Dict[str, float] = {}
+
+    def allow(self, wallet: str, now: Optional[float] = None) -> bool:
+        """Return True (and start a new interval) if the wallet may be written now."""
+        now = time.monotonic() if now is None else now
+        last = self._last_write.get(wallet)
+        if last is not None and now - last < self.min_interval:
+            self.skipped += 1
+            return False
+        self._last_write[wallet] = now
+        return True
+
+
+class AsyncCollector:
+    """
+    Asyncio collection engine that keeps up to `concurrency` WebSocket
+    connections in flight.
+
+    Two modes:
+        run_rotation / run_forever: one wallet per connection, first snapshot only.
+        stream: long-lived multiplexed subscriptions, every (throttled) push.
+
+    The engine is transport-agnostic: `connect` returns an open WebSocket
+    (anything with async send/recv/close), `on_snapshot` receives a webData2
+    frame for a wallet and returns whether it was stored.
+    """
+
+    def __init__(
+        self,
+        connect: ConnectFn,
+        on_snapshot: SnapshotHandler,
+        concurrency: int = 8,
+        timeout_seconds: int = 60,
+        on_result: Optional[ResultHandler] = None,
+        on_connection_error: Optional[ErrorHandler] = None,
+    ):
+        self._connect = connect
+        self._on_snapshot = on_snapshot
+        self._on_result = on_result
+        self._on_connection_error = on_connection_error
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout_seconds
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        # Stats (same counters as HyperliquidMonitor, plus per-wallet breakdown)
+        self.wallets_processed = 0
+        self.successful = 0
+        self.failed = 0
+        self.connection_errors = 0
+        self.in_flight = 0
+        self.updates_received = 0
+        self.throttle: Optional[WriteThrottle] = None
+        self.wallet_stats: Dict[str, WalletStats] = {}
+
+    @staticmethod
+    def _subscription(method: str, wallet: str) -> str:
+        return json.dumps({
+            "method": method,
+            "subscription": {"type": "webData2", "user": wallet}
+        })
+
+    async def _close(self, ws):
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    async def _receive_snapshot(self, wallet: str) -> Optional[str]:
+        """
+        Open a connection, subscribe and wait for the first webData2 frame.
+
+        Holds one semaphore slot for the lifetime of the connection, so at most
+        `concurrency` connections are ever open at once.
+        """
+        async with self._semaphore:
+            self.in_flight += 1
+            ws = None
+            try:
+                ws = await self._connect()
+                await ws.send(self._subscription("subscribe", wallet))
+
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + self.timeout
+
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        logger.warning(f"⏱️ Timeout for {wallet[:16]}...")
+                        return None
+
+                    try:
+                        msg = await asyncio.wait_for(ws.recv(), timeout=min(15, remaining))
+                    except asyncio.TimeoutError:
+                        continue
+
+                    if classify(msg) == CHANNEL_WEBDATA2:
+                        return msg
+
+            except Exception as conn_error:
+                logger.error(f"🔌 Connection error for {wallet[:16]}...: {conn_error}")
+                self.connection_errors += 1
+                self.wallet_stats.setdefault(wallet, WalletStats()).last_error = str(conn_error)
+                if self._on_connection_error:
+                    await self._on_connection_error("connection error", conn_error)
+                return None
+
+            finally:
+                self.in_flight -= 1
+                if ws is not None:
+                    await self._close(ws)
+
+    async def collect_wallet_data(self, wallet: str) -> bool:
+        """
+        Collect one webData2 snapshot for a wallet and hand it to `on_snapshot`.
+
+        The connection is released before the snapshot is handled, so slow
+        storage never holds a connection slot.
+        """
+        msg = await self._receive_snapshot(wallet)
+        if msg is None:
+            return False
+
+        try:
+            return await self._on_snapshot(wallet, msg)
+        except Exception as e:
+            logger.error(f"Error processing message for {wallet[:16]}...: {e}")
+            self.wallet_stats.setdefault(wallet, WalletStats()).last_error = str(e)
+            return False
+
+    async def _record(self, wallet: str, success: bool):
+        stats = self.wallet_stats.setdefault(wallet, WalletStats())
+        self.wallets_processed += 1
+        if success:
+            self.successful += 1
+            stats.successful += 1
+            stats.last_success_time = time.time()
+        else:
+            self.failed += 1
+            stats.failed += 1
+
+        if self._on_result:
+            await self._on_result(wallet, success)
+
+    async def _collect_and_record(self, wallet: str) -> bool:
+        success = await self.collect_wallet_data(wallet)
+        await self._record(wallet, success)
+        return success
+
+    async def run_rotation(self, wallets: List[str]) -> Dict[str, bool]:
+        """Collect every wallet once, `concurrency` at a time."""
+        results = await asyncio.gather(*(self._collect_and_record(w) for w in wallets))
+        return dict(zip(wallets, results))
+
+    async def run_forever(self, wallets: List[str]):
+        """Rotate through the wallet list indefinitely."""
+        rotation = 0
+        while True:
+            rotation += 1
+            started = time.time()
+            results = await self.run_rotation(wallets)
+            ok = sum(1 for success in results.values() if success)
+            logger.info(
+                f"🔄 Rotation #{rotation} complete: {ok}/{len(wallets)} wallets "
+                f"in {time.time() - started:.1f}s ({self.concurrency} connections)"
+            )
+
+    async def _handle_stream_frame(self, msg: str, by_user: Dict[str, str],
+                                   default_wallet: Optional[str], throttle: WriteThrottle):
+        """
+        Route one streamed webData2 frame to its wallet (its `data.user`, see
+        frame_user) and store it unless throttled.
+
+        A frame without a user goes to `default_wallet` (single-wallet connections).
+        """
+        try:
+            user = frame_user(msg)
+        except json_codec.DecodeError as e:
+            logger.warning(f"Undecodable webData2 frame skipped: {e}")
+            return
+        wallet = by_user.get(user.lower()) if user is not None else default_wallet
+        if wallet is None:
+            return
+
+        self.updates_received += 1
+        if not throttle.allow(wallet):
+            return
+
+        try:
+            success = await self._on_snapshot(wallet, msg)
+        except Exception as e:
+            logger.error(f"Error processing message for {wallet[:16]}...: {e}")
+            self.wallet_stats.setdefault(wallet, WalletStats()).last_error = str(e)
+            success = False
+        await self._record(wallet, success)
+
+    async def _stream_connection(self, wallets: List[str], throttle: WriteThrottle):
+        """
+        Keep one connection subscribed to `wallets` forever.
+
+        The connection is re-established with exponential backoff whenever it
+        drops or stays silent for longer than `timeout`.
+        """
+        by_user = {w.lower(): w for w in wallets}
+        default_wallet = wallets[0] if len(wallets) == 1 else None
+        backoff = STREAM_BACKOFF_MIN
+
+        while True:
+            ws = None
+            try:
+                ws = await self._connect()
+                self.in_flight += 1
+                for wallet in wallets:
+                    await ws.send(self._subscription("subscribe", wallet))
+                logger.info(f"📡 Streaming {len(wallets)} wallet(s) on one connection")
+
+                while True:
+                    msg = await asyncio.wait_for(ws.recv(), timeout=self.timeout)
+                    backoff = STREAM_BACKOFF_MIN
+                    if classify(msg) == CHANNEL_WEBDATA2:
+                        await self._handle_stream_frame(msg, by_user, default_wallet, throttle)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as conn_error:
+                if isinstance(conn_error, asyncio.TimeoutError):
+                    conn_error = TimeoutError(f"no frames for {self.timeout}s")
+                logger.error(f"🔌 Stream connection error: {conn_error}")
+                self.connection_errors += 1
+                if self._on_connection_error:
+                    await self._on_connection_error("stream error", conn_error)
+
+            finally:
+                if ws is not None:
+                    self.in_flight -= 1
+                    await self._close(ws)
+
+            delay = backoff * random.uniform(0.5, 1.0)
+            logger.info(f"⏳ Reconnecting stream in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, STREAM_BACKOFF_MAX)
+
+    async def stream(self, wallets: List[str], subscriptions_per_connection: int = 1,
+                     min_write_interval: float = 60.0):
+        """
+        Long-lived streaming mode: keep every wallet subscribed indefinitely and
+        hand every webData2 push to `on_snapshot`, at most once per wallet per
+        `min_write_interval` seconds.
+
+        Wallets are spread over at most `concurrency` connections; the number of
+        subscriptions per connection is raised if needed so every wallet fits.
+        """
+        per_connection = max(subscriptions_per_connection, math.ceil(len(wallets) / self.concurrency))
+        if per_connection != subscriptions_per_connection:
+            logger.warning(
+                f"Raising subscriptions per connection to {per_connection} so "
+                f"{len(wallets)} wallets fit in {self.concurrency} connections"
+            )
+
+        throttle = WriteThrottle(min_write_interval)
+        self.throttle = throttle
+        chunks = [wallets[i:i + per_connection] for i in range(0, len(wallets), per_connection)]
+        await asyncio.gather(*(self._stream_connection(chunk, throttle) for chunk in chunks))
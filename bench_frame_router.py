@@ -0,0 +1,82 @@
+import argparse
+import json
+import re
+import time
+from typing import Callable, Dict, List
+
+from bench_json import ASSET_CTXS, ORDERS, POSITIONS, synthetic_frame
+from frame_router import classify
+
+# The check the monitors used before frame_router
+PATTERN = re.compile(r'"channel"\s*:\s*"webData2"')
+
+NUMBER = 200000
+REPEAT = 5
+
+
+def sample_frames(positions: int = POSITIONS, orders: int = ORDERS, asset_ctxs: int = ASSET_CTXS) -> Dict[str, str]:
+    """One frame of each kind; 'other' is a large frame of a channel we do not subscribe to."""
+    def compact(obj) -> str:
+        # The server sends compact JSON
+        return json.dumps(obj, separators=(',', ':'))
+
+    webdata2 = compact(json.loads(synthetic_frame(positions, orders, asset_ctxs)))
+    return {
+        'webData2': webdata2,
+        'other': webdata2.replace('"channel":"webData2"', '"channel":"allMids"', 1),
+        'subscriptionResponse': compact({
+            "channel": "subscriptionResponse",
+            "data": {"method": "subscribe", "subscription": {"type": "webData2", "user": "0x" + "ab" * 20}},
+        }),
+        'pong': compact({"channel": "pong"}),
+        'error': compact({"channel": "error", "data": "Invalid subscription"}),
+    }
+
+
+def time_per_call(fn: Callable[[], object], number: int, repeat: int) -> float:
+    """Best seconds per call of `fn` over `repeat` runs of `number` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) / number
+
+
+def bench(frames: Dict[str, str], number: int = NUMBER, repeat: int = REPEAT) -> Dict[str, Dict[str, float]]:
+    """Seconds per frame of each check, per frame kind (str frames, and bytes frames as received)."""
+    results = {}
+    for kind, frame in frames.items():
+        raw = frame.encode('utf-8')
+        checks: Dict[str, Callable[[], object]] = {
+            'regex': lambda: PATTERN.search(frame),
+            'substring': lambda: 'webData2' in frame,
+            'classify': lambda: classify(frame),
+            'regex+decode': lambda: PATTERN.search(raw.decode('utf-8')),
+            'classify bytes': lambda: classify(raw),
+        }
+        results[kind] = {name: time_per_call(fn, number, repeat) for name, fn in checks.items()}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare frame classification against the full-message regex.')
+    parser.add_argument('--number', type=int, default=NUMBER, help='Calls per run (default: 200000)')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='Runs per check, best is reported')
+    parser.add_argument('--positions', type=int, default=POSITIONS)
+    parser.add_argument('--orders', type=int, default=ORDERS)
+    parser.add_argument('--asset-ctxs', type=int, default=ASSET_CTXS)
+    args = parser.parse_args()
+
+    frames = sample_frames(args.positions, args.orders, args.asset_ctxs)
+    results = bench(frames, args.number, args.repeat)
+    names: List[str] = list(next(iter(results.values())))
+    print(f"{'frame':22}{'bytes':>9}" + ''.join(f"{name:>16}" for name in names) + "   (ns/frame)")
+    for kind, timings in results.items():
+        row = ''.join(f"{timings[name] * 1e9:16.0f}" for name in names)
+        print(f"{kind:22}{len(frames[kind]):9d}{row}")
+
+
+if __name__ == '__main__':
+    main()
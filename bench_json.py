@@ -0,0 +1,155 @@
+import argparse
+import json
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+import json_codec
+from hyperliquid_batch import parse_hyperliquid_data_batch
+from hyperliquid_structs import PARSERS, PARSER_DICTS
+
+# Synthetic frame defaults: a large account
+POSITIONS = 150
+ORDERS = 400
+ASSET_CTXS = 200
+REPEAT = 5
+
+
+def _px(rng: random.Random) -> str:
+    return f"{rng.uniform(0.001, 70000):.6f}".rstrip('0')
+
+
+def synthetic_frame(positions: int = POSITIONS, orders: int = ORDERS, asset_ctxs: int = ASSET_CTXS,
+                    seed: int = 1) -> str:
+    """A webData2 frame shaped like the live ones (same keys, string decimals)."""
+    rng = random.Random(seed)
+    coins = [f"COIN{i}" for i in range(max(positions, asset_ctxs, 1))]
+    margin = {"accountValue": _px(rng), "totalNtlPos": _px(rng), "totalRawUsd": _px(rng), "totalMarginUsed": _px(rng)}
+    data = {
+        "clearinghouseState": {
+            "marginSummary": margin,
+            "crossMarginSummary": dict(margin),
+            "crossMaintenanceMarginUsed": _px(rng),
+            "withdrawable": _px(rng),
+            "assetPositions": [
+                {
+                    "type": "oneWay",
+                    "position": {
+                        "coin": coins[i], "szi": _px(rng), "entryPx": _px(rng), "positionValue": _px(rng),
+                        "unrealizedPnl": _px(rng), "returnOnEquity": _px(rng), "liquidationPx": _px(rng),
+                        "marginUsed": _px(rng), "maxLeverage": 50,
+                        "leverage": {"type": "cross", "value": rng.randint(1, 50)},
+                        "cumFunding": {"allTime": _px(rng), "sinceOpen": _px(rng), "sinceChange": _px(rng)},
+                    },
+                }
+                for i in range(positions)
+            ],
+            "time": 1735689600000,
+        },
+        "openOrders": [
+            {
+                "coin": rng.choice(coins), "side": rng.choice("AB"), "limitPx": _px(rng), "sz": _px(rng),
+                "oid": 40000000000 + i, "timestamp": 1735689600000 - i, "origSz": _px(rng),
+                "orderType": "Limit", "reduceOnly": False, "tif": "Gtc", "cloid": None,
+            }
+            for i in range(orders)
+        ],
+        "assetCtxs": [
+            {
+                "funding": "0.0000125", "openInterest": _px(rng), "prevDayPx": _px(rng), "dayNtlVlm": _px(rng),
+                "premium": "0.0003", "oraclePx": _px(rng), "markPx": _px(rng), "midPx": _px(rng),
+                "impactPxs": [_px(rng), _px(rng)], "dayBaseVlm": _px(rng),
+            }
+            for _ in range(asset_ctxs)
+        ],
+        "meta": {
+            "universe": [
+                {"name": coins[i], "szDecimals": rng.randint(0, 5), "maxLeverage": rng.choice([3, 10, 20, 50])}
+                for i in range(asset_ctxs)
+            ],
+        },
+        "serverTime": 1735689600123,
+        "user": "0x" + "ab" * 20,
+        "leadingVaults": [],
+        "totalVaultEquity": "0.0",
+    }
+    return json.dumps({"channel": "webData2", "data": data})
+
+
+def load_frames(path: str) -> List[str]:
+    """Recorded frames, one raw websocket message per line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def best_of(fn: Callable[[], None], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench(frames: List[str], repeat: int = REPEAT, parse: Optional[Callable[[dict], dict]] = None) -> Dict[str, float]:
+    """
+    Seconds per pass over `frames` for every installed backend (decode, then
+    `parse` if given), and for partial decoding ('partial', json_codec.loads_fields).
+    """
+    decoders = {}
+    for name in json_codec.BACKENDS:
+        try:
+            decoders[name] = json_codec.load_backend(name)[1]
+        except ImportError:
+            continue
+    decoders['partial'] = lambda frame: {"data": json_codec.loads_fields(frame)}
+
+    results = {}
+    for name, loads in decoders.items():
+        if parse:
+            def run():
+                for frame in frames:
+                    parse(loads(frame)["data"])
+        else:
+            def run():
+                for frame in frames:
+                    loads(frame)
+
+        results[name] = best_of(run, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON decoding backends on webData2 frames.')
+    parser.add_argument('--frames', default=None,
+                        help='File of recorded frames, one per line (default: synthetic frames)')
+    parser.add_argument('--count', type=int, default=50, help='Synthetic frames per pass (default: 50)')
+    parser.add_argument('--positions', type=int, default=POSITIONS)
+    parser.add_argument('--orders', type=int, default=ORDERS)
+    parser.add_argument('--asset-ctxs', type=int, default=ASSET_CTXS)
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='Passes per backend, best is reported')
+    parser.add_argument('--parse', action='store_true', help='Time decode + parse')
+    parser.add_argument('--parser', choices=list(PARSERS), default=PARSER_DICTS,
+                        help='Parser timed with --parse (default: dicts)')
+    parser.add_argument('--batch', action='store_true',
+                        help='Also time decode + parse_hyperliquid_data_batch over all frames (selected backend)')
+    args = parser.parse_args()
+
+    if args.frames:
+        frames = load_frames(args.frames)
+    else:
+        frames = [synthetic_frame(args.positions, args.orders, args.asset_ctxs, seed=i) for i in range(args.count)]
+    total_mb = sum(len(frame.encode('utf-8')) for frame in frames) / 1024 ** 2
+
+    print(f"{len(frames)} frames, {total_mb:.1f} MB, selected backend: {json_codec.BACKEND}")
+    results = bench(frames, args.repeat, PARSERS[args.parser] if args.parse else None)
+    if args.batch:
+        results['batch'] = best_of(lambda: parse_hyperliquid_data_batch(frames), args.repeat)
+    baseline = results.get('json')
+    for name, seconds in results.items():
+        speedup = f"{baseline / seconds:.2f}x" if baseline else "-"
+        print(f"{name:8} {seconds * 1e6 / len(frames):10.0f} us/frame {total_mb / seconds:8.1f} MB/s  {speedup}")
+
+
+if __name__ == '__main__':
+    main()
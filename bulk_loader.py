@@ -0,0 +1,69 @@
+import datetime
+import os
+import tempfile
+from typing import Any, Iterable, List, Sequence
+
+# MySQL's default LOAD DATA text format, spelled out so it never depends on server defaults
+LOAD_SQL = r"""
+    LOAD DATA LOCAL INFILE %s INTO TABLE `{table}`
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY '\t' ESCAPED BY '\\'
+    LINES TERMINATED BY '\n'
+    ({columns})
+"""
+
+NULL = r'\N'
+_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+
+def encode_value(value: Any) -> str:
+    """Encode one field in LOAD DATA text format."""
+    if value is None:
+        return NULL
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+    return str(value).translate(_ESCAPES)
+
+
+def encode_rows(rows: Iterable[Sequence[Any]]) -> bytes:
+    """Encode rows as a tab-separated LOAD DATA buffer."""
+    return ''.join('\t'.join(map(encode_value, row)) + '\n' for row in rows).encode('utf-8')
+
+
+class LoadDataError(Exception):
+    """The server loaded fewer rows than were sent (LOCAL turns errors into warnings)."""
+
+
+def load_rows(cursor: Any, table: str, columns: List[str],
+              rows: List[Sequence[Any]]) -> int:
+    """
+    Stream rows into `table` with LOAD DATA LOCAL INFILE.
+
+    Rows are encoded into an in-memory buffer. PyMySQL serves LOCAL INFILE
+    requests by reading a file by name, so the buffer is written to a private
+    temp file for the duration of the statement only.
+
+    The connection must be opened with local_infile=True and the server must
+    allow it (local_infile=ON).
+
+    Raises:
+        LoadDataError: if any row was skipped or rejected by the server.
+    """
+    if not rows:
+        return 0
+
+    fd, path = tempfile.mkstemp(prefix=f"load_{table}_", suffix=".tsv")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(encode_rows(rows))
+        loaded = cursor.execute(LOAD_SQL.format(table=table, columns=", ".join(columns)), (path,))
+    finally:
+        os.unlink(path)
+
+    if loaded != len(rows):
+        cursor.execute("SHOW WARNINGS LIMIT 5")
+        warnings = cursor.fetchall()
+        raise LoadDataError(f"{table}: loaded {loaded}/{len(rows)} rows; warnings: {warnings}")
+    return loaded
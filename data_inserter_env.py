@@ -1,12 +1,35 @@
 import pymysql
 import os
+import threading
+import time
+import logging
 from dotenv import load_dotenv 
-from sshtunnel import SSHTunnelForwarder
-from typing import Dict, List, Any, Tuple
+from db_pool import get_pool, close_all, PooledConnection, CONNECTION_ERRORS
+from snapshot_ids import client_snapshot_id
+from sql_utils import in_clause
+from id_dictionary import get_dictionary, WALLETS, COINS
+from online_id_migration import get_shadow_writer, mirror_sql
+from latest_state import apply_latest_state, current_state, latest_items
+from rollups import RollupBatch, get_held_coins
+from bulk_loader import load_rows
+from snapshot_spool import SnapshotSpool, SpoolReplayer
+from snapshot_digest import SnapshotDigestCache
+from sinks import SnapshotSink
+from order_intervals import (
+    apply_order_snapshot, open_orders_at, ORDER_STORAGE_MODES, ORDER_STORAGE_ROWS,
+    ORDER_STORAGE_INTERVALS, ORDER_STORAGE_BOTH,
+)
+from position_intervals import (
+    apply_position_snapshot, positions_at, mark_rows, MARK_COLUMNS, POSITION_STORAGE_MODES,
+    POSITION_STORAGE_ROWS, POSITION_STORAGE_INTERVALS, POSITION_STORAGE_BOTH,
+)
+from typing import Dict, List, Any, Tuple, Optional
 from hyperliquid_parser import parse_hyperliquid_data 
 import datetime
 import json 
 
+logger = logging.getLogger(__name__)
+
 # --- Configuration Loading Function ---
 
 def load_env_config() -> Dict[str, Any]:
@@ -50,73 +73,373 @@ def load_env_config() -> Dict[str, Any]:
 
 
 class MySQLStealthClient:
-    """Handles secure data insertion into MySQL, conditionally using SSH tunnel."""
+    """
+    Handles secure data insertion into MySQL, conditionally using SSH tunnel.
+
+    Connections come from the process-wide pool in db_pool (one shared SSH
+    tunnel, idle-time liveness checks), so entering the context is cheap and
+    exiting returns the connection to the pool.
+
+    With `client_ids=True` snapshot ids are derived from (wallet id, snapshot
+    time) by snapshot_ids.client_snapshot_id instead of AUTO_INCREMENT: batches
+    are written with one multi-row INSERT per table, and writing a snapshot
+    that is already stored (a replay, or the same frame parsed again) is a
+    no-op.
+
+    With `bulk_load=True` (implies client ids) batches are streamed with
+    LOAD DATA LOCAL INFILE instead of INSERT; the server must have
+    local_infile=ON. Connections come from a separate pool opened with
+    local_infile enabled.
+
+    `order_storage` selects how open orders are stored: 'rows' (one
+    hyperliquid_open_orders row per order per snapshot), 'intervals' (one
+    hyperliquid_order_intervals row per order lifetime, see order_intervals)
+    or 'both'. `position_storage` does the same for positions: 'intervals'
+    stores legs in hyperliquid_position_intervals and only the mark-dependent
+    metrics per snapshot in hyperliquid_position_marks (see position_intervals).
+
+    Wallet addresses and coins are stored as ids from the `wallets` and
+    `hyperliquid_coins` dictionary tables, resolved through in-process caches
+    (see id_dictionary); the *_v views give the readable shape back.
+
+    With `latest_state=True` hyperliquid_wallet_latest and the latest
+    positions/orders tables are upserted in the same transaction, so a
+    wallet's current state is a primary-key lookup (see latest_state).
+
+    With `rollups=True` 1m/1h/1d OHLC rollups of account value, exposure,
+    margin and per-coin net size are upserted in the same transaction (see
+    rollups).
+
+    With `dual_write=True` every written snapshot is also mirrored into the
+    BIGINT shadow tables of a running online_id_migration, in the same
+    transaction.
+    """
 
-    def __init__(self, ssh_config: Dict[str, Any], db_config: Dict[str, str]):
+    def __init__(self, ssh_config: Dict[str, Any], db_config: Dict[str, str],
+                 client_ids: bool = False, bulk_load: bool = False,
+                 order_storage: str = ORDER_STORAGE_ROWS,
+                 position_storage: str = POSITION_STORAGE_ROWS,
+                 dual_write: bool = False, latest_state: bool = False,
+                 rollups: bool = False):
+        if order_storage not in ORDER_STORAGE_MODES:
+            raise ValueError(f"order_storage must be one of {ORDER_STORAGE_MODES}")
+        if position_storage not in POSITION_STORAGE_MODES:
+            raise ValueError(f"position_storage must be one of {POSITION_STORAGE_MODES}")
         self.ssh_config = ssh_config
         self.db_config = db_config
-        self.tunnel: SSHTunnelForwarder = None
-        self.conn: pymysql.connections.Connection = None
+        self.bulk_load = bulk_load
+        self.client_ids = client_ids or bulk_load
+        self.order_storage = order_storage
+        self.position_storage = position_storage
+        self.dual_write = dual_write
+        self.latest_state = latest_state
+        self.rollups = rollups
+        self.conn: PooledConnection = None
 
-    def __enter__(self) -> 'MySQLStealthClient':
-        """Context manager entry point: sets up connection."""
-        
-        if self.ssh_config['use_tunnel']:
-            # --- 1. SSH TUNNEL SETUP ---
-            print("Starting SSH tunnel...")
-            
-            # Prepare optional key/password arguments for SSHTunnelForwarder
-            tunnel_kwargs = {}
-            if self.ssh_config['ssh_pkey']:
-                tunnel_kwargs['ssh_pkey'] = self.ssh_config['ssh_pkey']
-            else:
-                print("[⚠️] SSH_KEY_PATH is empty. Ensure you are using SSH Agent or password auth.")
-
-            self.tunnel = SSHTunnelForwarder(
-                ssh_address_or_host=(self.ssh_config['ssh_address_or_host'], self.ssh_config['ssh_port']),
-                ssh_username=self.ssh_config['ssh_username'],
-                remote_bind_address=self.ssh_config['remote_bind_address'],
-                local_bind_address=self.ssh_config['local_bind_address'],
-                **tunnel_kwargs
-            )
-            self.tunnel.start()
+        # Dictionary-encoded wallets/coins: process-wide id caches per database
+        database = (tuple(ssh_config['remote_bind_address']), db_config['database'])
+        self.wallet_ids = get_dictionary(database, WALLETS)
+        self.coin_ids = get_dictionary(database, COINS)
+        self.shadow_writer = get_shadow_writer(database) if dual_write else None
+        self.rollup_held = get_held_coins(database)
+
+    @property
+    def store_position_rows(self) -> bool:
+        return self.position_storage in (POSITION_STORAGE_ROWS, POSITION_STORAGE_BOTH)
 
-            # Connection parameters point to the local side of the tunnel
-            db_host = '127.0.0.1'
-            db_port = self.tunnel.local_bind_port
-            print(f"SSH Tunnel running on port {db_port}.")
+    @property
+    def store_position_intervals(self) -> bool:
+        return self.position_storage in (POSITION_STORAGE_INTERVALS, POSITION_STORAGE_BOTH)
 
+    @property
+    def store_order_rows(self) -> bool:
+        return self.order_storage in (ORDER_STORAGE_ROWS, ORDER_STORAGE_BOTH)
+
+    @property
+    def store_order_intervals(self) -> bool:
+        return self.order_storage in (ORDER_STORAGE_INTERVALS, ORDER_STORAGE_BOTH)
+
+    def __enter__(self) -> 'MySQLStealthClient':
+        """Context manager entry point: takes a connection from the shared pool."""
+        if self.bulk_load:
+            pool = get_pool(self.ssh_config, self.db_config, local_infile=True)
         else:
-            # --- 2. DIRECT CONNECTION ---
-            print("SSH tunnel disabled. Connecting directly to database...")
-            db_host = self.ssh_config['remote_bind_address'][0]
-            db_port = self.ssh_config['remote_bind_address'][1]
-        
-        # --- 3. MYSQL CONNECTION ---
-        self.conn = pymysql.connect(
-            host=db_host, 
-            port=db_port,
-            database=self.db_config['database'],
-            user=self.db_config['user'],
-            password=self.db_config['password'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        print("Database connected.")
+            pool = get_pool(self.ssh_config, self.db_config)
+        self.conn = pool.acquire()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit point: closes DB connection and SSH tunnel (if used)."""
+        """Context manager exit point: returns the connection (discarded after connection errors)."""
         if self.conn:
-            self.conn.close()
-        if self.tunnel:
-            self.tunnel.stop()
-            print("SSH tunnel and DB connection closed.")
+            discard = exc_val is not None and isinstance(exc_val, CONNECTION_ERRORS)
+            self.conn.close(discard=discard)
+            self.conn = None
 
     def _execute_batch_insert(self, cursor: pymysql.cursors.DictCursor, sql: str, data: List[Tuple]):
         """Helper for batch execution."""
         if data:
             cursor.executemany(sql, data)
 
+    # --- Row builders (shared by the single-snapshot and bulk paths) ---
+
+    SNAPSHOT_COLUMNS = [
+        'wallet_id', 'snapshot_time_ms', 'snapshot_datetime',
+        'account_value', 'total_ntl_pos', 'total_raw_usd', 'total_margin_used',
+        'withdrawable', 'cross_maintenance_margin_used',
+    ]
+    POSITION_COLUMNS = [
+        'snapshot_id', 'snapshot_time_ms', 'coin_id', 'type', 'size', 'leverage_type',
+        'leverage_value', 'entry_price', 'position_value',
+        'unrealized_pnl', 'return_on_equity',
+    ]
+    ORDER_COLUMNS = [
+        'order_id', 'snapshot_id', 'snapshot_time_ms', 'coin_id', 'side', 'limit_price',
+        'quantity', 'timestamp_ms', 'order_type', 'reduce_only', 'time_in_force',
+    ]
+    CHILD_COLUMNS = {
+        'hyperliquid_positions': POSITION_COLUMNS,
+        'hyperliquid_position_marks': MARK_COLUMNS,
+        'hyperliquid_open_orders': ORDER_COLUMNS,
+    }
+
+    @staticmethod
+    def _insert_sql(table: str, columns: List[str]) -> str:
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})"
+        )
+
+    def _snapshot_row(self, wallet_address: str, snapshot_time_ms: int, parsed_data: Dict) -> Tuple:
+        # Convert time_ms to DATETIME for the snapshot table
+        snapshot_datetime = datetime.datetime.fromtimestamp(snapshot_time_ms / 1000.0)
+        summary = parsed_data['summary']
+        return (
+            self.wallet_ids[wallet_address], snapshot_time_ms, snapshot_datetime,
+            summary['account_value'], summary['total_ntl_pos'], 
+            summary['total_raw_usd'], summary['total_margin_used'],
+            summary['withdrawable'], summary['cross_maintenance_margin_used']
+        )
+
+    def _position_rows(self, snapshot_id: int, snapshot_time_ms: int, parsed_data: Dict) -> List[Tuple]:
+        return [
+            (
+                snapshot_id, snapshot_time_ms, self.coin_ids[p['coin']], p['type'], p['size'], 
+                p['leverage_type'], p['leverage_value'], p['entry_price'], 
+                p['position_value'], p['unrealized_pnl'], p['return_on_equity']
+            )
+            for p in parsed_data['asset_positions']
+        ]
+
+    def _order_rows(self, snapshot_id: int, snapshot_time_ms: int, parsed_data: Dict) -> List[Tuple]:
+        return [
+            (
+                o['order_id'], snapshot_id, snapshot_time_ms, self.coin_ids[o['coin']], o['side'], 
+                o['limit_price'], o['quantity'], o['timestamp_ms'], 
+                o['order_type'], o['reduce_only'], o['time_in_force']
+            )
+            for o in parsed_data['open_orders']
+        ]
+
+    # --- Client-generated snapshot ids ---
+
+    def _client_snapshot_id(self, wallet_address: str, snapshot_time_ms: int, parsed_data: Dict) -> int:
+        """
+        Return the snapshot's client id, derived from (wallet id, snapshot time)
+        (snapshot_ids.client_snapshot_id).
+
+        The id is stored in parsed_data, so a retried or replayed snapshot keeps
+        the id it was first given (also one spooled by an older writer). The
+        wallet must already be resolved (_resolve_ids).
+        """
+        if parsed_data.get('snapshot_id') is None:
+            parsed_data['snapshot_id'] = client_snapshot_id(self.wallet_ids[wallet_address], snapshot_time_ms)
+        return parsed_data['snapshot_id']
+
+    def _resolve_ids(self, items: List[Tuple[str, int, Dict]]):
+        """
+        Make sure every wallet and coin in `items` has a cached dictionary id.
+
+        New dictionary rows are committed right away, before the snapshot
+        transaction starts, so cached ids never outlive a rollback.
+        """
+        wallets = {wallet_address for wallet_address, _, _ in items}
+        coins = set()
+        for _, _, parsed_data in items:
+            coins.update(p['coin'] for p in parsed_data['asset_positions'])
+            coins.update(o['coin'] for o in parsed_data['open_orders'])
+
+        with self.conn.cursor() as cursor:
+            wrote = self.wallet_ids.resolve(cursor, wallets)
+            wrote = self.coin_ids.resolve(cursor, coins) or wrote
+        if wrote:
+            self.conn.commit()
+
+    def _existing_snapshot_ids(self, cursor: pymysql.cursors.DictCursor, snapshot_ids: List[int]) -> set:
+        """Return the subset of snapshot_ids that are already stored."""
+        if not snapshot_ids:
+            return set()
+        cursor.execute(
+            f"SELECT snapshot_id FROM hyperliquid_snapshots WHERE snapshot_id IN ({in_clause(snapshot_ids)})",
+            snapshot_ids
+        )
+        return {row['snapshot_id'] if isinstance(row, dict) else row[0] for row in cursor.fetchall()}
+
+    def _insert_snapshot(self, cursor: pymysql.cursors.DictCursor, wallet_address: str,
+                         snapshot_time_ms: int, parsed_data: Dict) -> int:
+        """Insert one snapshot (header, positions, orders) on an open transaction; returns snapshot_id."""
+        # --- 1. Insert Summary into hyperliquid_snapshots (Header) ---
+        summary_row = self._snapshot_row(wallet_address, snapshot_time_ms, parsed_data)
+
+        if self.client_ids:
+            snapshot_id = self._client_snapshot_id(wallet_address, snapshot_time_ms, parsed_data)
+            cursor.execute(
+                self._insert_sql('hyperliquid_snapshots', ['snapshot_id'] + self.SNAPSHOT_COLUMNS),
+                (snapshot_id,) + summary_row
+            )
+        else:
+            cursor.execute(self._insert_sql('hyperliquid_snapshots', self.SNAPSHOT_COLUMNS), summary_row)
+            # Get the ID of the newly inserted snapshot record
+            snapshot_id = cursor.lastrowid
+        
+        if snapshot_id is None:
+            raise Exception("Failed to retrieve snapshot_id after insertion.")
+
+        # --- 2./3. Insert Asset Positions and Open Orders (per storage mode) ---
+        for table, rows in self._child_rows(snapshot_id, snapshot_time_ms, parsed_data).items():
+            self._execute_batch_insert(cursor, self._insert_sql(table, self.CHILD_COLUMNS[table]), rows)
+        self._apply_intervals(cursor, wallet_address, snapshot_time_ms, parsed_data)
+        if self.latest_state:
+            apply_latest_state(cursor, self.wallet_ids[wallet_address], snapshot_id,
+                               snapshot_time_ms, parsed_data, self.coin_ids)
+        self._apply_rollups(cursor, [(wallet_address, snapshot_time_ms, parsed_data)])
+        self._mirror(cursor, [(snapshot_id, snapshot_time_ms)])
+        
+        return snapshot_id
+
+    def _child_rows(self, snapshot_id: int, snapshot_time_ms: int, parsed_data: Dict) -> Dict[str, List[Tuple]]:
+        """
+        Per-snapshot child rows by table, for the configured storage modes.
+
+        Children carry the snapshot time too: every snapshot table is
+        partitioned on it (see partition_maintenance).
+        """
+        rows = {}
+        if self.store_position_rows:
+            rows['hyperliquid_positions'] = self._position_rows(snapshot_id, snapshot_time_ms, parsed_data)
+        if self.store_position_intervals:
+            rows['hyperliquid_position_marks'] = mark_rows(
+                snapshot_id, snapshot_time_ms, parsed_data['asset_positions'], self.coin_ids
+            )
+        if self.store_order_rows:
+            rows['hyperliquid_open_orders'] = self._order_rows(snapshot_id, snapshot_time_ms, parsed_data)
+        return rows
+
+    def _apply_intervals(self, cursor: pymysql.cursors.DictCursor, wallet_address: str,
+                         snapshot_time_ms: int, parsed_data: Dict):
+        """Fold a snapshot into the position/order interval tables (interval storage modes)."""
+        wallet_id = self.wallet_ids[wallet_address]
+        if self.store_position_intervals:
+            apply_position_snapshot(cursor, wallet_id, snapshot_time_ms, parsed_data['asset_positions'], self.coin_ids)
+        if self.store_order_intervals:
+            apply_order_snapshot(cursor, wallet_id, snapshot_time_ms, parsed_data['open_orders'], self.coin_ids)
+
+    def _batch_rows(self, items: List[Tuple[str, int, Dict]]) -> Dict[str, List[Tuple]]:
+        """
+        Build the rows of a whole batch by table (client ids only).
+
+        No row depends on an id returned by the server, so every table's rows
+        can be built up front and written with one statement per table.
+        """
+        rows: Dict[str, List[Tuple]] = {'hyperliquid_snapshots': []}
+        for wallet_address, snapshot_time_ms, parsed_data in items:
+            snapshot_id = self._client_snapshot_id(wallet_address, snapshot_time_ms, parsed_data)
+            rows['hyperliquid_snapshots'].append(
+                (snapshot_id,) + self._snapshot_row(wallet_address, snapshot_time_ms, parsed_data)
+            )
+            for table, child_rows in self._child_rows(snapshot_id, snapshot_time_ms, parsed_data).items():
+                rows.setdefault(table, []).extend(child_rows)
+        return rows
+
+    def _batch_columns(self, table: str) -> List[str]:
+        if table == 'hyperliquid_snapshots':
+            return ['snapshot_id'] + self.SNAPSHOT_COLUMNS
+        return self.CHILD_COLUMNS[table]
+
+    def _apply_batch_intervals(self, cursor: pymysql.cursors.DictCursor,
+                               items: List[Tuple[str, int, Dict]]):
+        """Fold a batch into the interval tables (oldest snapshot first) and the latest state."""
+        for wallet_address, snapshot_time_ms, parsed_data in sorted(items, key=lambda item: item[1]):
+            self._apply_intervals(cursor, wallet_address, snapshot_time_ms, parsed_data)
+        if self.latest_state:
+            # Newest snapshot per wallet only, in wallet id order so concurrent batches lock alike
+            for wallet_address, snapshot_time_ms, parsed_data in sorted(
+                    latest_items(items), key=lambda item: self.wallet_ids[item[0]]):
+                apply_latest_state(cursor, self.wallet_ids[wallet_address], parsed_data['snapshot_id'],
+                                   snapshot_time_ms, parsed_data, self.coin_ids)
+        self._apply_rollups(cursor, items)
+
+    def _apply_rollups(self, cursor: pymysql.cursors.DictCursor, items: List[Tuple[str, int, Dict]]):
+        """Merge snapshots into the OHLC rollup tables (one upsert per table)."""
+        if not self.rollups:
+            return
+        batch = RollupBatch(self.rollup_held)
+        for wallet_address, snapshot_time_ms, parsed_data in sorted(items, key=lambda item: item[1]):
+            sizes = {self.coin_ids[p['coin']]: p['size'] for p in parsed_data['asset_positions']}
+            batch.add(self.wallet_ids[wallet_address], snapshot_time_ms, parsed_data['summary'], sizes)
+        batch.flush(cursor)
+
+    def _bulk_insert_snapshots(self, cursor: pymysql.cursors.DictCursor,
+                               items: List[Tuple[str, int, Dict]]):
+        """Insert a whole batch with one multi-row INSERT per table."""
+        for table, rows in self._batch_rows(items).items():
+            self._execute_batch_insert(cursor, self._insert_sql(table, self._batch_columns(table)), rows)
+        self._apply_batch_intervals(cursor, items)
+        self._mirror(cursor, [(parsed['snapshot_id'], snapshot_time_ms) for _, snapshot_time_ms, parsed in items])
+
+    def _load_snapshots(self, cursor: pymysql.cursors.DictCursor,
+                        items: List[Tuple[str, int, Dict]]):
+        """Stream a whole batch with one LOAD DATA LOCAL INFILE per table."""
+        for table, rows in self._batch_rows(items).items():
+            load_rows(cursor, table, self._batch_columns(table), rows)
+        self._apply_batch_intervals(cursor, items)
+        self._mirror(cursor, [(parsed['snapshot_id'], snapshot_time_ms) for _, snapshot_time_ms, parsed in items])
+
+    def _mirror(self, cursor: pymysql.cursors.DictCursor, written: List[Tuple[int, int]]):
+        """Dual-write: copy just-written (snapshot_id, snapshot_time_ms) snapshots into the shadow tables."""
+        if self.shadow_writer is None or not written:
+            return
+        snapshot_ids = [snapshot_id for snapshot_id, _ in written]
+        times = [snapshot_time_ms for _, snapshot_time_ms in written]
+        for table in self.shadow_writer.tables(cursor):
+            try:
+                cursor.execute(mirror_sql(table, len(snapshot_ids)), snapshot_ids + [min(times), max(times)])
+            except pymysql.err.ProgrammingError as e:
+                # 1146 = table doesn't exist: the migration was cut over; the transaction is still usable
+                if e.args[0] != 1146:
+                    raise
+                self.shadow_writer.forget(table)
+
+    def get_positions_at(self, wallet_address: str, time_ms: int) -> List[Dict]:
+        """Position legs of a wallet at `time_ms`, reconstructed from hyperliquid_position_intervals."""
+        if not self.conn:
+            raise ConnectionError("Database connection not established. Use 'with MySQLStealthClient(...) as client:'")
+        with self.conn.cursor() as cursor:
+            return positions_at(cursor, wallet_address, time_ms)
+
+    def get_open_orders_at(self, wallet_address: str, time_ms: int) -> List[Dict]:
+        """Open orders of a wallet at `time_ms`, reconstructed from hyperliquid_order_intervals."""
+        if not self.conn:
+            raise ConnectionError("Database connection not established. Use 'with MySQLStealthClient(...) as client:'")
+        with self.conn.cursor() as cursor:
+            return open_orders_at(cursor, wallet_address, time_ms)
+
+    def get_current_state(self, wallet_address: str) -> Optional[Dict]:
+        """Latest summary, positions and open orders of a wallet, from the latest-state tables."""
+        if not self.conn:
+            raise ConnectionError("Database connection not established. Use 'with MySQLStealthClient(...) as client:'")
+        with self.conn.cursor() as cursor:
+            return current_state(cursor, wallet_address)
+
     def insert_hyperliquid_data(self, wallet_address: str, snapshot_time_ms: int, parsed_data: Dict):
         """
         Main method to orchestrate the insertion of all structured data into three tables 
@@ -126,68 +449,14 @@ class MySQLStealthClient:
             raise ConnectionError("Database connection not established. Use 'with MySQLStealthClient(...) as client:'")
             
         try:
+            self._resolve_ids([(wallet_address, snapshot_time_ms, parsed_data)])
             with self.conn.cursor() as cursor:
-                
-                # Convert time_ms to DATETIME for the snapshot table
-                snapshot_datetime = datetime.datetime.fromtimestamp(snapshot_time_ms / 1000.0)
-                
-                # --- 1. Insert Summary into hyperliquid_snapshots (Header) ---
-                summary = parsed_data['summary']
-                
-                summary_sql = f"""
-                    INSERT INTO hyperliquid_snapshots (
-                        wallet_address, snapshot_time_ms, snapshot_datetime, 
-                        account_value, total_ntl_pos, total_raw_usd, total_margin_used,
-                        withdrawable, cross_maintenance_margin_used
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                cursor.execute(summary_sql, (
-                    wallet_address, snapshot_time_ms, snapshot_datetime,
-                    summary['account_value'], summary['total_ntl_pos'], 
-                    summary['total_raw_usd'], summary['total_margin_used'],
-                    summary['withdrawable'], summary['cross_maintenance_margin_used']
-                ))
-                
-                # Get the ID of the newly inserted snapshot record
-                snapshot_id = cursor.lastrowid
-                
-                if snapshot_id is None:
-                    raise Exception("Failed to retrieve snapshot_id after insertion.")
-
-                # --- 2. Insert Asset Positions into hyperliquid_positions ---
-                position_data = [
-                    (
-                        snapshot_id, p['coin'], p['type'], p['size'], 
-                        p['leverage_type'], p['leverage_value'], p['entry_price'], 
-                        p['position_value'], p['unrealized_pnl'], p['return_on_equity']
-                    )
-                    for p in parsed_data['asset_positions']
-                ]
-                position_sql = """
-                    INSERT INTO hyperliquid_positions (
-                        snapshot_id, coin, type, size, leverage_type, 
-                        leverage_value, entry_price, position_value, 
-                        unrealized_pnl, return_on_equity
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                self._execute_batch_insert(cursor, position_sql, position_data)
-
-                # --- 3. Insert Open Orders into hyperliquid_open_orders ---
-                order_data = [
-                    (
-                        o['order_id'], snapshot_id, o['coin'], o['side'], 
-                        o['limit_price'], o['quantity'], o['timestamp_ms'], 
-                        o['order_type'], o['reduce_only'], o['time_in_force']
-                    )
-                    for o in parsed_data['open_orders']
-                ]
-                order_sql = """
-                    INSERT INTO hyperliquid_open_orders (
-                        order_id, snapshot_id, coin, side, limit_price, 
-                        quantity, timestamp_ms, order_type, reduce_only, time_in_force
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                self._execute_batch_insert(cursor, order_sql, order_data)
+                if self.client_ids:
+                    snapshot_id = self._client_snapshot_id(wallet_address, snapshot_time_ms, parsed_data)
+                    if self._existing_snapshot_ids(cursor, [snapshot_id]):
+                        print(f"↩️ Snapshot (ID: {snapshot_id}) for wallet {wallet_address} already stored, skipping.")
+                        return
+                snapshot_id = self._insert_snapshot(cursor, wallet_address, snapshot_time_ms, parsed_data)
 
             self.conn.commit()
             print(f"✅ Successfully inserted snapshot (ID: {snapshot_id}) for wallet {wallet_address}.")
@@ -195,4 +464,258 @@ class MySQLStealthClient:
         except Exception as e:
             self.conn.rollback()
             print(f"❌ Database error during insertion. Rolled back transaction. Error: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def insert_hyperliquid_batch(self, items: List[Tuple[str, int, Dict]]) -> List[bool]:
+        """
+        Insert many parsed snapshots in a single transaction (one COMMIT).
+
+        Args:
+            items: (wallet_address, snapshot_time_ms, parsed_data) tuples.
+
+        Returns:
+            Per-item success flags, in input order.
+
+        The whole batch is first attempted without savepoints. If any snapshot
+        fails with a data error, the transaction is rolled back and retried with
+        a SAVEPOINT per snapshot, so only the bad snapshots are dropped.
+        Connection errors are raised for the caller to retry the batch.
+
+        With client ids the fast path is one multi-row INSERT per table (one
+        LOAD DATA LOCAL INFILE per table with bulk_load), and snapshots whose
+        id is already stored are skipped (reported as written). A partial
+        LOAD DATA also falls back to the isolated INSERT path.
+        """
+        if not self.conn:
+            raise ConnectionError("Database connection not established. Use 'with MySQLStealthClient(...) as client:'")
+        if not items:
+            return []
+
+        existing = set()
+        pending = items
+        try:
+            self._resolve_ids(items)
+            with self.conn.cursor() as cursor:
+                if self.client_ids:
+                    # Replays (and repeats within the batch): snapshots already stored count as written
+                    existing = self._existing_snapshot_ids(
+                        cursor, [self._client_snapshot_id(*item) for item in items]
+                    )
+                    pending = list({item[2]['snapshot_id']: item for item in items
+                                    if item[2]['snapshot_id'] not in existing}.values())
+                    if self.bulk_load:
+                        self._load_snapshots(cursor, pending)
+                    else:
+                        self._bulk_insert_snapshots(cursor, pending)
+                else:
+                    for wallet_address, snapshot_time_ms, parsed_data in items:
+                        self._insert_snapshot(cursor, wallet_address, snapshot_time_ms, parsed_data)
+            self.conn.commit()
+            if len(pending) < len(items):
+                logger.info(f"↩️ Skipped {len(items) - len(pending)} already stored snapshots")
+            logger.info(f"✅ Committed batch of {len(pending)} snapshots")
+            return [True] * len(items)
+
+        except CONNECTION_ERRORS:
+            self.conn.rollback()
+            raise
+        except Exception as e:
+            self.conn.rollback()
+            logger.warning(f"Batch of {len(items)} failed ({e}); retrying with per-snapshot isolation")
+
+        results = []
+        try:
+            with self.conn.cursor() as cursor:
+                for wallet_address, snapshot_time_ms, parsed_data in items:
+                    if parsed_data.get('snapshot_id') in existing:
+                        results.append(True)
+                        continue
+                    cursor.execute("SAVEPOINT snapshot_item")
+                    try:
+                        self._insert_snapshot(cursor, wallet_address, snapshot_time_ms, parsed_data)
+                        if self.client_ids:
+                            existing.add(parsed_data['snapshot_id'])
+                        results.append(True)
+                    except CONNECTION_ERRORS:
+                        raise
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT snapshot_item")
+                        logger.error(f"❌ Skipping snapshot for {wallet_address} at {snapshot_time_ms}: {e}")
+                        results.append(False)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        logger.info(f"✅ Committed {sum(results)}/{len(items)} snapshots (isolated batch)")
+        return results
+
+
+class DatabaseManager(SnapshotSink):
+    """
+    Inserts snapshots with retry logic for connection errors.
+
+    Each insert borrows a connection from the shared pool; tunnel restarts and
+    stale connections are handled there, so there is no per-insert ping.
+
+    `bulk_load=True` makes insert_batch use the LOAD DATA LOCAL INFILE writer
+    (e.g. for backfills); single inserts always use INSERT.
+
+    With `spool_dir`, snapshots that still fail after the retries are appended
+    to a local write-ahead spool (snapshot_spool) instead of being lost, and
+    reported as stored. Until the spool has been drained, later snapshots go
+    straight to the spool so collection is not slowed down by retries. A
+    background replayer bulk-writes the spool once the database is back.
+    A spool implies client ids, so a batch replayed twice (its commit outcome
+    was unknown) is not stored twice. Spooled snapshots are written before
+    any later snapshot goes to the database directly: the decision between
+    spool and database is taken under the replayer's lock.
+
+    With a `digest_cache` (snapshot_digest), snapshots whose material state
+    is unchanged since the wallet's last write are skipped (reported as
+    stored), apart from a periodic full heartbeat write.
+    """
+    
+    # Errors that should NOT be retried (data issues, not connection issues)
+    DATA_ERRORS = (1406, 1048, 1062, 1264, 1265, 1366)
+    
+    def __init__(self, db_config: Dict, ssh_config: Dict, client_ids: bool = False,
+                 bulk_load: bool = False, spool_dir: Optional[str] = None,
+                 digest_cache: Optional[SnapshotDigestCache] = None,
+                 order_storage: str = ORDER_STORAGE_ROWS,
+                 position_storage: str = POSITION_STORAGE_ROWS,
+                 dual_write: bool = False, latest_state: bool = False,
+                 rollups: bool = False):
+        self.db_config = db_config
+        self.ssh_config = ssh_config
+        self.client_ids = client_ids or bulk_load or bool(spool_dir)
+        self.bulk_load = bulk_load
+        self.order_storage = order_storage
+        self.position_storage = position_storage
+        self.dual_write = dual_write
+        self.latest_state = latest_state
+        self.rollups = rollups
+        super().__init__(digest_cache)
+        if digest_cache is not None and (rollups or latest_state):
+            logger.warning("⚠️ Skipped unchanged snapshots do not update rollups or latest state; "
+                           "they go stale between heartbeats")
+
+        # Write-ahead spool (optional)
+        self.spool: Optional[SnapshotSpool] = None
+        self.replayer: Optional[SpoolReplayer] = None
+        self.db_down = False
+        self._write_lock = threading.Lock()
+        if spool_dir:
+            self.spool = SnapshotSpool(spool_dir)
+            # A backlog left by an earlier run is written before new snapshots
+            self.db_down = self.spool.has_pending()
+            if self.db_down:
+                logger.info("💾 Spool has a backlog, spooling new snapshots until it is replayed")
+            self.replayer = SpoolReplayer(
+                self.spool, self._write_batch_once,
+                on_drained=self._on_spool_drained, lock=self._write_lock,
+            )
+            self.replayer.start()
+
+    def _client(self) -> MySQLStealthClient:
+        return MySQLStealthClient(
+            self.ssh_config, self.db_config, self.client_ids, self.bulk_load,
+            self.order_storage, self.position_storage, self.dual_write, self.latest_state,
+            self.rollups
+        )
+
+    def _write_batch_once(self, items: List[Tuple[str, int, Dict]]) -> List[bool]:
+        """Single batch attempt; raises on connection errors (spool replay)."""
+        with self._client() as client:
+            return client.insert_hyperliquid_batch(items)
+
+    def _spool_items(self, items: List[Tuple[str, int, Dict]]) -> List[bool]:
+        if not self.db_down:
+            logger.warning("💾 Database unavailable, spooling snapshots to disk until it is back")
+        self.db_down = True
+        self.spool.append_many(items)
+        return [True] * len(items)
+
+    def _on_spool_drained(self):
+        if self.db_down:
+            logger.info("💾 Spool drained, writing to the database directly again")
+        self.db_down = False
+    
+    def _insert(self, wallet: str, snapshot_time: int, parsed_data: Dict, max_retries: int) -> bool:
+        with self._write_lock:
+            return self._insert_locked(wallet, snapshot_time, parsed_data, max_retries)
+
+    def _insert_batch(self, items: List[Tuple[str, int, Dict]], max_retries: int) -> List[bool]:
+        with self._write_lock:
+            return self._insert_batch_locked(items, max_retries)
+
+    def _insert_locked(self, wallet: str, snapshot_time: int, parsed_data: Dict, max_retries: int) -> bool:
+        """Insert data with retry logic (only for connection errors)."""
+        if self.spool is not None and self.db_down:
+            return self._spool_items([(wallet, snapshot_time, parsed_data)])[0]
+        
+        for attempt in range(max_retries):
+            try:
+                with self._client() as client:
+                    client.insert_hyperliquid_data(
+                        wallet, snapshot_time, parsed_data
+                    )
+                return True
+                
+            except Exception as e:
+                error_code = e.args[0] if hasattr(e, 'args') and e.args else None
+                
+                # Data error - don't retry, it will always fail
+                if isinstance(error_code, int) and error_code in self.DATA_ERRORS:
+                    logger.error(f"❌ Data error (code {error_code}), skipping wallet: {e}")
+                    return False  # Exit immediately, no retry
+                
+                # Connection error - retry (the pool has already dropped the connection)
+                logger.warning(f"Insert failed (attempt {attempt + 1}/{max_retries}): {e}")
+                
+                if attempt == max_retries - 1:
+                    if self.spool is not None:
+                        return self._spool_items([(wallet, snapshot_time, parsed_data)])[0]
+                    logger.error(f"Failed to insert data for {wallet}")
+                    return False
+                
+                time.sleep(1)
+        
+        return False
+    
+    def _insert_batch_locked(self, items: List[Tuple[str, int, Dict]], max_retries: int) -> List[bool]:
+        """
+        Insert many snapshots in one transaction, retrying the whole batch on
+        connection errors. Data errors only fail the affected snapshots.
+        """
+        if self.spool is not None and self.db_down:
+            return self._spool_items(items)
+
+        for attempt in range(max_retries):
+            try:
+                return self._write_batch_once(items)
+            except Exception as e:
+                logger.warning(f"Batch insert failed (attempt {attempt + 1}/{max_retries}): {e}")
+                
+                if attempt == max_retries - 1:
+                    if self.spool is not None:
+                        return self._spool_items(items)
+                    logger.error(f"Failed to insert batch of {len(items)} snapshots")
+                    return [False] * len(items)
+                
+                time.sleep(1)
+        
+        return [False] * len(items)
+    
+    def close(self):
+        """Seal the spool, save the digest cache, close pooled connections and the SSH tunnel (process shutdown)."""
+        if self.replayer is not None:
+            self.replayer.stop()
+        if self.spool is not None:
+            self.spool.close()
+            logger.info(f"💾 Spool stats: {self.spool.stats()}")
+        super().close()
+        try:
+            close_all()
+        except Exception as e:
+            logger.warning(f"Error closing DB: {e}")
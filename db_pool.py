@@ -0,0 +1,337 @@
+import os
+import queue
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+from sshtunnel import SSHTunnelForwarder
+
+logger = logging.getLogger(__name__)
+
+# Defaults (get_pool reads DB_POOL_SIZE / DB_POOL_IDLE_CHECK_SECONDS from env)
+POOL_SIZE = 4
+IDLE_CHECK_SECONDS = 30
+ACQUIRE_TIMEOUT = 30
+
+# Errors after which a connection (and possibly the tunnel) is suspect
+CONNECTION_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+
+class TunnelManager:
+    """
+    Owns one SSH tunnel shared by every connection in the process.
+
+    The tunnel is started lazily and restarted when it is found inactive.
+    `generation` increases on every (re)start so pools can drop connections
+    that were opened through a previous tunnel.
+    """
+
+    def __init__(self, ssh_config: Dict[str, Any]):
+        self.ssh_config = ssh_config
+        self.generation = 0
+        self._tunnel: Optional[SSHTunnelForwarder] = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        tunnel_kwargs = {}
+        if self.ssh_config.get('ssh_pkey'):
+            tunnel_kwargs['ssh_pkey'] = self.ssh_config['ssh_pkey']
+        else:
+            logger.warning("SSH_KEY_PATH is empty. Ensure you are using SSH Agent or password auth.")
+        if self.ssh_config.get('local_bind_address'):
+            tunnel_kwargs['local_bind_address'] = self.ssh_config['local_bind_address']
+
+        self._tunnel = SSHTunnelForwarder(
+            ssh_address_or_host=(self.ssh_config['ssh_address_or_host'], self.ssh_config['ssh_port']),
+            ssh_username=self.ssh_config['ssh_username'],
+            remote_bind_address=self.ssh_config['remote_bind_address'],
+            **tunnel_kwargs
+        )
+        self._tunnel.start()
+        self.generation += 1
+        logger.info(
+            f"SSH tunnel established: localhost:{self._tunnel.local_bind_port} -> "
+            f"{self.ssh_config['remote_bind_address'][0]}:{self.ssh_config['remote_bind_address'][1]} "
+            f"via {self.ssh_config['ssh_address_or_host']} (generation {self.generation})"
+        )
+
+    def _stop(self):
+        if self._tunnel is not None:
+            try:
+                self._tunnel.stop()
+            except Exception as e:
+                logger.warning(f"Error stopping SSH tunnel: {e}")
+            self._tunnel = None
+
+    def local_address(self) -> Tuple[str, int]:
+        """Return the local end of the tunnel, (re)starting it if needed."""
+        with self._lock:
+            if self._tunnel is None or not self._tunnel.is_active:
+                if self._tunnel is not None:
+                    logger.warning("SSH tunnel inactive, restarting...")
+                self._stop()
+                self._start()
+            return '127.0.0.1', self._tunnel.local_bind_port
+
+    def check(self) -> bool:
+        """Return True if the tunnel is up; restart it otherwise."""
+        with self._lock:
+            if self._tunnel is not None and self._tunnel.is_active:
+                return True
+        self.local_address()
+        return False
+
+    @property
+    def local_bind_port(self) -> int:
+        return self.local_address()[1]
+
+    def stop(self):
+        with self._lock:
+            self._stop()
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled PyMySQL connection.
+
+    Behaves like the underlying connection; `close()` returns it to the pool
+    instead of closing the socket.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', conn: pymysql.connections.Connection, generation: int):
+        self._pool = pool
+        self._conn = conn
+        self._generation = generation
+        self.last_used = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @property
+    def raw(self) -> pymysql.connections.Connection:
+        return self._conn
+
+    def close(self, discard: bool = False):
+        self._pool.release(self, discard=discard)
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of PyMySQL connections, optionally through a shared tunnel.
+
+    Liveness is based on idle time: a connection idle for less than
+    `idle_check_seconds` is handed out without a round-trip; older ones are
+    pinged once (and replaced if the ping fails). Connections opened through a
+    previous tunnel generation are always replaced.
+    """
+
+    def __init__(
+        self,
+        connect_kwargs: Dict[str, Any],
+        direct_address: Optional[Tuple[str, int]] = None,
+        tunnel: Optional[TunnelManager] = None,
+        size: int = POOL_SIZE,
+        idle_check_seconds: float = IDLE_CHECK_SECONDS,
+    ):
+        if tunnel is None and direct_address is None:
+            raise ValueError("ConnectionPool needs either a tunnel or a direct address")
+        self.connect_kwargs = connect_kwargs
+        self.direct_address = direct_address
+        self.tunnel = tunnel
+        self.size = max(1, size)
+        self.idle_check_seconds = idle_check_seconds
+
+        self._idle: 'queue.LifoQueue[PooledConnection]' = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _address(self) -> Tuple[Tuple[str, int], int]:
+        if self.tunnel is not None:
+            address = self.tunnel.local_address()
+            return address, self.tunnel.generation
+        return self.direct_address, 0
+
+    def _open(self) -> PooledConnection:
+        (host, port), generation = self._address()
+        conn = pymysql.connect(host=host, port=port, **self.connect_kwargs)
+        return PooledConnection(self, conn, generation)
+
+    def _current_generation(self) -> int:
+        return self.tunnel.generation if self.tunnel is not None else 0
+
+    def _is_usable(self, pooled: PooledConnection) -> bool:
+        if not pooled.raw.open or pooled._generation != self._current_generation():
+            return False
+        if time.monotonic() - pooled.last_used < self.idle_check_seconds:
+            return True
+        try:
+            pooled.raw.ping(reconnect=False)
+            return True
+        except Exception as e:
+            logger.info(f"Dropping stale pooled connection: {e}")
+            return False
+
+    def _discard(self, pooled: PooledConnection):
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def acquire(self, timeout: float = ACQUIRE_TIMEOUT) -> PooledConnection:
+        """Take a live connection, opening one if the pool is below size."""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        deadline = time.monotonic() + timeout
+
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                pooled = None
+
+            if pooled is not None:
+                if self._is_usable(pooled):
+                    return pooled
+                self._discard(pooled)
+                continue
+
+            with self._lock:
+                can_open = self._created < self.size
+                if can_open:
+                    self._created += 1
+            if can_open:
+                try:
+                    return self._open()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    if self.tunnel is not None:
+                        self.tunnel.check()
+                    raise
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No pooled DB connection available after {timeout}s")
+            try:
+                pooled = self._idle.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            self._idle.put(pooled)
+
+    def release(self, pooled: PooledConnection, discard: bool = False):
+        """Return a connection; `discard=True` closes it (e.g. after a connection error)."""
+        if discard or self._closed or not pooled.raw.open:
+            self._discard(pooled)
+            if discard and self.tunnel is not None:
+                self.tunnel.check()
+            return
+        try:
+            if pooled.raw.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                pooled.raw.rollback()  # Never hand out a half-finished transaction
+        except Exception:
+            self._discard(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        self._idle.put(pooled)
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """Acquire a connection for the duration of a `with` block."""
+        pooled = self.acquire()
+        try:
+            yield pooled
+        except CONNECTION_ERRORS:
+            self.release(pooled, discard=True)
+            raise
+        except Exception:
+            self.release(pooled)
+            raise
+        else:
+            self.release(pooled)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+# --- Process-wide registry ---
+
+_registry_lock = threading.Lock()
+_tunnels: Dict[Tuple, TunnelManager] = {}
+_pools: Dict[Tuple, ConnectionPool] = {}
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def get_tunnel_manager(ssh_config: Dict[str, Any]) -> TunnelManager:
+    """Return the process-wide tunnel for this SSH config (load_env_config format)."""
+    key = _freeze({k: v for k, v in ssh_config.items() if k != 'use_tunnel'})
+    with _registry_lock:
+        manager = _tunnels.get(key)
+        if manager is None:
+            manager = _tunnels[key] = TunnelManager(ssh_config)
+        return manager
+
+
+def get_pool(ssh_config: Dict[str, Any], db_config: Dict[str, Any],
+             size: Optional[int] = None, **connect_kwargs) -> ConnectionPool:
+    """
+    Return the process-wide pool for this SSH/DB config (load_env_config format).
+
+    Extra keyword arguments are passed to pymysql.connect (e.g. cursorclass,
+    timeouts) and give the caller its own pool behind the same tunnel.
+    """
+    kwargs = {
+        'database': db_config['database'],
+        'user': db_config['user'],
+        'password': db_config.get('password'),
+        'cursorclass': pymysql.cursors.DictCursor,
+    }
+    kwargs.update(connect_kwargs)
+
+    key = _freeze((ssh_config, kwargs))
+    with _registry_lock:
+        pool = _pools.get(key)
+        if pool is not None:
+            return pool
+
+    pool_kwargs = {
+        'size': size if size is not None else int(os.environ.get('DB_POOL_SIZE', POOL_SIZE)),
+        'idle_check_seconds': float(os.environ.get('DB_POOL_IDLE_CHECK_SECONDS', IDLE_CHECK_SECONDS)),
+    }
+    if ssh_config.get('use_tunnel'):
+        pool = ConnectionPool(kwargs, tunnel=get_tunnel_manager(ssh_config), **pool_kwargs)
+    else:
+        pool = ConnectionPool(kwargs, direct_address=tuple(ssh_config['remote_bind_address']), **pool_kwargs)
+
+    with _registry_lock:
+        return _pools.setdefault(key, pool)
+
+
+def close_all():
+    """Close every pool and stop every tunnel (call at process shutdown)."""
+    with _registry_lock:
+        pools, tunnels = list(_pools.values()), list(_tunnels.values())
+        _pools.clear()
+        _tunnels.clear()
+    for pool in pools:
+        pool.close()
+    for tunnel in tunnels:
+        tunnel.stop()
@@ -2,6 +2,9 @@ import asyncio
 import json
 from websockets import connect
 
+from frame_router import (CHANNEL_ERROR, CHANNEL_SUBSCRIPTION_RESPONSE, CHANNEL_WEBDATA2,
+                          FrameRouter)
+
 WALLET_ADDRESS = "0x001d31846d08c23177011c6a523ed5b75823533e"
 URL = "wss://api.hyperliquid.xyz/ws"
 SOCKS_PROXY = "socks5://127.0.0.1:9050"  # Your Tor SOCKS5 proxy
@@ -38,11 +41,16 @@ async def debug_socks():
 
             # Wait for messages
             print("[+] Waiting for messages...")
+            router = FrameRouter({
+                CHANNEL_WEBDATA2: lambda msg: True,
+                CHANNEL_SUBSCRIPTION_RESPONSE: lambda msg: print("[+] Subscription acknowledged"),
+                CHANNEL_ERROR: lambda msg: print(f"[ERROR] Server error frame: {msg[:200]}"),
+            })
             while True:
                 msg = await asyncio.wait_for(ws.recv(), timeout=15)
                 print(f"[MSG] {msg}...")  # Print first 200 chars
                 print(msg)
-                if "webData2" in msg:
+                if router.route(msg):
                     print("[✓] Received target data!")
                     return
 
@@ -0,0 +1,80 @@
+import logging
+import re
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Channels of the frames the monitors receive
+CHANNEL_WEBDATA2 = 'webData2'
+CHANNEL_SUBSCRIPTION_RESPONSE = 'subscriptionResponse'
+CHANNEL_PONG = 'pong'
+CHANNEL_ERROR = 'error'
+
+# The server writes "channel" first ({"channel":"webData2","data":...}),
+# so only this many leading characters/bytes of a frame are inspected
+PREFIX_SIZE = 64
+
+# Fast path: the exact start of the server's (compact) webData2 frames
+_WEBDATA2_PREFIX = '{"channel":"webData2"'
+_WEBDATA2_PREFIX_BYTES = _WEBDATA2_PREFIX.encode('ascii')
+
+_CHANNEL_START = re.compile(r'\{\s*"channel"\s*:\s*"([^"]*)"')
+_CHANNEL = re.compile(r'"channel"\s*:\s*"([^"]*)"')
+_CHANNEL_START_BYTES = re.compile(rb'\{\s*"channel"\s*:\s*"([^"]*)"')
+_CHANNEL_BYTES = re.compile(rb'"channel"\s*:\s*"([^"]*)"')
+
+Frame = Union[str, bytes]
+Handler = Callable[[Frame], Any]
+
+
+def classify(msg: Frame) -> Optional[str]:
+    """
+    Channel of a raw frame, read from its first PREFIX_SIZE characters (str)
+    or bytes (bytes, not UTF-8 decoded). The rest of the frame is never scanned.
+
+    Returns:
+        The channel name, or None if no "channel" key starts within the prefix.
+    """
+    if isinstance(msg, str):
+        if msg.startswith(_WEBDATA2_PREFIX):
+            return CHANNEL_WEBDATA2
+        match = _CHANNEL_START.match(msg) or _CHANNEL.search(msg, 0, PREFIX_SIZE)
+        return match[1] if match else None
+    if msg.startswith(_WEBDATA2_PREFIX_BYTES):
+        return CHANNEL_WEBDATA2
+    match = _CHANNEL_START_BYTES.match(msg) or _CHANNEL_BYTES.search(msg, 0, PREFIX_SIZE)
+    return match[1].decode('ascii', 'replace') if match else None
+
+
+def log_error_frame(msg: Frame) -> None:
+    """Default handler for server error frames."""
+    if isinstance(msg, bytes):
+        msg = msg.decode('utf-8', 'replace')
+    logger.warning(f"⚠️ Server error frame: {msg[:200]}")
+
+
+class FrameRouter:
+    """
+    Dispatches raw frames to a handler per channel, classified by classify().
+
+    Frames whose channel has no handler (or cannot be classified) go to
+    `default`, if set. `route` returns whatever the handler returns, so
+    async callers can register coroutine functions and await the result.
+    """
+
+    def __init__(self, handlers: Optional[Dict[str, Handler]] = None, default: Optional[Handler] = None):
+        self.handlers: Dict[str, Handler] = dict(handlers or {})
+        self.default = default
+        self.counts: Dict[Optional[str], int] = {}
+
+    def on(self, channel: str, handler: Handler) -> Handler:
+        self.handlers[channel] = handler
+        return handler
+
+    def route(self, msg: Frame) -> Any:
+        channel = classify(msg)
+        self.counts[channel] = self.counts.get(channel, 0) + 1
+        handler = self.handlers.get(channel, self.default)
+        if handler is None:
+            return None
+        return handler(msg)
@@ -0,0 +1,132 @@
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import json_codec
+from frame_router import CHANNEL_WEBDATA2, classify
+from hyperliquid_parser import ORDER_DEFAULTS, POSITION_DEFAULTS, SUMMARY_DEFAULTS
+
+# Value columns of each table, in parse_hyperliquid_data's field order
+SNAPSHOT_COLUMNS = ('user', 'snapshot_time_ms', 'account_value', 'total_ntl_pos', 'total_raw_usd',
+                    'total_margin_used', 'withdrawable', 'cross_maintenance_margin_used')
+POSITION_COLUMNS = ('coin', 'type', 'size', 'leverage_type', 'leverage_value', 'entry_price',
+                    'position_value', 'unrealized_pnl', 'return_on_equity')
+ORDER_COLUMNS = ('order_id', 'coin', 'side', 'limit_price', 'quantity', 'timestamp_ms',
+                 'order_type', 'reduce_only', 'time_in_force')
+
+# Index columns: array('q'), so NumPy/Arrow can wrap them without copying
+INDEX_TYPECODE = 'q'
+
+Frame = Union[str, bytes, dict]
+Columns = Dict[str, Union[List[Any], array]]
+
+_EMPTY: Dict[str, Any] = {}
+
+
+def _data(frame: Frame) -> Optional[dict]:
+    if isinstance(frame, dict):
+        return frame
+    if classify(frame) != CHANNEL_WEBDATA2:
+        return None  # subscription acks, pongs, errors: not snapshots
+    return json_codec.loads(frame).get("data")
+
+
+def parse_hyperliquid_data_batch(frames: Iterable[Frame]) -> Dict[str, Columns]:
+    """
+    Parse many webData2 frames into struct-of-arrays buffers, one array per
+    column, instead of a dict tree per frame.
+
+    `frames` are raw messages (str/bytes, decoded with json_codec) or already
+    decoded `data` objects. As in ingest_pipeline.decode_frame, only webData2
+    frames with a `clearinghouseState.time` become snapshots; anything else
+    (subscription acks, pongs, errors) is skipped. Values and NOT NULL
+    defaults are the same as hyperliquid_parser.parse_hyperliquid_data's.
+
+    Returns:
+        {"snapshots": ..., "positions": ..., "orders": ...}, each a dict of
+        equal-length columns. `snapshots["frame"]` is the index of the input
+        frame (skipped frames leave gaps), and `positions["snapshot"]` /
+        `orders["snapshot"]` are the row index of their snapshot. Index
+        columns are array('q'), value columns are lists.
+
+    Raises:
+        json_codec.DecodeError: A raw frame is not valid JSON.
+    """
+    snapshots: Columns = {'frame': array(INDEX_TYPECODE), **{c: [] for c in SNAPSHOT_COLUMNS}}
+    positions: Columns = {'snapshot': array(INDEX_TYPECODE), **{c: [] for c in POSITION_COLUMNS}}
+    orders: Columns = {'snapshot': array(INDEX_TYPECODE), **{c: [] for c in ORDER_COLUMNS}}
+
+    # Bound appends, one per column (the hot loops do nothing else)
+    s_frame, s_user, s_time, s_account, s_ntl, s_raw, s_margin, s_withdrawable, s_maintenance = (
+        snapshots[c].append for c in ('frame',) + SNAPSHOT_COLUMNS)
+    p_snapshot, p_coin, p_type, p_size, p_lev_type, p_lev_value, p_entry, p_value, p_pnl, p_roe = (
+        positions[c].append for c in ('snapshot',) + POSITION_COLUMNS)
+    o_snapshot, o_id, o_coin, o_side, o_price, o_qty, o_time, o_type, o_reduce, o_tif = (
+        orders[c].append for c in ('snapshot',) + ORDER_COLUMNS)
+
+    S, P, O = SUMMARY_DEFAULTS, POSITION_DEFAULTS, ORDER_DEFAULTS
+    row = 0
+    for index, frame in enumerate(frames):
+        data = _data(frame)
+        if not isinstance(data, dict):
+            continue
+
+        clearinghouse_state = data.get("clearinghouseState") or _EMPTY
+        snapshot_time_ms = clearinghouse_state.get("time")
+        if not snapshot_time_ms:
+            continue
+        get = (clearinghouse_state.get("marginSummary") or _EMPTY).get
+
+        s_frame(index)
+        s_user(data.get("user"))
+        s_time(snapshot_time_ms)
+        s_account(S["account_value"] if (v := get("accountValue")) is None else v)
+        s_ntl(S["total_ntl_pos"] if (v := get("totalNtlPos")) is None else v)
+        s_raw(S["total_raw_usd"] if (v := get("totalRawUsd")) is None else v)
+        s_margin(S["total_margin_used"] if (v := get("totalMarginUsed")) is None else v)
+        s_withdrawable(S["withdrawable"] if (v := clearinghouse_state.get("withdrawable")) is None else v)
+        s_maintenance(clearinghouse_state.get("crossMaintenanceMarginUsed"))
+
+        for asset_data in clearinghouse_state.get("assetPositions") or ():
+            position = asset_data.get("position") or _EMPTY
+            get = position.get
+            size = P["size"] if (v := get("szi")) is None else v
+            coin = get("coin")
+            # Only positions with non-zero size and a valid coin name
+            if size == "0" or not coin:
+                continue
+            leverage = get("leverage") or _EMPTY
+            p_snapshot(row)
+            p_coin(coin)
+            p_type(P["type"] if (v := asset_data.get("type")) is None else v)
+            p_size(size)
+            p_lev_type(P["leverage_type"] if (v := leverage.get("type")) is None else v)
+            p_lev_value(P["leverage_value"] if (v := leverage.get("value")) is None else v)
+            p_entry(get("entryPx"))
+            p_value(P["position_value"] if (v := get("positionValue")) is None else v)
+            p_pnl(P["unrealized_pnl"] if (v := get("unrealizedPnl")) is None else v)
+            p_roe(P["return_on_equity"] if (v := get("returnOnEquity")) is None else v)
+
+        for order in data.get("openOrders") or ():
+            get = order.get
+            order_id = get("oid")
+            if order_id is None:
+                continue
+            o_snapshot(row)
+            o_id(order_id)
+            o_coin(O["coin"] if (v := get("coin")) is None else v)
+            o_side(O["side"] if (v := get("side")) is None else v)
+            o_price(O["limit_price"] if (v := get("limitPx")) is None else v)
+            o_qty(O["quantity"] if (v := get("sz")) is None else v)
+            o_time(O["timestamp_ms"] if (v := get("timestamp")) is None else v)
+            o_type(O["order_type"] if (v := get("orderType")) is None else v)
+            o_reduce(O["reduce_only"] if (v := get("reduceOnly")) is None else v)
+            o_tif(O["time_in_force"] if (v := get("tif")) is None else v)
+
+        row += 1
+
+    return {"snapshots": snapshots, "positions": positions, "orders": orders}
+
+
+def rows(columns: Columns, names: Iterable[str]) -> List[tuple]:
+    """Row tuples of `names` out of one table's columns, e.g. for bulk_loader.load_rows."""
+    return list(zip(*(columns[name] for name in names)))
@@ -2,6 +2,36 @@ import json
 from typing import Dict, List, Any
 import datetime
 
+# NOT NULL defaults by output field, used when the source field is missing or null.
+# Shared by every parser (hyperliquid_structs, hyperliquid_batch) so they cannot drift apart.
+SUMMARY_DEFAULTS = {
+    "account_value": "0.0",
+    "total_ntl_pos": "0.0",
+    "total_raw_usd": "0.0",
+    "total_margin_used": "0.0",
+    "withdrawable": "0.0",
+}
+POSITION_DEFAULTS = {
+    "coin": "",
+    "type": "oneWay",
+    "size": "0",
+    "leverage_type": "cross",
+    "leverage_value": 1,
+    "position_value": "0.0",
+    "unrealized_pnl": "0.0",
+    "return_on_equity": "0.0",
+}
+ORDER_DEFAULTS = {
+    "coin": "",
+    "side": "",
+    "limit_price": "0.0",
+    "quantity": "0.0",
+    "timestamp_ms": 0,
+    "order_type": "Limit",
+    "reduce_only": False,
+    "time_in_force": "Gtc",
+}
+
 def safe_get(data: dict, key: str, default: Any):
     """Safely retrieves a key, returning default if None or missing."""
     # Check for both missing key and explicit None value
@@ -27,14 +57,14 @@ def parse_hyperliquid_data(data: dict) -> dict:
         "snapshot_time_ms": snapshot_time_ms, 
         
         # Core margin summary fields are expected to be NOT NULL, must have defaults
-        "account_value": safe_get(margin_summary, "accountValue", "0.0"),
-        "total_ntl_pos": safe_get(margin_summary, "totalNtlPos", "0.0"),
-        "total_raw_usd": safe_get(margin_summary, "totalRawUsd", "0.0"),
-        "total_margin_used": safe_get(margin_summary, "totalMarginUsed", "0.0"),
+        "account_value": safe_get(margin_summary, "accountValue", SUMMARY_DEFAULTS["account_value"]),
+        "total_ntl_pos": safe_get(margin_summary, "totalNtlPos", SUMMARY_DEFAULTS["total_ntl_pos"]),
+        "total_raw_usd": safe_get(margin_summary, "totalRawUsd", SUMMARY_DEFAULTS["total_raw_usd"]),
+        "total_margin_used": safe_get(margin_summary, "totalMarginUsed", SUMMARY_DEFAULTS["total_margin_used"]),
         
         # FIX: Correctly locate 'withdrawable' at clearinghouseState level and provide non-null default.
         # It was causing the (1048, "Column 'withdrawable' cannot be null") error.
-        "withdrawable": safe_get(clearinghouse_state, "withdrawable", "0.0"), 
+        "withdrawable": safe_get(clearinghouse_state, "withdrawable", SUMMARY_DEFAULTS["withdrawable"]), 
         
         # 'cross_maintenance_margin_used' is treated as nullable (can be None)
         "cross_maintenance_margin_used": clearinghouse_state.get("crossMaintenanceMarginUsed"),
@@ -48,8 +78,8 @@ def parse_hyperliquid_data(data: dict) -> dict:
         position = asset_data.get("position", {})
         leverage = position.get("leverage", {})
         
-        size_str = safe_get(position, "szi", "0")
-        coin = safe_get(position, "coin", "")
+        size_str = safe_get(position, "szi", POSITION_DEFAULTS["size"])
+        coin = safe_get(position, "coin", POSITION_DEFAULTS["coin"])
         
         # Only process positions with non-zero size and a valid coin name
         if size_str != "0" and coin:
@@ -57,18 +87,18 @@ def parse_hyperliquid_data(data: dict) -> dict:
             asset_positions.append({
                 "coin": coin,
                 # Correct location for 'type' (fixes previous issue)
-                "type": safe_get(asset_data, "type", "oneWay"), 
+                "type": safe_get(asset_data, "type", POSITION_DEFAULTS["type"]), 
                 "size": size_str, 
-                "leverage_type": safe_get(leverage, "type", "cross"), 
-                "leverage_value": safe_get(leverage, "value", 1), 
+                "leverage_type": safe_get(leverage, "type", POSITION_DEFAULTS["leverage_type"]), 
+                "leverage_value": safe_get(leverage, "value", POSITION_DEFAULTS["leverage_value"]), 
                 
                 # entry_price can be null
                 "entry_price": position.get("entryPx"), 
                 
                 # These fields are NOT NULL
-                "position_value": safe_get(position, "positionValue", "0.0"), 
-                "unrealized_pnl": safe_get(position, "unrealizedPnl", "0.0"),
-                "return_on_equity": safe_get(position, "returnOnEquity", "0.0"),
+                "position_value": safe_get(position, "positionValue", POSITION_DEFAULTS["position_value"]), 
+                "unrealized_pnl": safe_get(position, "unrealizedPnl", POSITION_DEFAULTS["unrealized_pnl"]),
+                "return_on_equity": safe_get(position, "returnOnEquity", POSITION_DEFAULTS["return_on_equity"]),
             })
 
     # 3. Extract Open Orders (hyperliquid_open_orders)
@@ -79,14 +109,14 @@ def parse_hyperliquid_data(data: dict) -> dict:
         if order.get("oid") is not None:
             open_orders.append({
                 "order_id": order.get("oid"),
-                "coin": safe_get(order, "coin", ""),
-                "side": safe_get(order, "side", ""),
-                "limit_price": safe_get(order, "limitPx", "0.0"), 
-                "quantity": safe_get(order, "sz", "0.0"), 
-                "timestamp_ms": safe_get(order, "timestamp", 0),
-                "order_type": safe_get(order, "orderType", "Limit"),
-                "reduce_only": safe_get(order, "reduceOnly", False),
-                "time_in_force": safe_get(order, "tif", "Gtc"),
+                "coin": safe_get(order, "coin", ORDER_DEFAULTS["coin"]),
+                "side": safe_get(order, "side", ORDER_DEFAULTS["side"]),
+                "limit_price": safe_get(order, "limitPx", ORDER_DEFAULTS["limit_price"]), 
+                "quantity": safe_get(order, "sz", ORDER_DEFAULTS["quantity"]), 
+                "timestamp_ms": safe_get(order, "timestamp", ORDER_DEFAULTS["timestamp_ms"]),
+                "order_type": safe_get(order, "orderType", ORDER_DEFAULTS["order_type"]),
+                "reduce_only": safe_get(order, "reduceOnly", ORDER_DEFAULTS["reduce_only"]),
+                "time_in_force": safe_get(order, "tif", ORDER_DEFAULTS["time_in_force"]),
             })
 
     # 4. Combine and Return
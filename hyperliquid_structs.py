@@ -0,0 +1,176 @@
+import datetime
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from hyperliquid_parser import ORDER_DEFAULTS, POSITION_DEFAULTS, SUMMARY_DEFAULTS, parse_hyperliquid_data
+
+
+class Record:
+    """
+    Read-only mapping interface for the slot structs, so they can stand in for
+    the parser's dicts: `record['coin']`, `.get()`, `.items()`, iteration.
+
+    An unknown key raises AttributeError rather than KeyError.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def keys(self) -> tuple:
+        return self.__slots__
+
+    def items(self) -> List[tuple]:
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __reduce__(self):
+        # Positional fields: smaller and faster to pickle (parse workers) than the slots state dict
+        return type(self), tuple(getattr(self, key) for key in self.__slots__)
+
+
+@dataclass(slots=True)
+class Summary(Record):
+    snapshot_time_ms: int
+    account_value: str
+    total_ntl_pos: str
+    total_raw_usd: str
+    total_margin_used: str
+    withdrawable: str
+    cross_maintenance_margin_used: Optional[str]
+
+
+@dataclass(slots=True)
+class Position(Record):
+    coin: str
+    type: str
+    size: str
+    leverage_type: str
+    leverage_value: int
+    entry_price: Optional[str]
+    position_value: str
+    unrealized_pnl: str
+    return_on_equity: str
+
+
+@dataclass(slots=True)
+class Order(Record):
+    order_id: int
+    coin: str
+    side: str
+    limit_price: str
+    quantity: str
+    timestamp_ms: int
+    order_type: str
+    reduce_only: bool
+    time_in_force: str
+
+
+def to_json(value: Any) -> Any:
+    """`default=` hook for json.dumps of parsed data that contains structs."""
+    if isinstance(value, Record):
+        return value.as_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_EMPTY: Dict[str, Any] = {}
+
+
+def parse_hyperliquid_structs(data: dict) -> dict:
+    """
+    Same result shape and NOT NULL defaults as hyperliquid_parser.parse_hyperliquid_data,
+    with the summary, positions and orders as slot structs.
+
+    Each field is read with a single dict.get and a None check inline
+    (safe_get does two lookups and a call per field), and nothing but the
+    structs is allocated per position/order.
+    """
+    S, P, O = SUMMARY_DEFAULTS, POSITION_DEFAULTS, ORDER_DEFAULTS
+    clearinghouse_state = data.get("clearinghouseState") or _EMPTY
+    margin_summary = clearinghouse_state.get("marginSummary") or _EMPTY
+    get = margin_summary.get
+
+    snapshot_time_ms = clearinghouse_state.get("time")
+    if snapshot_time_ms is None:
+        snapshot_time_ms = int(datetime.datetime.now().timestamp() * 1000)
+
+    summary = Summary(
+        snapshot_time_ms,
+        S["account_value"] if (v := get("accountValue")) is None else v,
+        S["total_ntl_pos"] if (v := get("totalNtlPos")) is None else v,
+        S["total_raw_usd"] if (v := get("totalRawUsd")) is None else v,
+        S["total_margin_used"] if (v := get("totalMarginUsed")) is None else v,
+        S["withdrawable"] if (v := clearinghouse_state.get("withdrawable")) is None else v,
+        clearinghouse_state.get("crossMaintenanceMarginUsed"),
+    )
+
+    asset_positions = []
+    for asset_data in clearinghouse_state.get("assetPositions") or ():
+        position = asset_data.get("position") or _EMPTY
+        get = position.get
+        size = P["size"] if (v := get("szi")) is None else v
+        coin = get("coin")
+        # Only positions with non-zero size and a valid coin name
+        if size == "0" or not coin:
+            continue
+        leverage = get("leverage") or _EMPTY
+        asset_positions.append(Position(
+            coin,
+            P["type"] if (v := asset_data.get("type")) is None else v,
+            size,
+            P["leverage_type"] if (v := leverage.get("type")) is None else v,
+            P["leverage_value"] if (v := leverage.get("value")) is None else v,
+            get("entryPx"),
+            P["position_value"] if (v := get("positionValue")) is None else v,
+            P["unrealized_pnl"] if (v := get("unrealizedPnl")) is None else v,
+            P["return_on_equity"] if (v := get("returnOnEquity")) is None else v,
+        ))
+
+    open_orders = []
+    for order in data.get("openOrders") or ():
+        get = order.get
+        order_id = get("oid")
+        if order_id is None:
+            continue
+        open_orders.append(Order(
+            order_id,
+            O["coin"] if (v := get("coin")) is None else v,
+            O["side"] if (v := get("side")) is None else v,
+            O["limit_price"] if (v := get("limitPx")) is None else v,
+            O["quantity"] if (v := get("sz")) is None else v,
+            O["timestamp_ms"] if (v := get("timestamp")) is None else v,
+            O["order_type"] if (v := get("orderType")) is None else v,
+            O["reduce_only"] if (v := get("reduceOnly")) is None else v,
+            O["time_in_force"] if (v := get("tif")) is None else v,
+        ))
+
+    return {
+        "summary": summary,
+        "asset_positions": asset_positions,
+        "open_orders": open_orders,
+        "snapshot_time_ms": snapshot_time_ms,
+    }
+
+
+# --parser choices of the monitors
+PARSER_DICTS = 'dicts'
+PARSER_STRUCTS = 'structs'
+PARSERS: Dict[str, Callable[[dict], dict]] = {
+    PARSER_DICTS: parse_hyperliquid_data,
+    PARSER_STRUCTS: parse_hyperliquid_structs,
+}
@@ -1,24 +1,34 @@
 import argparse
+import asyncio
 import ssl
 import base64
 import os
 import json
 import random
-import re
 import time
 import logging
-from typing import Optional, List, Dict, Any
+from collections import deque
+from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
 from urllib.parse import urlparse
 
 import socks
 import socket
-from websocket import create_connection, WebSocket
+from websocket import create_connection, WebSocket, WebSocketTimeoutException
+from websockets import connect as ws_connect
 import pymysql
 
 # Your custom imports
-from data_inserter_env import load_env_config, MySQLStealthClient
-from hyperliquid_parser import parse_hyperliquid_data
+from data_inserter_env import load_env_config
+from sinks import SINKS, SINK_MYSQL, create_sink
+from hyperliquid_structs import PARSERS, PARSER_DICTS
+import json_codec
+from frame_router import CHANNEL_ERROR, CHANNEL_WEBDATA2, classify, log_error_frame
+from async_collector import AsyncCollector
+from ingest_pipeline import IngestPipeline, PARSE_WORKERS, FRAME_QUEUE_SIZE, BATCH_SIZE, BATCH_MAX_AGE
+from snapshot_digest import SnapshotDigestCache, HEARTBEAT_INTERVAL
+from order_intervals import ORDER_STORAGE_MODES, ORDER_STORAGE_ROWS
+from position_intervals import POSITION_STORAGE_MODES, POSITION_STORAGE_ROWS
 
 # --- Logging Setup ---
 logging.basicConfig(
@@ -30,12 +40,24 @@ logger = logging.getLogger(__name__)
 
 # --- Constants ---
 URL = "wss://api.hyperliquid.xyz/ws"
-PATTERN = re.compile(r'"channel"\s*:\s*"webData2"')
 
 # Rotation intervals
 SSL_ROTATE_INTERVAL = 10      # Rotate SSL context every N wallets
 TOR_ROTATE_INTERVAL = 20      # Rotate Tor identity every N wallets
 
+# Multiplexing (1 subscription per connection = legacy one-wallet-per-connect mode)
+SUBSCRIPTIONS_PER_CONNECTION = 1   # Concurrent webData2 subscriptions on one socket
+WALLETS_PER_CONNECTION = 200       # Wallets served by one socket before reconnecting
+
+# Asyncio engine (1 = legacy serial loop)
+CONCURRENCY = 1                    # Connections kept in flight at once
+
+# Streaming mode
+MIN_WRITE_INTERVAL = 60            # Seconds between stored updates per wallet
+
+# LOAD DATA only writes batches: batch size used by --bulk-load without --batch-size
+BULK_LOAD_BATCH_SIZE = 200
+
 
 def load_wallets(filepath: str = 'wallets.txt') -> List[str]:
     """Load wallets from file."""
@@ -245,84 +267,6 @@ class HeaderGenerator:
         return headers
 
 
-class DatabaseManager:
-    """Manages database connection with auto-reconnect."""
-    
-    # Errors that should NOT be retried (data issues, not connection issues)
-    DATA_ERRORS = (1406, 1048, 1062, 1264, 1265, 1366)
-    
-    def __init__(self, db_config: Dict, ssh_config: Dict):
-        self.db_config = db_config
-        self.ssh_config = ssh_config
-        self._client: Optional[MySQLStealthClient] = None
-    
-    def _ensure_connection(self):
-        """Ensure database connection is active."""
-        if self._client is None:
-            self._connect()
-            return
-        
-        try:
-            self._client.conn.ping(reconnect=True)
-        except Exception as e:
-            logger.warning(f"DB connection lost: {e}. Reconnecting...")
-            self.close()
-            self._connect()
-    
-    def _connect(self):
-        """Establish database connection."""
-        try:
-            self._client = MySQLStealthClient(self.ssh_config, self.db_config)
-            self._client.__enter__()
-            logger.info("Database connected")
-        except Exception as e:
-            logger.error(f"Database connection failed: {e}")
-            self._client = None
-            raise
-    
-    def insert(self, wallet: str, snapshot_time: int, 
-               parsed_data: Dict, max_retries: int = 3) -> bool:
-        """Insert data with retry logic (only for connection errors)."""
-        
-        for attempt in range(max_retries):
-            try:
-                self._ensure_connection()
-                self._client.insert_hyperliquid_data(
-                    wallet, snapshot_time, parsed_data
-                )
-                return True
-                
-            except Exception as e:
-                error_code = e.args[0] if hasattr(e, 'args') and e.args else None
-                
-                # Data error - don't retry, it will always fail
-                if isinstance(error_code, int) and error_code in self.DATA_ERRORS:
-                    logger.error(f"❌ Data error (code {error_code}), skipping wallet: {e}")
-                    return False  # Exit immediately, no retry
-                
-                # Connection error - retry
-                logger.warning(f"Insert failed (attempt {attempt + 1}/{max_retries}): {e}")
-                self.close()
-                
-                if attempt == max_retries - 1:
-                    logger.error(f"Failed to insert data for {wallet}")
-                    return False
-                
-                time.sleep(1)
-        
-        return False
-    
-    def close(self):
-        """Close database connection."""
-        if self._client:
-            try:
-                self._client.__exit__(None, None, None)
-            except Exception as e:
-                logger.warning(f"Error closing DB: {e}")
-            finally:
-                self._client = None
-
-
 class HyperliquidMonitor:
     """
     Synchronous WebSocket monitor for Hyperliquid wallets.
@@ -340,6 +284,28 @@ class HyperliquidMonitor:
         timeout_seconds: int = 60,
         ssl_rotate_interval: int = SSL_ROTATE_INTERVAL,
         tor_rotate_interval: int = TOR_ROTATE_INTERVAL,
+        subscriptions_per_connection: int = SUBSCRIPTIONS_PER_CONNECTION,
+        wallets_per_connection: int = WALLETS_PER_CONNECTION,
+        concurrency: int = CONCURRENCY,
+        stream: bool = False,
+        min_write_interval: float = MIN_WRITE_INTERVAL,
+        parse_workers: int = PARSE_WORKERS,
+        queue_size: int = FRAME_QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        batch_max_age: float = BATCH_MAX_AGE,
+        client_ids: bool = False,
+        bulk_load: bool = False,
+        spool_dir: Optional[str] = None,
+        digest_cache: Optional[SnapshotDigestCache] = None,
+        order_storage: str = ORDER_STORAGE_ROWS,
+        position_storage: str = POSITION_STORAGE_ROWS,
+        dual_write: bool = False,
+        latest_state: bool = False,
+        rollups: bool = False,
+        sink: str = SINK_MYSQL,
+        sink_path: Optional[str] = None,
+        parser: str = PARSER_DICTS,
+        partial_decode: bool = False,
     ):
         self.wallets = wallets
         self.proxy = proxy_config
@@ -347,18 +313,49 @@ class HyperliquidMonitor:
         self.timeout = timeout_seconds
         self.ssl_rotate_interval = ssl_rotate_interval
         self.tor_rotate_interval = tor_rotate_interval
+        self.subscriptions_per_connection = max(1, subscriptions_per_connection)
+        self.wallets_per_connection = max(self.subscriptions_per_connection, wallets_per_connection)
+        self.concurrency = max(1, concurrency)
+        self.stream = stream
+        self.min_write_interval = min_write_interval
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        if bulk_load and batch_size <= 1:
+            logger.warning(f"⚠️ Bulk load only writes batches, using a batch size of {BULK_LOAD_BATCH_SIZE}")
+            batch_size = BULK_LOAD_BATCH_SIZE
+        if bulk_load and self.concurrency == 1 and not stream:
+            logger.warning("⚠️ Bulk load only applies to the async engine (--concurrency > 1 or --stream)")
+        self.batch_size = batch_size
+        self.batch_max_age = batch_max_age
+        self.parse = PARSERS[parser]
+        self.partial_decode = partial_decode
+        
+        # Asyncio engine state (only used when concurrency > 1 or streaming)
+        self.collector: Optional[AsyncCollector] = None
+        self.pipeline: Optional[IngestPipeline] = None
+        self._rotation_lock: Optional[asyncio.Lock] = None
+        
+        # Rotation marks (wallets_processed // interval at the last check)
+        self._tor_mark = 0
+        self._ssl_mark = 0
         
         # SSL context and headers (will be rotated)
         self._ssl_context = SSLContextFactory.create()
         self._headers = HeaderGenerator.generate()
         
-        # Database manager
-        self.db = DatabaseManager(db_config, ssh_config)
+        # Snapshot sink (DatabaseManager for MySQL)
+        self.db = create_sink(
+            sink, sink_path, db_config, ssh_config, client_ids=client_ids, bulk_load=bulk_load,
+            spool_dir=spool_dir, digest_cache=digest_cache, order_storage=order_storage,
+            position_storage=position_storage, dual_write=dual_write, latest_state=latest_state,
+            rollups=rollups,
+        )
         
         # Stats
         self.wallets_processed = 0
         self.successful = 0
         self.failed = 0
+        self.collect_failures = 0  # Async engine: wallets for which no frame was received
         self.connection_errors = 0
         self.start_time = None
     
@@ -388,12 +385,20 @@ class HyperliquidMonitor:
         if self.wallets_processed == 0:
             return
         
+        # Compare interval marks rather than using modulo so that batches
+        # (which advance wallets_processed by more than one) still trigger.
+        tor_mark = self.wallets_processed // self.tor_rotate_interval
+        ssl_mark = self.wallets_processed // self.ssl_rotate_interval
+        
         # Tor rotation takes priority (includes SSL rotation)
-        if self.wallets_processed % self.tor_rotate_interval == 0:
+        if tor_mark > self._tor_mark:
             self._rotate_full_identity(f"every {self.tor_rotate_interval} wallets")
         # SSL-only rotation (if not already doing Tor rotation)
-        elif self.wallets_processed % self.ssl_rotate_interval == 0:
+        elif ssl_mark > self._ssl_mark:
             self._rotate_ssl_only()
+        
+        self._tor_mark = tor_mark
+        self._ssl_mark = ssl_mark
     
     def _create_socks_socket(self, host: str, port: int) -> socket.socket:
         """Create a socket connected through SOCKS5 proxy."""
@@ -432,6 +437,34 @@ class HyperliquidMonitor:
         logger.debug("WebSocket connected")
         return ws
     
+    async def _connect_websocket_async(self):
+        """Create an asyncio WebSocket connection via SOCKS5 proxy."""
+        parsed = urlparse(URL)
+        host = parsed.hostname
+        port = parsed.port or 443
+        
+        # The SOCKS5 handshake is blocking; keep it off the event loop
+        loop = asyncio.get_running_loop()
+        sock = await loop.run_in_executor(None, self._create_socks_socket, host, port)
+        
+        # Host and version headers are generated by the websockets handshake
+        headers = {
+            k: v for k, v in self._headers.items()
+            if k not in ("Host", "Sec-WebSocket-Version")
+        }
+        
+        ws = await ws_connect(
+            URL,
+            sock=sock,
+            ssl=self._ssl_context,
+            server_hostname=host,
+            extra_headers=headers,
+            open_timeout=self.timeout,
+        )
+        
+        logger.debug("WebSocket connected (async)")
+        return ws
+    
     def _subscribe(self, ws: WebSocket, wallet: str):
         """Subscribe to wallet updates."""
         msg = json.dumps({
@@ -441,6 +474,46 @@ class HyperliquidMonitor:
         ws.send(msg)
         logger.debug(f"Subscribed to: {wallet[:16]}...")
     
+    def _unsubscribe(self, ws: WebSocket, wallet: str):
+        """Unsubscribe from wallet updates, freeing the slot on this connection."""
+        msg = json.dumps({
+            "method": "unsubscribe",
+            "subscription": {"type": "webData2", "user": wallet}
+        })
+        ws.send(msg)
+        logger.debug(f"Unsubscribed from: {wallet[:16]}...")
+    
+    def _decode_snapshot(self, msg: str) -> Optional[Tuple[Dict, int]]:
+        """
+        Decode a webData2 frame.
+        
+        Returns:
+            (raw_data, snapshot_time) for a usable webData2 frame, otherwise None.
+        
+        Raises:
+            json.JSONDecodeError: If the frame looks like webData2 but is not valid JSON.
+        """
+        channel = classify(msg)
+        if channel != CHANNEL_WEBDATA2:
+            if channel == CHANNEL_ERROR:
+                log_error_frame(msg)
+            return None  # Not our message, keep waiting
+        
+        raw_data = json_codec.webdata2_data(msg, self.partial_decode)
+        
+        if not raw_data:
+            logger.warning("Message missing 'data' key")
+            return None
+        
+        clearinghouse = raw_data.get('clearinghouseState', {})
+        snapshot_time = clearinghouse.get('time')
+        
+        if not snapshot_time:
+            logger.warning("Message missing 'clearinghouseState.time'")
+            return None
+        
+        return raw_data, snapshot_time
+    
     def _process_message(self, wallet: str, msg: str) -> Optional[bool]:
         """
         Process message and insert to database.
@@ -450,26 +523,15 @@ class HyperliquidMonitor:
             False: Data error (don't retry)
             None: Not the right message, keep waiting
         """
-        if not PATTERN.search(msg):
-            return None  # Not our message, keep waiting
-        
         try:
-            data = json.loads(msg)
-            raw_data = data.get("data", {})
-            
-            if not raw_data:
-                logger.warning("Message missing 'data' key")
+            decoded = self._decode_snapshot(msg)
+            if decoded is None:
                 return None
             
-            clearinghouse = raw_data.get('clearinghouseState', {})
-            snapshot_time = clearinghouse.get('time')
-            
-            if not snapshot_time:
-                logger.warning("Message missing 'clearinghouseState.time'")
-                return None
+            raw_data, snapshot_time = decoded
             
             # Parse data
-            parsed_data = parse_hyperliquid_data(raw_data)
+            parsed_data = self.parse(raw_data)
             
             # Insert to database
             success = self.db.insert(wallet, snapshot_time, parsed_data)
@@ -532,6 +594,190 @@ class HyperliquidMonitor:
                 except:
                     pass
     
+    def collect_wallet_batch(self, wallets: List[str]) -> Dict[str, bool]:
+        """
+        Collect data for several wallets over a single WebSocket connection.
+        
+        Up to `subscriptions_per_connection` webData2 subscriptions are open at
+        once. Frames are routed to their wallet by the payload's `user` field;
+        a slot is unsubscribed and handed to the next pending wallet as soon as
+        its snapshot arrives or its per-wallet timeout expires.
+        
+        On a connection/receive error the identity is rotated and every wallet
+        not yet completed is reported as failed, as in single-wallet mode.
+        
+        Returns:
+            Mapping of wallet -> success for every wallet in `wallets`.
+        """
+        results: Dict[str, bool] = {}
+        pending = deque(wallets)
+        # user (lowercase) -> (wallet, deadline)
+        active: Dict[str, Tuple[str, float]] = {}
+        ws = None
+        
+        try:
+            ws = self._connect_websocket()
+            
+            while pending or active:
+                # Fill free slots
+                while pending and len(active) < self.subscriptions_per_connection:
+                    wallet = pending.popleft()
+                    self._subscribe(ws, wallet)
+                    active[wallet.lower()] = (wallet, time.time() + self.timeout)
+                
+                # Recycle slots whose wallet timed out
+                now = time.time()
+                for user, (wallet, deadline) in list(active.items()):
+                    if now >= deadline:
+                        logger.warning(f"⏱️ Timeout for {wallet[:16]}...")
+                        results[wallet] = False
+                        del active[user]
+                        self._unsubscribe(ws, wallet)
+                
+                if not active:
+                    continue
+                
+                next_deadline = min(deadline for _, deadline in active.values())
+                ws.settimeout(max(0.1, min(15, next_deadline - now)))
+                
+                try:
+                    msg = ws.recv()
+                except WebSocketTimeoutException:
+                    continue  # Deadlines are re-checked at the top of the loop
+                except Exception as recv_error:
+                    logger.warning(f"⚠️ Receive error: {recv_error}")
+                    self.connection_errors += 1
+                    self._rotate_full_identity("receive error")
+                    break
+                
+                try:
+                    decoded = self._decode_snapshot(msg)
+                except json.JSONDecodeError as e:
+                    logger.error(f"JSON decode error: {e}")
+                    continue
+                
+                if decoded is None:
+                    continue
+                
+                raw_data, snapshot_time = decoded
+                user = str(raw_data.get("user", "")).lower()
+                slot = active.pop(user, None)
+                
+                if slot is None:
+                    # Late frame for a slot that was already recycled
+                    continue
+                
+                wallet = slot[0]
+                self._unsubscribe(ws, wallet)
+                
+                try:
+                    parsed_data = self.parse(raw_data)
+                    results[wallet] = self.db.insert(wallet, snapshot_time, parsed_data)
+                except Exception as e:
+                    logger.error(f"Error processing message: {e}")
+                    results[wallet] = False
+        
+        except Exception as conn_error:
+            logger.error(f"🔌 Connection error: {conn_error}")
+            self.connection_errors += 1
+            self._rotate_full_identity("connection error")
+        
+        finally:
+            if ws:
+                try:
+                    ws.close()
+                except:
+                    pass
+        
+        for wallet in wallets:
+            results.setdefault(wallet, False)
+        return results
+    
+    async def _on_async_result(self, wallet: str, success: bool):
+        """Update monitor stats and apply scheduled rotations (async engine)."""
+        self.wallets_processed += 1
+        if not success:
+            self.collect_failures += 1
+        self._update_write_counts()
+        
+        self._log_progress(wallet, success)
+        
+        if not self._rotation_lock.locked():
+            async with self._rotation_lock:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._check_scheduled_rotations)
+    
+    async def _on_async_connection_error(self, reason: str, error: Exception):
+        """Rotate identity once per burst of errors from concurrent connections."""
+        self.connection_errors += 1
+        
+        if self._rotation_lock.locked():
+            return  # A rotation is already under way
+        
+        async with self._rotation_lock:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._rotate_full_identity, reason)
+    
+    def _update_write_counts(self):
+        """
+        Async engine: take successes from the pipeline's writer stats.
+        
+        The collector's result only says a frame was enqueued, so successful
+        counts snapshots the writer stored, and failed counts wallets without
+        a frame plus frames that were dropped, unusable or failed to write.
+        """
+        write_stats = self.pipeline.write_stats
+        self.successful = write_stats.processed - write_stats.errors
+        self.failed = self.collect_failures + write_stats.errors + self.pipeline.skipped + self.pipeline.dropped
+    
+    async def _run_async(self):
+        """
+        Run the asyncio engine (rotation or streaming mode).
+        
+        The receive path only enqueues raw frames; decoding/parsing and DB
+        writes happen in the pipeline's parse pool and single writer thread.
+        Progress counts frames received, while successes and failures come
+        from what the writer stored (see _update_write_counts). On exit the
+        queued frames are drained, so nothing already received is lost.
+        """
+        self._rotation_lock = asyncio.Lock()
+        
+        # Sinks are not meant for concurrent writers: the pipeline runs all inserts on one thread
+        self.pipeline = IngestPipeline(
+            write=self.db.insert,
+            write_batch=self.db.insert_batch,
+            batch_size=self.batch_size,
+            batch_max_age=self.batch_max_age,
+            parse_workers=self.parse_workers,
+            frame_queue_size=self.queue_size,
+            snapshot_queue_size=self.queue_size,
+            parse=self.parse,
+            partial_decode=self.partial_decode,
+        )
+        await self.pipeline.start()
+        
+        self.collector = AsyncCollector(
+            connect=self._connect_websocket_async,
+            on_snapshot=self.pipeline.submit,
+            concurrency=self.concurrency,
+            timeout_seconds=self.timeout,
+            on_result=self._on_async_result,
+            on_connection_error=self._on_async_connection_error,
+        )
+        
+        try:
+            if self.stream:
+                await self.collector.stream(
+                    self.wallets,
+                    subscriptions_per_connection=self.subscriptions_per_connection,
+                    min_write_interval=self.min_write_interval,
+                )
+            else:
+                await self.collector.run_forever(self.wallets)
+        finally:
+            await self.pipeline.stop(drain=True)
+            self._update_write_counts()
+    
     def _log_progress(self, wallet: str, success: bool):
         """Log current progress."""
         status = "✅" if success else "❌"
@@ -562,13 +808,30 @@ class HyperliquidMonitor:
         logger.info(f"🧅 Tor proxy: {self.proxy.host}:{self.proxy.port}")
         logger.info(f"🎛️  Tor control: {self.tor.config.host}:{self.tor.config.port}")
         logger.info(f"⏱️  Timeout: {self.timeout}s per wallet")
+        if self.subscriptions_per_connection > 1:
+            logger.info(
+                f"📡 Multiplex: {self.subscriptions_per_connection} subscriptions/connection, "
+                f"{self.wallets_per_connection} wallets/connection"
+            )
+        if self.stream:
+            logger.info(f"📡 Streaming mode: ≤1 write per wallet every {self.min_write_interval}s")
+        if self.concurrency > 1 or self.stream:
+            logger.info(f"⚡ Async engine: {self.concurrency} concurrent connections")
         logger.info("=" * 70)
         
         self.start_time = time.time()
         wallet_index = 0
         
         try:
+            if self.concurrency > 1 or self.stream:
+                asyncio.run(self._run_async())
+                return
+            
             while True:
+                if self.subscriptions_per_connection > 1:
+                    wallet_index = self._run_batch(wallet_index)
+                    continue
+                
                 # Get current wallet (loop through list)
                 wallet = self.wallets[wallet_index]
                 wallet_index = (wallet_index + 1) % len(self.wallets)
@@ -599,6 +862,29 @@ class HyperliquidMonitor:
             self.db.close()
             self._print_summary()
     
+    def _run_batch(self, wallet_index: int) -> int:
+        """Process the next chunk of the rotation over one multiplexed connection."""
+        count = min(self.wallets_per_connection, len(self.wallets))
+        batch = [self.wallets[(wallet_index + i) % len(self.wallets)] for i in range(count)]
+        
+        self._check_scheduled_rotations()
+        
+        results = self.collect_wallet_batch(batch)
+        
+        for wallet in batch:
+            success = results[wallet]
+            self.wallets_processed += 1
+            if success:
+                self.successful += 1
+            else:
+                self.failed += 1
+            self._log_progress(wallet, success)
+        
+        if wallet_index + count >= len(self.wallets):
+            logger.info(f"🔄 Completed full wallet rotation. Starting again...")
+        
+        return (wallet_index + count) % len(self.wallets)
+    
     def _print_summary(self):
         """Print session summary."""
         elapsed = time.time() - self.start_time if self.start_time else 0
@@ -619,6 +905,8 @@ class HyperliquidMonitor:
         logger.info(f"⚡ Avg time per wallet:  {avg_time:.2f}s")
         logger.info(f"🧅 Tor identity changes: {self.tor.identity_changes}")
         logger.info(f"🔌 Connection errors:    {self.connection_errors}")
+        if self.pipeline:
+            self.pipeline.log_stats()
         logger.info("=" * 70)
 
 
@@ -637,12 +925,68 @@ def main():
                         help=f'Rotate SSL every N wallets (default: {SSL_ROTATE_INTERVAL})')
     parser.add_argument('--tor-rotate', type=int, default=TOR_ROTATE_INTERVAL,
                         help=f'Rotate Tor identity every N wallets (default: {TOR_ROTATE_INTERVAL})')
+    parser.add_argument('--multiplex', type=int, default=SUBSCRIPTIONS_PER_CONNECTION,
+                        help='Concurrent webData2 subscriptions per connection '
+                             f'(default: {SUBSCRIPTIONS_PER_CONNECTION} = one wallet per connection)')
+    parser.add_argument('--wallets-per-connection', type=int, default=WALLETS_PER_CONNECTION,
+                        help=f'Wallets served by one multiplexed connection (default: {WALLETS_PER_CONNECTION})')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY,
+                        help='Connections kept in flight by the asyncio engine '
+                             f'(default: {CONCURRENCY} = serial loop)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Keep subscriptions open and store every update (uses --multiplex/--concurrency)')
+    parser.add_argument('--min-write-interval', type=float, default=MIN_WRITE_INTERVAL,
+                        help=f'Streaming: minimum seconds between stored updates per wallet (default: {MIN_WRITE_INTERVAL})')
+    parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS,
+                        help=f'Async engine: parse worker threads (default: {PARSE_WORKERS})')
+    parser.add_argument('--queue-size', type=int, default=FRAME_QUEUE_SIZE,
+                        help=f'Async engine: bounded frame/snapshot queue size (default: {FRAME_QUEUE_SIZE})')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f'Async engine: snapshots per DB transaction (default: {BATCH_SIZE})')
+    parser.add_argument('--batch-max-age', type=float, default=BATCH_MAX_AGE,
+                        help=f'Async engine: max seconds a snapshot waits for its batch (default: {BATCH_MAX_AGE})')
+    parser.add_argument('--client-ids', action='store_true',
+                        help='Derive 64-bit snapshot ids client-side from wallet and snapshot time (needs migration_snapshot_id_bigint.sql)')
+    parser.add_argument('--bulk-load', action='store_true',
+                        help=f'Write batches with LOAD DATA LOCAL INFILE (implies --client-ids, and --batch-size {BULK_LOAD_BATCH_SIZE} unless set; server needs local_infile=ON)')
+    parser.add_argument('--spool-dir', type=str, default=None,
+                        help='Spool snapshots to this directory while the DB is unreachable (or set SPOOL_DIR env; implies --client-ids)')
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help='Skip snapshots whose positions/orders did not change since the last write')
+    parser.add_argument('--heartbeat-interval', type=float, default=HEARTBEAT_INTERVAL,
+                        help=f'With --skip-unchanged: full write at least every N seconds per wallet (default: {HEARTBEAT_INTERVAL})')
+    parser.add_argument('--digest-state', type=str, default=None,
+                        help='With --skip-unchanged: JSON file to warm-start the digest cache across restarts')
+    parser.add_argument('--order-storage', choices=ORDER_STORAGE_MODES, default=ORDER_STORAGE_ROWS,
+                        help='Open orders as per-snapshot rows, lifetime intervals, or both (default: rows)')
+    parser.add_argument('--position-storage', choices=POSITION_STORAGE_MODES, default=POSITION_STORAGE_ROWS,
+                        help='Positions as per-snapshot rows, run-length legs + marks, or both (default: rows)')
+    parser.add_argument('--dual-write', action='store_true',
+                        help='Mirror writes into shadow tables of a running online_id_migration.py')
+    parser.add_argument('--latest-state', action='store_true',
+                        help='Maintain hyperliquid_wallet_latest and latest positions/orders on every write')
+    parser.add_argument('--rollups', action='store_true',
+                        help='Maintain 1m/1h/1d OHLC rollups of account value, exposure and coin size')
+    parser.add_argument('--sink', choices=SINKS, default=SINK_MYSQL,
+                        help='Where snapshots go: MySQL (default), an embedded SQLite/DuckDB file or a Parquet archive')
+    parser.add_argument('--sink-path', type=str, default=None,
+                        help='Database file or archive directory (default: hyperliquid.sqlite / hyperliquid.duckdb / snapshot_archive)')
+    parser.add_argument('--parser', choices=list(PARSERS), default=PARSER_DICTS,
+                        help='Parse frames into dicts (default) or compact slot structs')
+    parser.add_argument('--partial-decode', action='store_true',
+                        help='Decode only clearinghouseState/openOrders/user of each frame, skipping meta and asset contexts')
     args = parser.parse_args()
+    if args.skip_unchanged and (args.rollups or args.latest_state):
+        # Skipped snapshots are never written, so rollups and latest state would go stale between heartbeats
+        parser.error('--skip-unchanged cannot be combined with --rollups or --latest-state')
     
-    # Load configuration
-    config = load_env_config()
+    # Load configuration (embedded sinks need no database settings)
+    if args.sink == SINK_MYSQL:
+        config = load_env_config()
+    else:
+        config = {'SSH_CONFIG': {}, 'DB_CONFIG': {}}
     
-    if args.local:
+    if args.local and args.sink == SINK_MYSQL:
         config['SSH_CONFIG']['use_tunnel'] = False
         logger.info("🔧 Local mode: SSH tunnel disabled")
     
@@ -667,6 +1011,12 @@ def main():
     if not wallets:
         raise ValueError("No wallets found in wallets.txt")
     
+    digest_cache = None
+    if args.skip_unchanged:
+        digest_cache = SnapshotDigestCache(
+            heartbeat_interval=args.heartbeat_interval, state_file=args.digest_state
+        )
+    
     # Create and run monitor
     monitor = HyperliquidMonitor(
         wallets=wallets,
@@ -677,6 +1027,28 @@ def main():
         timeout_seconds=args.timeout,
         ssl_rotate_interval=args.ssl_rotate,
         tor_rotate_interval=args.tor_rotate,
+        subscriptions_per_connection=args.multiplex,
+        wallets_per_connection=args.wallets_per_connection,
+        concurrency=args.concurrency,
+        stream=args.stream,
+        min_write_interval=args.min_write_interval,
+        parse_workers=args.parse_workers,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        batch_max_age=args.batch_max_age,
+        client_ids=args.client_ids,
+        bulk_load=args.bulk_load,
+        spool_dir=args.spool_dir or os.getenv('SPOOL_DIR'),
+        digest_cache=digest_cache,
+        order_storage=args.order_storage,
+        position_storage=args.position_storage,
+        dual_write=args.dual_write,
+        latest_state=args.latest_state,
+        rollups=args.rollups,
+        sink=args.sink,
+        sink_path=args.sink_path,
+        parser=args.parser,
+        partial_decode=args.partial_decode,
     )
     
     monitor.run()
@@ -5,7 +5,6 @@ import base64
 import os
 import json
 import random
-import re
 import time
 import struct
 import socket
@@ -15,11 +14,17 @@ import threading
 from datetime import datetime, timedelta
 # Import the custom break manager
 from break_manager import BreakManager 
-from data_inserter_env import load_env_config, MySQLStealthClient 
-from hyperliquid_parser import parse_hyperliquid_data
+from data_inserter_env import load_env_config
+from sinks import SINKS, SINK_MYSQL, create_sink
+from async_collector import AsyncCollector
+from frame_router import CHANNEL_WEBDATA2, classify
+from hyperliquid_structs import PARSERS, PARSER_DICTS
+from ingest_pipeline import IngestPipeline
+from snapshot_digest import SnapshotDigestCache, HEARTBEAT_INTERVAL
+from order_intervals import ORDER_STORAGE_MODES, ORDER_STORAGE_ROWS
+from position_intervals import POSITION_STORAGE_MODES, POSITION_STORAGE_ROWS
 
 URL = "wss://api.hyperliquid.xyz/ws"
-PATTERN = re.compile(r'"channel"\s*:\s*"webData2"')
 
 with open('wallets.txt', 'r') as file:
     # Using a list comprehension for concise reading and cleaning
@@ -28,7 +33,11 @@ with open('wallets.txt', 'r') as file:
 # Global config loading removed
 
 class MultiTargetStealthClient:
-    def __init__(self, wallets, break_manager, db_config, ssh_config):
+    def __init__(self, wallets, break_manager, db_config, ssh_config, client_ids=False, spool_dir=None,
+                 digest_cache=None, order_storage=ORDER_STORAGE_ROWS,
+                 position_storage=POSITION_STORAGE_ROWS, dual_write=False, latest_state=False,
+                 rollups=False, sink=SINK_MYSQL, sink_path=None, parser=PARSER_DICTS,
+                 partial_decode=False):
         self.wallets = wallets
         self.current_wallet_index = 0
         self.session_id = self.generate_session_id()
@@ -42,43 +51,47 @@ class MultiTargetStealthClient:
         # Store the BreakManager instance
         self.break_manager = break_manager 
 
-    # --- Insertion Helper Method ---
-    def insert_data_point(self, wallet_address, raw_data_json):
-        """
-        Parses the raw JSON string and inserts data into the three database tables 
-        (snapshots, positions, orders).
-        """
-        try:
-            # 1. Parse the JSON message string into a dict
-            full_data_dict = json.loads(raw_data_json)
-            raw_data_dict = full_data_dict.get("data")
-            
-            if not raw_data_dict:
-                print("⚠️ Received JSON is missing the 'data' key.")
-                return
+        # Persistent DB writer (MySQL: one connection and tunnel), used from one thread
+        self.db = create_sink(
+            sink, sink_path, db_config, ssh_config, client_ids=client_ids, spool_dir=spool_dir,
+            digest_cache=digest_cache, order_storage=order_storage, position_storage=position_storage,
+            dual_write=dual_write, latest_state=latest_state, rollups=rollups,
+        )
+        self.parse = PARSERS[parser]
+        self.partial_decode = partial_decode
+        self.pipeline = None
 
-            # 2. Extract snapshot time (needed for the snapshot table)
-            # This is available in the top-level clearinghouseState dict
-            clearinghouse_state = raw_data_dict.get('clearinghouseState', {})
-            snapshot_time_ms = clearinghouse_state.get('time')
+    # --- Insertion Helper Methods ---
+    async def start_writer(self):
+        """Start the parse pool and the dedicated DB writer thread."""
+        if self.pipeline is None:
+            self.pipeline = IngestPipeline(
+                write=self.db.insert, parse=self.parse, partial_decode=self.partial_decode
+            )
+            await self.pipeline.start()
 
-            if not snapshot_time_ms:
-                 print("⚠️ Received JSON is missing 'clearinghouseState.time'. Cannot insert.")
-                 return
+    async def stop_writer(self):
+        """Flush queued snapshots, then close the persistent DB connection."""
+        if self.pipeline is not None:
+            await self.pipeline.stop(drain=True)
+            print(f"📊 Writer stats: {self.pipeline.stats()}")
+            self.pipeline = None
+        self.db.close()
 
-            # 3. Parse and structure the data for all three tables
-            parsed_data = parse_hyperliquid_data(raw_data_dict)
-            
-            # 4. Insert using the secure client
-            with MySQLStealthClient(self.ssh_config, self.db_config) as client:
-                client.insert_hyperliquid_data(
-                    wallet_address, 
-                    snapshot_time_ms, 
-                    parsed_data
-                )
-                
-        except Exception as e:
-            print(f"[❌] FAILED TO INSERT data for {wallet_address}: {e}")
+    async def insert_data_point(self, wallet_address, raw_data_json):
+        """
+        Queues the raw JSON frame for insertion into the three database tables 
+        (snapshots, positions, orders). Returns True if the frame was accepted.
+        
+        Parsing runs on a worker thread and the insert on the writer thread, so
+        WebSocket keepalives and receives never wait on MySQL or the SSH tunnel.
+        If the writer is so far behind that the queue is full, the frame is dropped.
+        """
+        await self.start_writer()
+        if not self.pipeline.try_submit(wallet_address, raw_data_json):
+            print(f"[⚠️] Write queue full, dropped snapshot for {wallet_address}")
+            return False
+        return True
 
     def generate_session_id(self):
         """Generate realistic Chrome session ID"""
@@ -265,12 +278,12 @@ class MultiTargetStealthClient:
                     msg = await asyncio.wait_for(ws.recv(), timeout=30)
                     self.last_activity = time.time()
                     
-                    if PATTERN.search(msg):
+                    if classify(msg) == CHANNEL_WEBDATA2:
                         print(f"\n🎉 DATA COLLECTED FOR {wallet_address}!")
                         print("="*50)
                         
                         # --- INSERTION LOGIC ---
-                        self.insert_data_point(wallet_address, msg)
+                        await self.insert_data_point(wallet_address, msg)
                         # -----------------------
 
                         data_collected = True
@@ -460,12 +473,12 @@ class MultiTargetStealthClient:
                     msg = await asyncio.wait_for(ws.recv(), timeout=30)
                     self.last_activity = time.time()
                     
-                    if PATTERN.search(msg):
+                    if classify(msg) == CHANNEL_WEBDATA2:
                         print(f"\n🎉 DATA COLLECTED FOR {wallet_address}!")
                         print("="*50)
                         
                         # --- INSERTION LOGIC ---
-                        self.insert_data_point(wallet_address, msg)
+                        await self.insert_data_point(wallet_address, msg)
                         # -----------------------
 
                         data_collected = True
@@ -511,6 +524,46 @@ class MultiTargetStealthClient:
         print(f"✅ All collected data points were inserted directly into the database.")
         print(f"{'='*60}\n")
     
+    async def run_streaming_monitor(self, min_write_interval=60, connections=1,
+                                    subscriptions_per_connection=1):
+        """
+        Streaming mode: keep every wallet subscribed on long-lived connections and
+        store every update, at most once per wallet per `min_write_interval` seconds.
+        """
+        print("[*] Starting Multi-Target Streaming Monitor")
+        print(f"🎯 Streaming {len(self.wallets)} wallets over {connections} connection(s)")
+        print(f"🕒 At most one write per wallet every {min_write_interval}s")
+        print("="*60)
+        
+        await self.start_writer()
+        
+        collector = AsyncCollector(
+            connect=self.connect_with_stealth,
+            on_snapshot=self.insert_data_point,
+            concurrency=connections,
+            timeout_seconds=120,
+        )
+        
+        try:
+            await collector.stream(
+                self.wallets,
+                subscriptions_per_connection=subscriptions_per_connection,
+                min_write_interval=min_write_interval,
+            )
+        except KeyboardInterrupt:
+            print("\n[⏹️] Monitoring stopped by user")
+        finally:
+            # The collector only knows which frames were queued: drain the writer, then count what it stored
+            pipeline = self.pipeline
+            await self.stop_writer()
+            written = pipeline.write_stats.processed - pipeline.write_stats.errors
+            # collector.failed already includes the frames dropped on a full queue
+            failed = collector.failed + pipeline.write_stats.errors + pipeline.skipped
+            print(f"📨 Updates received: {collector.updates_received} | "
+                  f"✅ Stored: {written} | ❌ Failed: {failed} | "
+                  f"⏭️ Throttled: {collector.throttle.skipped if collector.throttle else 0}")
+            self.print_session_summary()
+    
     async def run_multi_target_monitor(self, cycles_per_wallet=1):
         """
         Main monitoring loop for multiple wallets, running continuously.
@@ -574,6 +627,7 @@ class MultiTargetStealthClient:
         except Exception as e:
             print(f"\n[💥] Unexpected error: {e}")
         finally:
+            await self.stop_writer()
             self.print_session_summary()
 
 # 🎯 Main function (Continuous Monitoring)
@@ -583,13 +637,52 @@ async def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Hyperliquid Stealth Monitor')
     parser.add_argument('--local', action='store_true', help='Use local database connection without SSH tunnel')
+    parser.add_argument('--stream', action='store_true', help='Keep subscriptions open and store every update')
+    parser.add_argument('--min-write-interval', type=float, default=60,
+                        help='Streaming: minimum seconds between stored updates per wallet (default: 60)')
+    parser.add_argument('--connections', type=int, default=1,
+                        help='Streaming: number of long-lived connections (default: 1)')
+    parser.add_argument('--client-ids', action='store_true',
+                        help='Derive 64-bit snapshot ids client-side from wallet and snapshot time (needs migration_snapshot_id_bigint.sql)')
+    parser.add_argument('--spool-dir', type=str, default=None,
+                        help='Spool snapshots to this directory while the DB is unreachable (or set SPOOL_DIR env; implies --client-ids)')
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help='Skip snapshots whose positions/orders did not change since the last write')
+    parser.add_argument('--heartbeat-interval', type=float, default=HEARTBEAT_INTERVAL,
+                        help=f'With --skip-unchanged: full write at least every N seconds per wallet (default: {HEARTBEAT_INTERVAL})')
+    parser.add_argument('--digest-state', type=str, default=None,
+                        help='With --skip-unchanged: JSON file to warm-start the digest cache across restarts')
+    parser.add_argument('--order-storage', choices=ORDER_STORAGE_MODES, default=ORDER_STORAGE_ROWS,
+                        help='Open orders as per-snapshot rows, lifetime intervals, or both (default: rows)')
+    parser.add_argument('--position-storage', choices=POSITION_STORAGE_MODES, default=POSITION_STORAGE_ROWS,
+                        help='Positions as per-snapshot rows, run-length legs + marks, or both (default: rows)')
+    parser.add_argument('--dual-write', action='store_true',
+                        help='Mirror writes into shadow tables of a running online_id_migration.py')
+    parser.add_argument('--latest-state', action='store_true',
+                        help='Maintain hyperliquid_wallet_latest and latest positions/orders on every write')
+    parser.add_argument('--rollups', action='store_true',
+                        help='Maintain 1m/1h/1d OHLC rollups of account value, exposure and coin size')
+    parser.add_argument('--sink', choices=SINKS, default=SINK_MYSQL,
+                        help='Where snapshots go: MySQL (default), an embedded SQLite/DuckDB file or a Parquet archive')
+    parser.add_argument('--sink-path', type=str, default=None,
+                        help='Database file or archive directory (default: hyperliquid.sqlite / hyperliquid.duckdb / snapshot_archive)')
+    parser.add_argument('--parser', choices=list(PARSERS), default=PARSER_DICTS,
+                        help='Parse frames into dicts (default) or compact slot structs')
+    parser.add_argument('--partial-decode', action='store_true',
+                        help='Decode only clearinghouseState/openOrders/user of each frame, skipping meta and asset contexts')
     args = parser.parse_args()
+    if args.skip_unchanged and (args.rollups or args.latest_state):
+        # Skipped snapshots are never written, so rollups and latest state would go stale between heartbeats
+        parser.error('--skip-unchanged cannot be combined with --rollups or --latest-state')
 
-    # Load configuration
-    config = load_env_config()
+    # Load configuration (embedded sinks need no database settings)
+    if args.sink == SINK_MYSQL:
+        config = load_env_config()
+    else:
+        config = {'SSH_CONFIG': {}, 'DB_CONFIG': {}}
     
     # Override SSH tunnel setting if --local is provided
-    if args.local:
+    if args.local and args.sink == SINK_MYSQL:
         config['SSH_CONFIG']['use_tunnel'] = False
         print("🔧 Local mode enabled: SSH tunnel disabled.")
 
@@ -609,18 +702,42 @@ async def main():
     # How many times to collect data from each wallet before moving to the next rotation
     cycles_per_wallet = int(config.get('CYCLES_PER_WALLET', 1))
     
+    digest_cache = None
+    if args.skip_unchanged:
+        digest_cache = SnapshotDigestCache(
+            heartbeat_interval=args.heartbeat_interval, state_file=args.digest_state
+        )
+    
     # Create and run the stealth client, passing the manager and configs
     client = MultiTargetStealthClient(
         wallets_to_monitor, 
         break_manager, 
         config['DB_CONFIG'], 
-        config['SSH_CONFIG']
+        config['SSH_CONFIG'],
+        client_ids=args.client_ids,
+        spool_dir=args.spool_dir or os.getenv('SPOOL_DIR'),
+        digest_cache=digest_cache,
+        order_storage=args.order_storage,
+        position_storage=args.position_storage,
+        dual_write=args.dual_write,
+        latest_state=args.latest_state,
+        rollups=args.rollups,
+        sink=args.sink,
+        sink_path=args.sink_path,
+        parser=args.parser,
+        partial_decode=args.partial_decode,
     )
     
     # Run indefinitely
-    await client.run_multi_target_monitor(
-        cycles_per_wallet=cycles_per_wallet
-    )
+    if args.stream:
+        await client.run_streaming_monitor(
+            min_write_interval=args.min_write_interval,
+            connections=args.connections,
+        )
+    else:
+        await client.run_multi_target_monitor(
+            cycles_per_wallet=cycles_per_wallet
+        )
 
 
 if __name__ == "__main__":
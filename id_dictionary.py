@@ -0,0 +1,100 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sql_utils import in_clause
+
+logger = logging.getLogger(__name__)
+
+
+class IdDictionary:
+    """
+    In-process cache of a dictionary table (key -> surrogate id).
+
+    Known keys are answered from memory, so steady-state writes never pay a
+    lookup round-trip. Unknown keys are looked up, and only the ones not stored
+    yet are inserted (INSERT IGNORE) and read back. The caller commits that work before using the
+    ids in its own transaction, so a rolled-back snapshot can never leave a
+    cached id pointing at a row that does not exist.
+
+    `normalize` maps keys before caching and lookups (e.g. lower-casing wallet
+    addresses, whose unique index is case-insensitive).
+    """
+
+    def __init__(self, table: str, id_column: str, key_column: str,
+                 normalize: Optional[Callable[[str], str]] = None):
+        self.table = table
+        self.id_column = id_column
+        self.key_column = key_column
+        self.normalize = normalize or (lambda key: key)
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str) -> int:
+        return self._ids[self.normalize(key)]
+
+    def __contains__(self, key: str) -> bool:
+        return self.normalize(key) in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def resolve(self, cursor: Any, keys: Iterable[str]) -> bool:
+        """
+        Make sure every key has a cached id.
+
+        Returns:
+            True if rows were written (the caller must commit before relying
+            on the new ids).
+        """
+        missing = {self.normalize(k): k for k in keys if self.normalize(k) not in self._ids}
+        if not missing:
+            return False
+
+        # Look up first: INSERT IGNORE burns an AUTO_INCREMENT value per ignored
+        # row, and small wallet ids keep snapshot ids derived (snapshot_ids.client_snapshot_id)
+        originals = list(missing.values())
+        self._load(cursor, originals)
+        absent = [k for k in originals if self.normalize(k) not in self._ids]
+        if not absent:
+            return False
+
+        cursor.executemany(
+            f"INSERT IGNORE INTO {self.table} ({self.key_column}) VALUES (%s)",
+            [(k,) for k in absent]
+        )
+        self._load(cursor, absent)
+
+        unresolved = [k for k in absent if self.normalize(k) not in self._ids]
+        if unresolved:
+            logger.warning(f"Could not resolve {len(unresolved)} {self.table} key(s): {unresolved[:5]}")
+        return True
+
+    def _load(self, cursor: Any, keys: List[str]):
+        """Cache the stored ids of `keys` (one SELECT)."""
+        cursor.execute(
+            f"SELECT {self.id_column}, {self.key_column} FROM {self.table} "
+            f"WHERE {self.key_column} IN ({in_clause(keys)})",
+            keys
+        )
+        with self._lock:
+            for row in cursor.fetchall():
+                self._ids[self.normalize(row[self.key_column])] = row[self.id_column]
+
+# --- Process-wide registry (one cache per database) ---
+
+WALLETS = ('wallets', 'id', 'address', str.lower)
+COINS = ('hyperliquid_coins', 'coin_id', 'coin', None)
+
+_registry_lock = threading.Lock()
+_dictionaries: Dict[Tuple[Hashable, str], IdDictionary] = {}
+
+
+def get_dictionary(database: Hashable, spec: Tuple[str, str, str, Optional[Callable]]) -> IdDictionary:
+    """Return the process-wide cache for a dictionary table (WALLETS or COINS) of one database."""
+    key = (database, spec[0])
+    with _registry_lock:
+        dictionary = _dictionaries.get(key)
+        if dictionary is None:
+            dictionary = _dictionaries[key] = IdDictionary(*spec)
+        return dictionary
@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import json_codec
+from hyperliquid_parser import parse_hyperliquid_data
+
+logger = logging.getLogger(__name__)
+
+# Defaults
+FRAME_QUEUE_SIZE = 1000      # Raw frames waiting to be parsed
+SNAPSHOT_QUEUE_SIZE = 1000   # Parsed snapshots waiting for the DB writer
+PARSE_WORKERS = 2
+BATCH_SIZE = 1               # Snapshots per DB transaction (1 = no batching)
+BATCH_MAX_AGE = 1.0          # Seconds a batch may wait to fill before it is flushed
+STATS_INTERVAL = 60          # Seconds between stats log lines
+
+# (wallet, snapshot_time_ms, parsed_data) -> success
+WriteFn = Callable[[str, int, Dict], bool]
+# [(wallet, snapshot_time_ms, parsed_data), ...] -> per-item success
+WriteBatchFn = Callable[[List[Tuple[str, int, Dict]]], List[bool]]
+# raw webData2 'data' -> parsed_data (parse_hyperliquid_data or hyperliquid_structs.parse_hyperliquid_structs)
+ParseFn = Callable[[Dict], Dict]
+
+
+def decode_frame(msg: str, parse: ParseFn = parse_hyperliquid_data,
+                 partial: bool = False) -> Optional[Tuple[int, Dict]]:
+    """
+    Decode and parse a raw webData2 frame (with `partial`, only the fields the parser uses).
+
+    Returns:
+        (snapshot_time_ms, parsed_data), or None if the frame has no usable snapshot.
+    """
+    raw_data = json_codec.webdata2_data(msg, partial)
+    if not raw_data:
+        return None
+
+    snapshot_time = raw_data.get("clearinghouseState", {}).get("time")
+    if not snapshot_time:
+        return None
+
+    return snapshot_time, parse(raw_data)
+
+
+@dataclass
+class StageStats:
+    """Throughput and latency counters for one pipeline stage."""
+    processed: int = 0
+    errors: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    def record(self, latency: float, ok: bool = True):
+        self.processed += 1
+        if not ok:
+            self.errors += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    @property
+    def avg_latency(self) -> float:
+        return self.total_latency / self.processed if self.processed else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "avg_ms": round(self.avg_latency * 1000, 2),
+            "max_ms": round(self.max_latency * 1000, 2),
+        }
+
+
+@dataclass
+class _Frame:
+    wallet: str
+    msg: str
+    received_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Snapshot:
+    wallet: str
+    snapshot_time_ms: int
+    parsed_data: Dict
+    received_at: float
+
+
+class IngestPipeline:
+    """
+    Staged ingest: receive -> parse worker pool -> DB writer.
+
+    Stages are connected by bounded asyncio queues. When the writer falls
+    behind, the snapshot queue fills, parse workers block on it, the frame
+    queue fills, and `submit` blocks the receive loop (or `try_submit`
+    drops the frame) — backpressure is explicit instead of unbounded memory.
+
+    `write` is a synchronous callable (e.g. DatabaseManager.insert). It runs on
+    one dedicated thread, so it never blocks the event loop and the underlying
+    connection is only ever used from that thread.
+
+    With `write_batch` and `batch_size > 1` the writer group-commits: it
+    collects up to `batch_size` snapshots, flushing early once the oldest one
+    has waited `batch_max_age` seconds, and hands them to `write_batch` in one call.
+
+    `parse` turns a frame's data into parsed_data; it must be a module-level
+    function when `use_processes` is set. `partial_decode` decodes only the
+    frame fields the parser uses (json_codec.loads_fields).
+    """
+
+    def __init__(
+        self,
+        write: WriteFn,
+        parse_workers: int = PARSE_WORKERS,
+        frame_queue_size: int = FRAME_QUEUE_SIZE,
+        snapshot_queue_size: int = SNAPSHOT_QUEUE_SIZE,
+        use_processes: bool = False,
+        stats_interval: float = STATS_INTERVAL,
+        write_batch: Optional[WriteBatchFn] = None,
+        batch_size: int = BATCH_SIZE,
+        batch_max_age: float = BATCH_MAX_AGE,
+        parse: ParseFn = parse_hyperliquid_data,
+        partial_decode: bool = False,
+    ):
+        self._write = write
+        self._parse = parse
+        self.partial_decode = partial_decode
+        self._write_batch = write_batch
+        self.batch_size = max(1, batch_size) if write_batch else 1
+        self.batch_max_age = batch_max_age
+        self.parse_workers = max(1, parse_workers)
+        self.use_processes = use_processes
+        self.stats_interval = stats_interval
+
+        self._frames: asyncio.Queue = asyncio.Queue(maxsize=frame_queue_size)
+        self._snapshots: asyncio.Queue = asyncio.Queue(maxsize=snapshot_queue_size)
+        self._parse_executor: Optional[Executor] = None
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+
+        # Stats
+        self.receive_stats = StageStats()   # latency = time blocked on a full frame queue
+        self.parse_stats = StageStats()     # latency = decode + parse time
+        self.write_stats = StageStats()     # latency = DB write time
+        self.end_to_end = StageStats()      # latency = receive -> written
+        self.dropped = 0
+        self.skipped = 0
+        self.batches = 0
+
+    async def start(self):
+        """Start the parse workers and the DB writer."""
+        if self.use_processes:
+            self._parse_executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+        else:
+            self._parse_executor = ThreadPoolExecutor(
+                max_workers=self.parse_workers, thread_name_prefix="parse"
+            )
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+        self._tasks = [asyncio.ensure_future(self._parse_worker()) for _ in range(self.parse_workers)]
+        self._tasks.append(asyncio.ensure_future(self._writer()))
+        if self.stats_interval:
+            self._tasks.append(asyncio.ensure_future(self._report_stats()))
+
+    async def submit(self, wallet: str, msg: str) -> bool:
+        """Enqueue a raw frame, waiting while the frame queue is full."""
+        started = time.monotonic()
+        await self._frames.put(_Frame(wallet, msg))
+        self.receive_stats.record(time.monotonic() - started)
+        return True
+
+    def try_submit(self, wallet: str, msg: str) -> bool:
+        """Enqueue a raw frame without waiting; drops it if the queue is full."""
+        try:
+            self._frames.put_nowait(_Frame(wallet, msg))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.receive_stats.record(0.0)
+        return True
+
+    async def _parse_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            frame = await self._frames.get()
+            started = time.monotonic()
+            try:
+                try:
+                    decoded = await loop.run_in_executor(
+                        self._parse_executor, decode_frame, frame.msg, self._parse, self.partial_decode
+                    )
+                except Exception as e:
+                    logger.error(f"Parse error for {frame.wallet[:16]}...: {e}")
+                    self.parse_stats.record(time.monotonic() - started, ok=False)
+                    continue
+
+                self.parse_stats.record(time.monotonic() - started)
+                if decoded is None:
+                    self.skipped += 1
+                    continue
+
+                snapshot_time, parsed_data = decoded
+                await self._snapshots.put(_Snapshot(frame.wallet, snapshot_time, parsed_data, frame.received_at))
+            finally:
+                # Only after the hand-off, so join() never misses an in-flight snapshot
+                self._frames.task_done()
+
+    async def _next_batch(self) -> List[_Snapshot]:
+        """Wait for one snapshot, then fill up to batch_size until it is batch_max_age old."""
+        batch = [await self._snapshots.get()]
+        deadline = batch[0].received_at + self.batch_max_age
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._snapshots.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._snapshots.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _write_items(self, batch: List[_Snapshot]) -> List[bool]:
+        if self._write_batch and self.batch_size > 1:
+            return self._write_batch([(i.wallet, i.snapshot_time_ms, i.parsed_data) for i in batch])
+        return [self._write(i.wallet, i.snapshot_time_ms, i.parsed_data) for i in batch]
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            started = time.monotonic()
+            try:
+                results = await loop.run_in_executor(self._write_executor, self._write_items, batch)
+            except Exception as e:
+                logger.error(f"Write error for batch of {len(batch)}: {e}")
+                results = [False] * len(batch)
+            finally:
+                for _ in batch:
+                    self._snapshots.task_done()
+
+            finished = time.monotonic()
+            self.batches += 1
+            for item, ok in zip(batch, results):
+                self.write_stats.record(finished - started, ok=bool(ok))
+                self.end_to_end.record(finished - item.received_at, ok=bool(ok))
+
+    async def join(self):
+        """Wait until every submitted frame has been parsed and written."""
+        await self._frames.join()
+        await self._snapshots.join()
+
+    async def stop(self, drain: bool = True):
+        """Stop all stages, optionally draining queued work first."""
+        if drain:
+            await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._parse_executor:
+            self._parse_executor.shutdown(wait=True)
+        if self._write_executor:
+            self._write_executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depths and per-stage latencies."""
+        return {
+            "frame_queue": {"depth": self._frames.qsize(), "maxsize": self._frames.maxsize},
+            "snapshot_queue": {"depth": self._snapshots.qsize(), "maxsize": self._snapshots.maxsize},
+            "receive": self.receive_stats.as_dict(),
+            "parse": self.parse_stats.as_dict(),
+            "write": self.write_stats.as_dict(),
+            "end_to_end": self.end_to_end.as_dict(),
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "batches": self.batches,
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(
+            f"📊 Pipeline | frames {s['frame_queue']['depth']}/{s['frame_queue']['maxsize']} "
+            f"| snapshots {s['snapshot_queue']['depth']}/{s['snapshot_queue']['maxsize']} "
+            f"| parse avg {s['parse']['avg_ms']}ms "
+            f"| write avg {s['write']['avg_ms']}ms max {s['write']['max_ms']}ms "
+            f"| e2e avg {s['end_to_end']['avg_ms']}ms "
+            f"| written {s['write']['processed'] - s['write']['errors']} ✗{s['write']['errors']} "
+            f"in {s['batches']} batches "
+            f"| dropped {s['dropped']}"
+        )
+
+    async def _report_stats(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            self.log_stats()
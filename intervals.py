@@ -0,0 +1,111 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Mapping, Sequence
+
+from sql_utils import in_clause
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IntervalTable:
+    """
+    A table of per-wallet intervals: one row per stretch of snapshots in which
+    the item under `key` (an order, a position's coin) stayed the same.
+
+    Rows are open while `closed_ms` IS NULL; the primary key includes
+    `first_seen_ms`, so an item may have several (closed) intervals.
+    """
+    table: str
+    key: str                       # identifies the item within a wallet
+    state_columns: Sequence[str]   # read with the open intervals and compared against the snapshot
+    insert_columns: Sequence[str]
+
+    @property
+    def open_sql(self) -> str:
+        return (
+            f"SELECT {self.key}, {', '.join(self.state_columns)}, last_seen_ms FROM {self.table} "
+            f"WHERE wallet_id = %s AND closed_ms IS NULL FOR UPDATE"
+        )
+
+    @property
+    def last_closed_sql(self) -> str:
+        # Served by the (wallet_id, closed_ms) index
+        return f"SELECT MAX(closed_ms) AS closed_ms FROM {self.table} WHERE wallet_id = %s"
+
+
+def applied_time(cursor: Any, table: IntervalTable, wallet_id: int,
+                 open_rows: Mapping[Hashable, Dict]) -> int:
+    """
+    Time of the newest snapshot already folded into the wallet's intervals
+    (0 if none): the latest `last_seen_ms` of the open intervals or the latest
+    `closed_ms`, whichever is later. A closed interval's `last_seen_ms` is
+    never past its `closed_ms`, so closed rows need only the MAX(closed_ms).
+    """
+    cursor.execute(table.last_closed_sql, (wallet_id,))
+    row = cursor.fetchone()
+    times = [r['last_seen_ms'] for r in open_rows.values()]
+    if row is not None and row['closed_ms'] is not None:
+        times.append(row['closed_ms'])
+    return max(times, default=0)
+
+
+def apply_intervals(cursor: Any, table: IntervalTable, wallet_id: int, snapshot_time_ms: int,
+                    current: Mapping[Hashable, Dict], same_state: Callable[[Dict, Dict], bool],
+                    new_row: Callable[[Dict], Sequence]) -> Dict[str, int]:
+    """
+    Fold one snapshot's items (`current`, by key) into the wallet's intervals.
+
+    Items unchanged since their open interval (`same_state`) get `last_seen_ms`
+    extended; items that disappeared or changed are closed at this snapshot's
+    time; new or changed items open an interval (`new_row` gives its
+    `insert_columns` values). Must run inside the snapshot's transaction.
+
+    Snapshots at or before the wallet's applied time (see applied_time),
+    closed intervals included, are ignored, so late snapshots and replays
+    never re-open an interval or collide on its primary key. A snapshot that
+    neither held nor closed anything leaves no trace, so it cannot move that
+    watermark.
+
+    Returns:
+        Counts of extended, closed and opened intervals.
+    """
+    cursor.execute(table.open_sql, (wallet_id,))
+    open_rows = {row[table.key]: row for row in cursor.fetchall()}
+
+    if snapshot_time_ms <= applied_time(cursor, table, wallet_id, open_rows):
+        logger.debug(f"Stale snapshot for wallet {wallet_id} at {snapshot_time_ms}, {table.table} unchanged")
+        return {'extended': 0, 'closed': 0, 'opened': 0}
+
+    extend, close, opened = [], [], []
+    for key, item in current.items():
+        row = open_rows.get(key)
+        if row is not None and same_state(row, item):
+            extend.append(key)
+        else:
+            if row is not None:
+                close.append(key)
+            opened.append(item)
+    close.extend(key for key in open_rows if key not in current)
+
+    # Close first: a changed item re-opens under the same key below
+    if close:
+        cursor.execute(
+            f"UPDATE {table.table} SET closed_ms = %s "
+            f"WHERE wallet_id = %s AND closed_ms IS NULL AND {table.key} IN ({in_clause(close)})",
+            [snapshot_time_ms, wallet_id] + close
+        )
+    if extend:
+        cursor.execute(
+            f"UPDATE {table.table} SET last_seen_ms = %s "
+            f"WHERE wallet_id = %s AND closed_ms IS NULL AND {table.key} IN ({in_clause(extend)})",
+            [snapshot_time_ms, wallet_id] + extend
+        )
+    if opened:
+        cursor.executemany(
+            f"INSERT INTO {table.table} ({', '.join(table.insert_columns)}) "
+            f"VALUES ({in_clause(table.insert_columns)})",
+            [new_row(item) for item in opened]
+        )
+
+    return {'extended': len(extend), 'closed': len(close), 'opened': len(opened)}
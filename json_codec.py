@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Backends in order of preference; JSON_BACKEND (env) forces one of them
+BACKENDS = ('orjson', 'msgspec', 'json')
+
+# Raised by loads() whatever the backend (orjson's error already subclasses it)
+DecodeError = json.JSONDecodeError
+
+Decoder = Callable[[Union[str, bytes]], Any]
+
+# Partial decoding: the only webData2 fields the monitors use, and the type each must have
+WEBDATA2_FIELDS = {'clearinghouseState': dict, 'openOrders': list, 'user': str}
+
+_COLON = re.compile(r'\s*:\s*')
+_raw_decode = json.JSONDecoder().raw_decode
+
+
+def _orjson() -> Decoder:
+    import orjson
+    return orjson.loads
+
+
+def _msgspec() -> Decoder:
+    import msgspec
+    decode = msgspec.json.Decoder().decode
+
+    def loads(data: Union[str, bytes]) -> Any:
+        try:
+            return decode(data)
+        except msgspec.DecodeError as e:
+            raise DecodeError(str(e), data if isinstance(data, str) else '', 0) from None
+
+    return loads
+
+
+def _stdlib() -> Decoder:
+    return json.loads
+
+
+_FACTORIES: Dict[str, Callable[[], Decoder]] = {'orjson': _orjson, 'msgspec': _msgspec, 'json': _stdlib}
+
+
+def load_backend(name: Optional[str] = None) -> Tuple[str, Decoder]:
+    """
+    Return (name, loads) of `name`, or of the first installed backend.
+
+    Raises:
+        ValueError: `name` is unknown.
+        ImportError: `name` was requested explicitly but is not installed.
+    """
+    if name is not None:
+        if name not in _FACTORIES:
+            raise ValueError(f"JSON backend must be one of {BACKENDS}")
+        return name, _FACTORIES[name]()
+    for candidate in BACKENDS:
+        try:
+            return candidate, _FACTORIES[candidate]()
+        except ImportError:
+            continue
+    return 'json', json.loads
+
+
+def use_backend(name: Optional[str] = None) -> str:
+    """Switch the process-wide decoder (None = best installed); returns the backend name."""
+    global BACKEND, _loads
+    BACKEND, _loads = load_backend(name)
+    return BACKEND
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode one JSON document (a websocket frame) with the selected backend."""
+    return _loads(data)
+
+
+def loads_fields(msg: Union[str, bytes], fields: Dict[str, type] = WEBDATA2_FIELDS) -> Optional[Dict[str, Any]]:
+    """
+    Decode only `fields` of a frame, without building the rest of the document.
+
+    Each field's key is located with str.find (first occurrence) and just its
+    value is decoded with the stdlib C scanner (JSONDecoder.raw_decode);
+    meta, asset contexts, spot state etc. are never materialized. Fields that
+    are absent are left out.
+
+    Returns:
+        The decoded fields, or None if a located value does not have the
+        expected type (the key matched somewhere else); callers should then
+        decode the whole frame.
+
+    Raises:
+        DecodeError: A located value is not valid JSON.
+    """
+    if isinstance(msg, bytes):
+        msg = msg.decode('utf-8')
+    result = {}
+    for field, expected in fields.items():
+        key = f'"{field}"'
+        start = msg.find(key)
+        if start < 0:
+            continue
+        colon = _COLON.match(msg, start + len(key))
+        if colon is None:
+            return None
+        value, _ = _raw_decode(msg, colon.end())
+        if not isinstance(value, expected):
+            return None
+        result[field] = value
+    return result
+
+
+def field_values(msg: Union[str, bytes], field: str) -> List[Any]:
+    """
+    Decoded values of every `field` key in a frame, at any depth, in frame order.
+
+    Like loads_fields, each key is located with str.find and only its value
+    is decoded, so the rest of the frame is never materialized. A quoted
+    `field` that is not followed by a colon (a string value) is skipped.
+
+    Raises:
+        DecodeError: A located value is not valid JSON.
+    """
+    if isinstance(msg, bytes):
+        msg = msg.decode('utf-8')
+    key = f'"{field}"'
+    values = []
+    start = msg.find(key)
+    while start >= 0:
+        colon = _COLON.match(msg, start + len(key))
+        if colon is not None:
+            value, _ = _raw_decode(msg, colon.end())
+            values.append(value)
+        start = msg.find(key, start + len(key))
+    return values
+
+
+def webdata2_data(msg: Union[str, bytes], partial: bool = False) -> Optional[Dict[str, Any]]:
+    """The `data` object of a webData2 frame; with `partial`, only its WEBDATA2_FIELDS."""
+    if partial:
+        data = loads_fields(msg)
+        if data is not None:
+            return data
+    return loads(msg).get("data")
+
+
+BACKEND, _loads = load_backend(os.environ.get('JSON_BACKEND') or None)
+logger.debug(f"JSON decoding backend: {BACKEND}")
@@ -0,0 +1,133 @@
+import datetime
+import logging
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sql_utils import in_clause
+
+logger = logging.getLogger(__name__)
+
+WALLET_LATEST_COLUMNS = [
+    'wallet_id', 'snapshot_id', 'snapshot_time_ms', 'snapshot_datetime',
+    'account_value', 'total_ntl_pos', 'total_raw_usd', 'total_margin_used',
+    'withdrawable', 'cross_maintenance_margin_used',
+]
+LATEST_POSITION_COLUMNS = [
+    'wallet_id', 'coin_id', 'snapshot_id', 'snapshot_time_ms', 'type', 'size',
+    'leverage_type', 'leverage_value', 'entry_price', 'position_value',
+    'unrealized_pnl', 'return_on_equity',
+]
+LATEST_ORDER_COLUMNS = [
+    'wallet_id', 'order_id', 'snapshot_id', 'snapshot_time_ms', 'coin_id', 'side',
+    'limit_price', 'quantity', 'timestamp_ms', 'order_type', 'reduce_only', 'time_in_force',
+]
+
+# Row lock on the wallet's latest header: serializes writers of one wallet.
+# The header is claimed first (inserted, or exclusively locked if it exists):
+# on a missing row SELECT ... FOR UPDATE only takes a gap lock, and two first
+# writers would then deadlock on their INSERTs.
+CLAIM_LATEST_SQL = (
+    f"INSERT INTO hyperliquid_wallet_latest ({', '.join(WALLET_LATEST_COLUMNS)}) "
+    f"VALUES ({in_clause(WALLET_LATEST_COLUMNS)}) ON DUPLICATE KEY UPDATE wallet_id = wallet_id"
+)
+LOCK_LATEST_SQL = "SELECT snapshot_time_ms FROM hyperliquid_wallet_latest WHERE wallet_id = %s FOR UPDATE"
+
+# Current state of a wallet, in readable form (primary-key lookups via the wallets unique index)
+WALLET_LATEST_SQL = "SELECT * FROM hyperliquid_wallet_latest_v WHERE wallet_address = %s"
+LATEST_POSITIONS_SQL = "SELECT * FROM hyperliquid_latest_positions_v WHERE wallet_address = %s ORDER BY coin"
+LATEST_ORDERS_SQL = "SELECT * FROM hyperliquid_latest_orders_v WHERE wallet_address = %s ORDER BY order_id"
+
+
+def _upsert_sql(table: str, columns: List[str], key_columns: List[str]) -> str:
+    updates = ", ".join(f"{c} = VALUES({c})" for c in columns if c not in key_columns)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({in_clause(columns)}) "
+        f"ON DUPLICATE KEY UPDATE {updates}"
+    )
+
+
+def _replace_set(cursor: Any, table: str, columns: List[str], key_column: str,
+                 wallet_id: int, rows: List[Tuple]):
+    """Make the wallet's rows in `table` exactly `rows`: delete what is gone, upsert the rest."""
+    keys = [row[1] for row in rows]  # second column is the per-wallet key
+    if keys:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE wallet_id = %s AND {key_column} NOT IN ({in_clause(keys)})",
+            [wallet_id] + keys
+        )
+        cursor.executemany(_upsert_sql(table, columns, ['wallet_id', key_column]), rows)
+    else:
+        cursor.execute(f"DELETE FROM {table} WHERE wallet_id = %s", (wallet_id,))
+
+
+def apply_latest_state(cursor: Any, wallet_id: int, snapshot_id: int, snapshot_time_ms: int,
+                       parsed_data: Dict, coin_ids: Mapping[str, int]) -> bool:
+    """
+    Make `hyperliquid_wallet_latest` and the latest positions/orders reflect this snapshot.
+
+    Must run inside the snapshot's transaction. The wallet's header row is
+    claimed first (inserted on the wallet's first write, exclusively locked
+    otherwise), so concurrent writers of the same wallet serialize, first
+    write included, and a snapshot older than the stored one is ignored.
+
+    Returns:
+        True if the latest state was updated.
+    """
+    summary = parsed_data['summary']
+    header = (
+        wallet_id, snapshot_id, snapshot_time_ms,
+        datetime.datetime.fromtimestamp(snapshot_time_ms / 1000.0),
+        summary['account_value'], summary['total_ntl_pos'], summary['total_raw_usd'],
+        summary['total_margin_used'], summary['withdrawable'], summary['cross_maintenance_margin_used'],
+    )
+    cursor.execute(CLAIM_LATEST_SQL, header)
+    cursor.execute(LOCK_LATEST_SQL, (wallet_id,))
+    row = cursor.fetchone()
+    if snapshot_time_ms < row['snapshot_time_ms']:
+        logger.debug(f"Out-of-order snapshot for wallet {wallet_id} at {snapshot_time_ms}, latest state unchanged")
+        return False
+
+    cursor.execute(_upsert_sql('hyperliquid_wallet_latest', WALLET_LATEST_COLUMNS, ['wallet_id']), header)
+
+    positions = [
+        (
+            wallet_id, coin_ids[p['coin']], snapshot_id, snapshot_time_ms, p['type'], p['size'],
+            p['leverage_type'], p['leverage_value'], p['entry_price'], p['position_value'],
+            p['unrealized_pnl'], p['return_on_equity']
+        )
+        for p in parsed_data['asset_positions']
+    ]
+    _replace_set(cursor, 'hyperliquid_latest_positions', LATEST_POSITION_COLUMNS, 'coin_id', wallet_id, positions)
+
+    orders = [
+        (
+            wallet_id, o['order_id'], snapshot_id, snapshot_time_ms, coin_ids[o['coin']], o['side'],
+            o['limit_price'], o['quantity'], o['timestamp_ms'], o['order_type'], o['reduce_only'],
+            o['time_in_force']
+        )
+        for o in parsed_data['open_orders']
+    ]
+    _replace_set(cursor, 'hyperliquid_latest_orders', LATEST_ORDER_COLUMNS, 'order_id', wallet_id, orders)
+    return True
+
+
+def latest_items(items: List[Tuple[str, int, Dict]]) -> List[Tuple[str, int, Dict]]:
+    """The newest item per wallet of a batch (older ones would be overwritten anyway)."""
+    newest: Dict[str, Tuple[str, int, Dict]] = {}
+    for item in items:
+        current = newest.get(item[0])
+        if current is None or item[1] >= current[1]:
+            newest[item[0]] = item
+    return list(newest.values())
+
+
+def current_state(cursor: Any, wallet_address: str) -> Optional[Dict]:
+    """A wallet's latest summary with its current positions and open orders (None if never seen)."""
+    cursor.execute(WALLET_LATEST_SQL, (wallet_address,))
+    summary = cursor.fetchone()
+    if summary is None:
+        return None
+    cursor.execute(LATEST_POSITIONS_SQL, (wallet_address,))
+    positions = list(cursor.fetchall())
+    cursor.execute(LATEST_ORDERS_SQL, (wallet_address,))
+    orders = list(cursor.fetchall())
+    return {'summary': summary, 'asset_positions': positions, 'open_orders': orders}
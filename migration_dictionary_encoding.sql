@@ -0,0 +1,167 @@
+-- Migration to dictionary-encode wallet addresses and coins in the monitor tables
+-- Run this if you have an existing database and want to apply the new changes.
+-- Stop the monitors first; it rewrites every fact table. Readers should switch to the *_v views.
+
+-- -------------------------------------------------------------------
+-- Dictionaries: coins table, and every monitored address into `wallets`
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_coins` (
+    `coin_id` SMALLINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    `coin` VARCHAR(16) COLLATE utf8mb4_bin NOT NULL COMMENT 'Case-sensitive: kPEPE and KPEPE are different coins',
+
+    PRIMARY KEY (`coin_id`),
+    UNIQUE KEY `uq_coin` (`coin`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO wallets (address)
+SELECT DISTINCT LOWER(wallet_address) FROM hyperliquid_snapshots;
+INSERT IGNORE INTO wallets (address)
+SELECT DISTINCT LOWER(wallet_address) FROM hyperliquid_order_intervals;
+INSERT IGNORE INTO wallets (address)
+SELECT DISTINCT LOWER(wallet_address) FROM hyperliquid_position_intervals;
+
+INSERT IGNORE INTO hyperliquid_coins (coin) SELECT DISTINCT coin FROM hyperliquid_positions;
+INSERT IGNORE INTO hyperliquid_coins (coin) SELECT DISTINCT coin FROM hyperliquid_open_orders;
+INSERT IGNORE INTO hyperliquid_coins (coin) SELECT DISTINCT coin FROM hyperliquid_order_intervals;
+INSERT IGNORE INTO hyperliquid_coins (coin) SELECT DISTINCT coin FROM hyperliquid_position_intervals;
+INSERT IGNORE INTO hyperliquid_coins (coin) SELECT DISTINCT coin FROM hyperliquid_position_marks;
+
+-- -------------------------------------------------------------------
+-- hyperliquid_snapshots: wallet_address -> wallet_id
+-- -------------------------------------------------------------------
+ALTER TABLE hyperliquid_snapshots
+    ADD COLUMN wallet_id BIGINT UNSIGNED NULL COMMENT 'Monitored wallet (wallets.id)' AFTER snapshot_id;
+UPDATE hyperliquid_snapshots s JOIN wallets w ON w.address = s.wallet_address SET s.wallet_id = w.id;
+ALTER TABLE hyperliquid_snapshots
+    MODIFY wallet_id BIGINT UNSIGNED NOT NULL COMMENT 'Monitored wallet (wallets.id)',
+    DROP INDEX idx_wallet_time,
+    DROP COLUMN wallet_address,
+    ADD INDEX idx_wallet_time (wallet_id, snapshot_datetime);
+
+-- -------------------------------------------------------------------
+-- hyperliquid_positions / hyperliquid_open_orders: coin -> coin_id
+-- -------------------------------------------------------------------
+ALTER TABLE hyperliquid_positions
+    ADD COLUMN coin_id SMALLINT UNSIGNED NULL COMMENT 'hyperliquid_coins.coin_id' AFTER snapshot_id;
+UPDATE hyperliquid_positions p JOIN hyperliquid_coins c ON c.coin = p.coin SET p.coin_id = c.coin_id;
+ALTER TABLE hyperliquid_positions
+    MODIFY coin_id SMALLINT UNSIGNED NOT NULL COMMENT 'hyperliquid_coins.coin_id',
+    DROP COLUMN coin;
+
+ALTER TABLE hyperliquid_open_orders
+    ADD COLUMN coin_id SMALLINT UNSIGNED NULL COMMENT 'hyperliquid_coins.coin_id' AFTER snapshot_id;
+UPDATE hyperliquid_open_orders o JOIN hyperliquid_coins c ON c.coin = o.coin SET o.coin_id = c.coin_id;
+ALTER TABLE hyperliquid_open_orders
+    MODIFY coin_id SMALLINT UNSIGNED NOT NULL COMMENT 'hyperliquid_coins.coin_id',
+    DROP INDEX idx_order_coin,
+    DROP COLUMN coin,
+    ADD INDEX idx_order_coin (coin_id);
+
+-- -------------------------------------------------------------------
+-- Interval tables and marks
+-- -------------------------------------------------------------------
+ALTER TABLE hyperliquid_order_intervals
+    ADD COLUMN wallet_id BIGINT UNSIGNED NULL AFTER order_id,
+    ADD COLUMN coin_id SMALLINT UNSIGNED NULL AFTER wallet_id;
+UPDATE hyperliquid_order_intervals i
+    JOIN wallets w ON w.address = i.wallet_address
+    JOIN hyperliquid_coins c ON c.coin = i.coin
+SET i.wallet_id = w.id, i.coin_id = c.coin_id;
+ALTER TABLE hyperliquid_order_intervals
+    MODIFY wallet_id BIGINT UNSIGNED NOT NULL,
+    MODIFY coin_id SMALLINT UNSIGNED NOT NULL,
+    DROP INDEX idx_interval_wallet_open,
+    DROP INDEX idx_interval_wallet_time,
+    DROP INDEX idx_interval_coin,
+    DROP COLUMN wallet_address,
+    DROP COLUMN coin,
+    ADD INDEX idx_interval_wallet_open (wallet_id, closed_ms),
+    ADD INDEX idx_interval_wallet_time (wallet_id, first_seen_ms),
+    ADD INDEX idx_interval_coin (coin_id);
+
+ALTER TABLE hyperliquid_position_intervals
+    ADD COLUMN wallet_id BIGINT UNSIGNED NULL FIRST,
+    ADD COLUMN coin_id SMALLINT UNSIGNED NULL AFTER wallet_id;
+UPDATE hyperliquid_position_intervals l
+    JOIN wallets w ON w.address = l.wallet_address
+    JOIN hyperliquid_coins c ON c.coin = l.coin
+SET l.wallet_id = w.id, l.coin_id = c.coin_id;
+ALTER TABLE hyperliquid_position_intervals
+    MODIFY wallet_id BIGINT UNSIGNED NOT NULL,
+    MODIFY coin_id SMALLINT UNSIGNED NOT NULL,
+    DROP PRIMARY KEY,
+    DROP INDEX idx_leg_wallet_open,
+    DROP INDEX idx_leg_coin,
+    DROP COLUMN wallet_address,
+    DROP COLUMN coin,
+    ADD PRIMARY KEY (wallet_id, coin_id, first_seen_ms),
+    ADD INDEX idx_leg_wallet_open (wallet_id, closed_ms),
+    ADD INDEX idx_leg_coin (coin_id);
+
+ALTER TABLE hyperliquid_position_marks
+    ADD COLUMN coin_id SMALLINT UNSIGNED NULL AFTER snapshot_id;
+UPDATE hyperliquid_position_marks m JOIN hyperliquid_coins c ON c.coin = m.coin SET m.coin_id = c.coin_id;
+ALTER TABLE hyperliquid_position_marks
+    MODIFY coin_id SMALLINT UNSIGNED NOT NULL,
+    DROP PRIMARY KEY,
+    DROP COLUMN coin,
+    ADD PRIMARY KEY (snapshot_id, coin_id);
+
+-- -------------------------------------------------------------------
+-- Readable views (same definitions as schema.sql)
+-- -------------------------------------------------------------------
+CREATE OR REPLACE VIEW `hyperliquid_snapshots_v` AS
+SELECT
+    s.`snapshot_id`, w.`address` AS `wallet_address`, s.`snapshot_time_ms`, s.`snapshot_datetime`,
+    s.`account_value`, s.`total_ntl_pos`, s.`total_raw_usd`, s.`total_margin_used`,
+    s.`withdrawable`, s.`cross_maintenance_margin_used`
+FROM `hyperliquid_snapshots` s
+JOIN `wallets` w ON w.`id` = s.`wallet_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_positions_v` AS
+SELECT
+    p.`position_id`, p.`snapshot_id`, c.`coin`, p.`type`, p.`size`,
+    p.`leverage_type`, p.`leverage_value`, p.`entry_price`,
+    p.`position_value`, p.`unrealized_pnl`, p.`return_on_equity`
+FROM `hyperliquid_positions` p
+JOIN `hyperliquid_coins` c ON c.`coin_id` = p.`coin_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_open_orders_v` AS
+SELECT
+    o.`order_id`, o.`snapshot_id`, c.`coin`, o.`side`, o.`limit_price`, o.`quantity`,
+    o.`timestamp_ms`, o.`order_type`, o.`reduce_only`, o.`time_in_force`
+FROM `hyperliquid_open_orders` o
+JOIN `hyperliquid_coins` c ON c.`coin_id` = o.`coin_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_order_intervals_v` AS
+SELECT
+    i.`order_id`, w.`address` AS `wallet_address`, c.`coin`, i.`side`, i.`limit_price`, i.`quantity`,
+    i.`timestamp_ms`, i.`order_type`, i.`reduce_only`, i.`time_in_force`,
+    i.`first_seen_ms`, i.`last_seen_ms`, i.`closed_ms`
+FROM `hyperliquid_order_intervals` i
+JOIN `wallets` w ON w.`id` = i.`wallet_id`
+JOIN `hyperliquid_coins` c ON c.`coin_id` = i.`coin_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_position_intervals_v` AS
+SELECT
+    w.`address` AS `wallet_address`, c.`coin`, l.`type`, l.`size`,
+    l.`leverage_type`, l.`leverage_value`, l.`entry_price`,
+    l.`first_seen_ms`, l.`last_seen_ms`, l.`closed_ms`
+FROM `hyperliquid_position_intervals` l
+JOIN `wallets` w ON w.`id` = l.`wallet_id`
+JOIN `hyperliquid_coins` c ON c.`coin_id` = l.`coin_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_position_history` AS
+SELECT
+    s.`snapshot_id`, w.`address` AS `wallet_address`, s.`snapshot_time_ms`,
+    c.`coin`, l.`type`, l.`size`, l.`leverage_type`, l.`leverage_value`, l.`entry_price`,
+    m.`position_value`, m.`unrealized_pnl`, m.`return_on_equity`
+FROM `hyperliquid_snapshots` s
+JOIN `wallets` w ON w.`id` = s.`wallet_id`
+JOIN `hyperliquid_position_intervals` l
+    ON l.`wallet_id` = s.`wallet_id`
+   AND l.`first_seen_ms` <= s.`snapshot_time_ms`
+   AND (l.`closed_ms` IS NULL OR l.`closed_ms` > s.`snapshot_time_ms`)
+JOIN `hyperliquid_coins` c ON c.`coin_id` = l.`coin_id`
+LEFT JOIN `hyperliquid_position_marks` m
+    ON m.`snapshot_id` = s.`snapshot_id` AND m.`coin_id` = l.`coin_id`;
@@ -0,0 +1,114 @@
+-- Migration to add the latest-state tables (--latest-state)
+-- Run this if you have an existing database and want to apply the new changes.
+-- The tables are seeded from each wallet's newest stored snapshot (per-snapshot row storage).
+
+-- -------------------------------------------------------------------
+-- Latest state (--latest-state): each wallet's newest snapshot, kept
+-- up to date by the writer in the snapshot's transaction (see
+-- latest_state.py), so "what does wallet X hold now" is a primary-key
+-- lookup however much history there is.
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_wallet_latest` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_time_ms` BIGINT UNSIGNED NOT NULL,
+    `snapshot_datetime` DATETIME NOT NULL,
+    `account_value` DECIMAL(30, 18) NOT NULL,
+    `total_ntl_pos` DECIMAL(30, 18) NOT NULL,
+    `total_raw_usd` DECIMAL(30, 18) NOT NULL,
+    `total_margin_used` DECIMAL(30, 18) NOT NULL,
+    `withdrawable` DECIMAL(30, 18) NOT NULL,
+    `cross_maintenance_margin_used` DECIMAL(30, 18) NULL,
+
+    PRIMARY KEY (`wallet_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `hyperliquid_latest_positions` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `coin_id` SMALLINT UNSIGNED NOT NULL,
+    `snapshot_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_time_ms` BIGINT UNSIGNED NOT NULL,
+    `type` VARCHAR(16) NOT NULL,
+    `size` DECIMAL(30, 18) NOT NULL,
+    `leverage_type` VARCHAR(16) NOT NULL,
+    `leverage_value` INT NOT NULL,
+    `entry_price` DECIMAL(30, 18) NULL,
+    `position_value` DECIMAL(30, 18) NOT NULL,
+    `unrealized_pnl` DECIMAL(30, 18) NOT NULL,
+    `return_on_equity` DECIMAL(30, 18) NOT NULL,
+
+    PRIMARY KEY (`wallet_id`, `coin_id`),
+    INDEX `idx_latest_position_coin` (`coin_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `hyperliquid_latest_orders` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `order_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_time_ms` BIGINT UNSIGNED NOT NULL,
+    `coin_id` SMALLINT UNSIGNED NOT NULL,
+    `side` CHAR(1) NOT NULL,
+    `limit_price` DECIMAL(30, 18) NOT NULL,
+    `quantity` DECIMAL(30, 18) NOT NULL,
+    `timestamp_ms` BIGINT UNSIGNED NOT NULL,
+    `order_type` VARCHAR(16) NOT NULL,
+    `reduce_only` BOOLEAN NOT NULL,
+    `time_in_force` VARCHAR(16) NOT NULL,
+
+    PRIMARY KEY (`wallet_id`, `order_id`),
+    INDEX `idx_latest_order_coin` (`coin_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -------------------------------------------------------------------
+-- Seed from history
+-- -------------------------------------------------------------------
+INSERT IGNORE INTO hyperliquid_wallet_latest
+SELECT s.wallet_id, s.snapshot_id, s.snapshot_time_ms, s.snapshot_datetime,
+       s.account_value, s.total_ntl_pos, s.total_raw_usd, s.total_margin_used,
+       s.withdrawable, s.cross_maintenance_margin_used
+FROM hyperliquid_snapshots s
+JOIN (
+    SELECT wallet_id, MAX(snapshot_time_ms) AS snapshot_time_ms
+    FROM hyperliquid_snapshots GROUP BY wallet_id
+) newest ON newest.wallet_id = s.wallet_id AND newest.snapshot_time_ms = s.snapshot_time_ms;
+
+INSERT IGNORE INTO hyperliquid_latest_positions
+SELECT l.wallet_id, p.coin_id, p.snapshot_id, p.snapshot_time_ms, p.type, p.size,
+       p.leverage_type, p.leverage_value, p.entry_price,
+       p.position_value, p.unrealized_pnl, p.return_on_equity
+FROM hyperliquid_wallet_latest l
+JOIN hyperliquid_positions p ON p.snapshot_id = l.snapshot_id AND p.snapshot_time_ms = l.snapshot_time_ms;
+
+INSERT IGNORE INTO hyperliquid_latest_orders
+SELECT l.wallet_id, o.order_id, o.snapshot_id, o.snapshot_time_ms, o.coin_id, o.side,
+       o.limit_price, o.quantity, o.timestamp_ms, o.order_type, o.reduce_only, o.time_in_force
+FROM hyperliquid_wallet_latest l
+JOIN hyperliquid_open_orders o ON o.snapshot_id = l.snapshot_id AND o.snapshot_time_ms = l.snapshot_time_ms;
+
+-- -------------------------------------------------------------------
+-- Readable views
+-- -------------------------------------------------------------------
+CREATE OR REPLACE VIEW `hyperliquid_wallet_latest_v` AS
+SELECT
+    w.`address` AS `wallet_address`, l.`snapshot_id`, l.`snapshot_time_ms`, l.`snapshot_datetime`,
+    l.`account_value`, l.`total_ntl_pos`, l.`total_raw_usd`, l.`total_margin_used`,
+    l.`withdrawable`, l.`cross_maintenance_margin_used`
+FROM `hyperliquid_wallet_latest` l
+JOIN `wallets` w ON w.`id` = l.`wallet_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_latest_positions_v` AS
+SELECT
+    w.`address` AS `wallet_address`, c.`coin`, p.`snapshot_id`, p.`snapshot_time_ms`, p.`type`, p.`size`,
+    p.`leverage_type`, p.`leverage_value`, p.`entry_price`,
+    p.`position_value`, p.`unrealized_pnl`, p.`return_on_equity`
+FROM `hyperliquid_latest_positions` p
+JOIN `wallets` w ON w.`id` = p.`wallet_id`
+JOIN `hyperliquid_coins` c ON c.`coin_id` = p.`coin_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_latest_orders_v` AS
+SELECT
+    w.`address` AS `wallet_address`, o.`order_id`, o.`snapshot_id`, o.`snapshot_time_ms`, c.`coin`, o.`side`,
+    o.`limit_price`, o.`quantity`, o.`timestamp_ms`, o.`order_type`, o.`reduce_only`, o.`time_in_force`
+FROM `hyperliquid_latest_orders` o
+JOIN `wallets` w ON w.`id` = o.`wallet_id`
+JOIN `hyperliquid_coins` c ON c.`coin_id` = o.`coin_id`;
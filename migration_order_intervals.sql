@@ -0,0 +1,29 @@
+-- Migration to add interval-encoded open order storage (--order-storage intervals|both)
+-- Run this if you have an existing database and want to apply the new changes.
+-- Existing hyperliquid_open_orders rows are left untouched.
+
+CREATE TABLE IF NOT EXISTS `hyperliquid_order_intervals` (
+    `order_id` BIGINT UNSIGNED NOT NULL,
+    `wallet_address` CHAR(42) NOT NULL,
+
+    -- Order Details (as in hyperliquid_open_orders)
+    `coin` VARCHAR(16) NOT NULL,
+    `side` CHAR(1) NOT NULL,
+    `limit_price` DECIMAL(30, 18) NOT NULL,
+    `quantity` DECIMAL(30, 18) NOT NULL,
+    `timestamp_ms` BIGINT UNSIGNED NOT NULL,
+    `order_type` VARCHAR(16) NOT NULL,
+    `reduce_only` BOOLEAN NOT NULL,
+    `time_in_force` VARCHAR(16) NOT NULL,
+
+    -- Lifetime (snapshot times, ms)
+    `first_seen_ms` BIGINT UNSIGNED NOT NULL,
+    `last_seen_ms` BIGINT UNSIGNED NOT NULL,
+    `closed_ms` BIGINT UNSIGNED NULL COMMENT 'NULL while the order is still open',
+
+    PRIMARY KEY (`order_id`, `first_seen_ms`),
+    -- Open intervals of a wallet (incremental updates) and point-in-time lookups
+    INDEX `idx_interval_wallet_open` (`wallet_address`, `closed_ms`),
+    INDEX `idx_interval_wallet_time` (`wallet_address`, `first_seen_ms`),
+    INDEX `idx_interval_coin` (`coin`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,77 @@
+-- Migration to day-partition the snapshot tables on snapshot_time_ms (see partition_maintenance.py)
+-- Run this if you have an existing database and want to apply the new changes.
+-- Stop the monitors first. Each ALTER ... PARTITION BY copies its table once, so allow for the
+-- time and temporary disk space of a full table rebuild.
+
+-- -------------------------------------------------------------------
+-- 1. Foreign keys are not supported on partitioned tables
+-- -------------------------------------------------------------------
+ALTER TABLE hyperliquid_positions DROP FOREIGN KEY fk_position_snapshot_id;
+ALTER TABLE hyperliquid_open_orders DROP FOREIGN KEY fk_order_snapshot_id;
+ALTER TABLE hyperliquid_position_marks DROP FOREIGN KEY fk_mark_snapshot_id;
+
+-- -------------------------------------------------------------------
+-- 2. Children carry their snapshot's time (the partition key)
+-- -------------------------------------------------------------------
+ALTER TABLE hyperliquid_positions ADD COLUMN snapshot_time_ms BIGINT UNSIGNED NOT NULL DEFAULT 0 AFTER snapshot_id;
+UPDATE hyperliquid_positions p
+    JOIN hyperliquid_snapshots s ON s.snapshot_id = p.snapshot_id
+SET p.snapshot_time_ms = s.snapshot_time_ms;
+
+ALTER TABLE hyperliquid_open_orders ADD COLUMN snapshot_time_ms BIGINT UNSIGNED NOT NULL DEFAULT 0 AFTER snapshot_id;
+UPDATE hyperliquid_open_orders o
+    JOIN hyperliquid_snapshots s ON s.snapshot_id = o.snapshot_id
+SET o.snapshot_time_ms = s.snapshot_time_ms;
+
+ALTER TABLE hyperliquid_position_marks ADD COLUMN snapshot_time_ms BIGINT UNSIGNED NOT NULL DEFAULT 0 AFTER snapshot_id;
+UPDATE hyperliquid_position_marks m
+    JOIN hyperliquid_snapshots s ON s.snapshot_id = m.snapshot_id
+SET m.snapshot_time_ms = s.snapshot_time_ms;
+
+-- -------------------------------------------------------------------
+-- 3. Every unique key must include the partition key
+-- -------------------------------------------------------------------
+ALTER TABLE hyperliquid_snapshots
+    DROP PRIMARY KEY, ADD PRIMARY KEY (snapshot_id, snapshot_time_ms);
+ALTER TABLE hyperliquid_positions
+    ALTER COLUMN snapshot_time_ms DROP DEFAULT,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (position_id, snapshot_time_ms);
+ALTER TABLE hyperliquid_open_orders
+    ALTER COLUMN snapshot_time_ms DROP DEFAULT,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (order_id, snapshot_id, snapshot_time_ms);
+ALTER TABLE hyperliquid_position_marks
+    ALTER COLUMN snapshot_time_ms DROP DEFAULT,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (snapshot_id, coin_id, snapshot_time_ms);
+
+-- -------------------------------------------------------------------
+-- 4. Partition (catch-all only). Then split it into days, e.g.:
+--      python partition_maintenance.py --start 2025-01-01
+--    Rows older than --start stay in the first daily partition and are
+--    dropped together with it.
+-- -------------------------------------------------------------------
+ALTER TABLE hyperliquid_snapshots PARTITION BY RANGE (snapshot_time_ms) (PARTITION pmax VALUES LESS THAN MAXVALUE);
+ALTER TABLE hyperliquid_positions PARTITION BY RANGE (snapshot_time_ms) (PARTITION pmax VALUES LESS THAN MAXVALUE);
+ALTER TABLE hyperliquid_open_orders PARTITION BY RANGE (snapshot_time_ms) (PARTITION pmax VALUES LESS THAN MAXVALUE);
+ALTER TABLE hyperliquid_position_marks PARTITION BY RANGE (snapshot_time_ms) (PARTITION pmax VALUES LESS THAN MAXVALUE);
+
+-- -------------------------------------------------------------------
+-- 5. Interval tables stay unpartitioned; closed rows are purged in chunks
+-- -------------------------------------------------------------------
+ALTER TABLE hyperliquid_order_intervals ADD INDEX idx_interval_closed (closed_ms);
+ALTER TABLE hyperliquid_position_intervals ADD INDEX idx_leg_closed (closed_ms);
+
+CREATE OR REPLACE VIEW `hyperliquid_position_history` AS
+SELECT
+    s.`snapshot_id`, w.`address` AS `wallet_address`, s.`snapshot_time_ms`,
+    c.`coin`, l.`type`, l.`size`, l.`leverage_type`, l.`leverage_value`, l.`entry_price`,
+    m.`position_value`, m.`unrealized_pnl`, m.`return_on_equity`
+FROM `hyperliquid_snapshots` s
+JOIN `wallets` w ON w.`id` = s.`wallet_id`
+JOIN `hyperliquid_position_intervals` l
+    ON l.`wallet_id` = s.`wallet_id`
+   AND l.`first_seen_ms` <= s.`snapshot_time_ms`
+   AND (l.`closed_ms` IS NULL OR l.`closed_ms` > s.`snapshot_time_ms`)
+JOIN `hyperliquid_coins` c ON c.`coin_id` = l.`coin_id`
+LEFT JOIN `hyperliquid_position_marks` m
+    ON m.`snapshot_id` = s.`snapshot_id` AND m.`coin_id` = l.`coin_id`
+   AND m.`snapshot_time_ms` = s.`snapshot_time_ms`;
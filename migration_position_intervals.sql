@@ -0,0 +1,70 @@
+-- Migration to add run-length encoded position storage (--position-storage intervals|both)
+-- Run this if you have an existing database and want to apply the new changes.
+-- Existing hyperliquid_positions rows are left untouched.
+
+-- -------------------------------------------------------------------
+-- Table: hyperliquid_position_intervals
+-- Run-length encoded positions (--position-storage intervals|both): one
+-- row per position leg, i.e. per stretch of snapshots in which size,
+-- entry price and leverage stay the same. `closed_ms` is the first
+-- snapshot time at which the position was gone or changed.
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_position_intervals` (
+    `wallet_address` CHAR(42) NOT NULL,
+    `coin` VARCHAR(16) NOT NULL,
+
+    -- Leg Details (as in hyperliquid_positions)
+    `type` VARCHAR(16) NOT NULL,
+    `size` DECIMAL(30, 18) NOT NULL,
+    `leverage_type` VARCHAR(16) NOT NULL,
+    `leverage_value` INT NOT NULL,
+    `entry_price` DECIMAL(30, 18) NULL,
+
+    -- Lifetime (snapshot times, ms)
+    `first_seen_ms` BIGINT UNSIGNED NOT NULL,
+    `last_seen_ms` BIGINT UNSIGNED NOT NULL,
+    `closed_ms` BIGINT UNSIGNED NULL COMMENT 'NULL while the leg is still open',
+
+    PRIMARY KEY (`wallet_address`, `coin`, `first_seen_ms`),
+    -- Open legs of a wallet (incremental updates)
+    INDEX `idx_leg_wallet_open` (`wallet_address`, `closed_ms`),
+    INDEX `idx_leg_coin` (`coin`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -------------------------------------------------------------------
+-- Table: hyperliquid_position_marks
+-- Mark-dependent position metrics per snapshot (interval storage only);
+-- everything else about the position lives in its leg.
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_position_marks` (
+    `snapshot_id` BIGINT UNSIGNED NOT NULL,
+    `coin` VARCHAR(16) NOT NULL,
+    `position_value` DECIMAL(30, 18) NOT NULL,
+    `unrealized_pnl` DECIMAL(30, 18) NOT NULL,
+    `return_on_equity` DECIMAL(30, 18) NOT NULL,
+
+    PRIMARY KEY (`snapshot_id`, `coin`),
+
+    CONSTRAINT `fk_mark_snapshot_id`
+        FOREIGN KEY (`snapshot_id`)
+        REFERENCES `hyperliquid_snapshots` (`snapshot_id`)
+        ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -------------------------------------------------------------------
+-- View: hyperliquid_position_history
+-- Per-snapshot positions rebuilt from legs + marks, in the shape of
+-- hyperliquid_positions.
+-- -------------------------------------------------------------------
+CREATE OR REPLACE VIEW `hyperliquid_position_history` AS
+SELECT
+    s.`snapshot_id`, s.`wallet_address`, s.`snapshot_time_ms`,
+    l.`coin`, l.`type`, l.`size`, l.`leverage_type`, l.`leverage_value`, l.`entry_price`,
+    m.`position_value`, m.`unrealized_pnl`, m.`return_on_equity`
+FROM `hyperliquid_snapshots` s
+JOIN `hyperliquid_position_intervals` l
+    ON l.`wallet_address` = s.`wallet_address`
+   AND l.`first_seen_ms` <= s.`snapshot_time_ms`
+   AND (l.`closed_ms` IS NULL OR l.`closed_ms` > s.`snapshot_time_ms`)
+LEFT JOIN `hyperliquid_position_marks` m
+    ON m.`snapshot_id` = s.`snapshot_id` AND m.`coin` = l.`coin`;
@@ -0,0 +1,50 @@
+-- Migration to add the OHLC rollup tables (--rollups)
+-- Run this if you have an existing database and want to apply the new changes.
+-- Then fill them from history with: python rollups.py (optionally --since YYYY-MM-DD)
+
+-- -------------------------------------------------------------------
+-- Rollups (--rollups): 1m / 1h / 1d OHLC per wallet (account value,
+-- notional, margin used) and per wallet and coin (net position size),
+-- merged in by every write (see rollups.py). `bucket_ms` is the bucket
+-- start; open/close are the values of the first/last snapshot in it.
+-- Rebuild from history with `python rollups.py --since YYYY-MM-DD`.
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_wallet_rollups` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `resolution` CHAR(2) NOT NULL COMMENT '1m, 1h or 1d',
+    `bucket_ms` BIGINT UNSIGNED NOT NULL,
+    `first_ms` BIGINT UNSIGNED NOT NULL,
+    `last_ms` BIGINT UNSIGNED NOT NULL,
+    `samples` INT UNSIGNED NOT NULL,
+    `account_value_open` DECIMAL(30, 18) NOT NULL,
+    `account_value_high` DECIMAL(30, 18) NOT NULL,
+    `account_value_low` DECIMAL(30, 18) NOT NULL,
+    `account_value_close` DECIMAL(30, 18) NOT NULL,
+    `total_ntl_pos_open` DECIMAL(30, 18) NOT NULL,
+    `total_ntl_pos_high` DECIMAL(30, 18) NOT NULL,
+    `total_ntl_pos_low` DECIMAL(30, 18) NOT NULL,
+    `total_ntl_pos_close` DECIMAL(30, 18) NOT NULL,
+    `total_margin_used_open` DECIMAL(30, 18) NOT NULL,
+    `total_margin_used_high` DECIMAL(30, 18) NOT NULL,
+    `total_margin_used_low` DECIMAL(30, 18) NOT NULL,
+    `total_margin_used_close` DECIMAL(30, 18) NOT NULL,
+
+    PRIMARY KEY (`wallet_id`, `resolution`, `bucket_ms`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `hyperliquid_coin_rollups` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `coin_id` SMALLINT UNSIGNED NOT NULL,
+    `resolution` CHAR(2) NOT NULL COMMENT '1m, 1h or 1d',
+    `bucket_ms` BIGINT UNSIGNED NOT NULL,
+    `first_ms` BIGINT UNSIGNED NOT NULL,
+    `last_ms` BIGINT UNSIGNED NOT NULL,
+    `samples` INT UNSIGNED NOT NULL,
+    `size_open` DECIMAL(30, 18) NOT NULL,
+    `size_high` DECIMAL(30, 18) NOT NULL,
+    `size_low` DECIMAL(30, 18) NOT NULL,
+    `size_close` DECIMAL(30, 18) NOT NULL,
+
+    PRIMARY KEY (`wallet_id`, `coin_id`, `resolution`, `bucket_ms`),
+    INDEX `idx_coin_rollup_coin` (`coin_id`, `resolution`, `bucket_ms`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
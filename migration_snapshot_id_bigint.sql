@@ -0,0 +1,17 @@
+-- Migration to widen snapshot_id to BIGINT UNSIGNED for client-generated 64-bit ids
+-- Run this if you have an existing database and want to enable --client-ids.
+-- The foreign keys are dropped and re-created around the type change.
+
+ALTER TABLE hyperliquid_positions DROP FOREIGN KEY fk_position_snapshot_id;
+ALTER TABLE hyperliquid_open_orders DROP FOREIGN KEY fk_order_snapshot_id;
+
+ALTER TABLE hyperliquid_snapshots MODIFY snapshot_id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT;
+ALTER TABLE hyperliquid_positions MODIFY snapshot_id BIGINT UNSIGNED NOT NULL;
+ALTER TABLE hyperliquid_open_orders MODIFY snapshot_id BIGINT UNSIGNED NOT NULL;
+
+ALTER TABLE hyperliquid_positions
+    ADD CONSTRAINT fk_position_snapshot_id
+        FOREIGN KEY (snapshot_id) REFERENCES hyperliquid_snapshots (snapshot_id) ON DELETE CASCADE;
+ALTER TABLE hyperliquid_open_orders
+    ADD CONSTRAINT fk_order_snapshot_id
+        FOREIGN KEY (snapshot_id) REFERENCES hyperliquid_snapshots (snapshot_id) ON DELETE CASCADE;
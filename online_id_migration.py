@@ -0,0 +1,280 @@
+import argparse
+import logging
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+from sql_utils import in_clause
+
+logger = logging.getLogger(__name__)
+
+SHADOW_SUFFIX = '_new'
+OLD_SUFFIX = '_old'
+
+# Defaults
+COPY_CHUNK_SIZE = 10000
+COPY_PAUSE = 0.05                # Seconds between copy chunks
+SHADOW_REFRESH_INTERVAL = 30.0   # Seconds between dual-write checks for shadow tables
+
+# Id columns that must be BIGINT UNSIGNED, and the tables that hold them.
+# Every table here has a snapshot_id (used to mirror rows during dual-write);
+# rows are copied in key order of the first primary key column.
+ID_COLUMNS = ('snapshot_id', 'position_id')
+MIGRATION_TABLES = {
+    'hyperliquid_snapshots': 'snapshot_id',
+    'hyperliquid_positions': 'position_id',
+    'hyperliquid_open_orders': 'order_id',
+    'hyperliquid_position_marks': 'snapshot_id',
+}
+
+
+def shadow_name(table: str) -> str:
+    return table + SHADOW_SUFFIX
+
+
+def narrow_columns(cursor: Any) -> Dict[str, List[Dict]]:
+    """Id columns that are not BIGINT yet, by table (information_schema.COLUMNS rows)."""
+    tables = list(MIGRATION_TABLES)
+    cursor.execute(
+        f"SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, IS_NULLABLE, EXTRA FROM information_schema.COLUMNS "
+        f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({in_clause(tables)}) "
+        f"AND COLUMN_NAME IN ({in_clause(list(ID_COLUMNS))})",
+        tables + list(ID_COLUMNS)
+    )
+    narrow: Dict[str, List[Dict]] = {}
+    for row in cursor.fetchall():
+        if row['DATA_TYPE'].lower() != 'bigint':
+            narrow.setdefault(row['TABLE_NAME'], []).append(row)
+    return narrow
+
+
+def widen_sql(table: str, columns: List[Dict]) -> str:
+    """ALTER for the (still empty) shadow table: every listed column becomes BIGINT UNSIGNED."""
+    modifies = []
+    for column in columns:
+        definition = f"MODIFY {column['COLUMN_NAME']} BIGINT UNSIGNED"
+        definition += " NULL" if column['IS_NULLABLE'] == 'YES' else " NOT NULL"
+        if 'auto_increment' in column['EXTRA'].lower():
+            definition += " AUTO_INCREMENT"
+        modifies.append(definition)
+    return f"ALTER TABLE {shadow_name(table)} {', '.join(modifies)}"
+
+
+def mirror_sql(table: str, count: int) -> str:
+    """Copy `count` snapshots' rows (by snapshot_id, within a time range) into the shadow."""
+    return (
+        f"INSERT IGNORE INTO {shadow_name(table)} SELECT * FROM {table} "
+        f"WHERE snapshot_id IN ({in_clause([None] * count)}) "
+        f"AND snapshot_time_ms BETWEEN %s AND %s"
+    )
+
+
+def cutover_sql(tables: Iterable[str]) -> str:
+    """One atomic RENAME: live tables become *_old, shadows take their place."""
+    renames = []
+    for table in tables:
+        renames.append(f"{table} TO {table}{OLD_SUFFIX}")
+        renames.append(f"{shadow_name(table)} TO {table}")
+    return f"RENAME TABLE {', '.join(renames)}"
+
+
+# --- Dual-write (used by MySQLStealthClient while a migration is running) ---
+
+class ShadowWriter:
+    """
+    Mirrors freshly written snapshots into the shadow tables of a running migration.
+
+    Rows are copied server-side with INSERT IGNORE ... SELECT inside the
+    writer's transaction, so the shadow gets the exact same ids and the
+    chunked copy may overlap with it harmlessly. Which shadow tables exist is
+    re-checked every `refresh_interval` seconds; after the cutover the shadows
+    are gone and mirroring stops by itself.
+    """
+
+    def __init__(self, refresh_interval: float = SHADOW_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._tables: List[str] = []
+        self._checked = float('-inf')
+        self._lock = threading.Lock()
+
+    def tables(self, cursor: Any) -> List[str]:
+        """Live tables that currently have a shadow table."""
+        with self._lock:
+            if time.monotonic() - self._checked < self.refresh_interval:
+                return list(self._tables)
+        shadows = [shadow_name(table) for table in MIGRATION_TABLES]
+        cursor.execute(
+            f"SELECT TABLE_NAME FROM information_schema.TABLES "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({in_clause(shadows)})",
+            shadows
+        )
+        found = {row['TABLE_NAME'] for row in cursor.fetchall()}
+        tables = [table for table in MIGRATION_TABLES if shadow_name(table) in found]
+        with self._lock:
+            if tables != self._tables:
+                logger.info(f"🔀 Dual-writing to shadow tables: {tables or 'none'}")
+            self._tables = tables
+            self._checked = time.monotonic()
+        return tables
+
+    def forget(self, table: str):
+        """Stop mirroring `table` (its shadow disappeared, e.g. after the cutover)."""
+        with self._lock:
+            if table in self._tables:
+                self._tables.remove(table)
+                logger.info(f"🔀 Shadow of {table} is gone, dual-write for it stopped")
+
+
+_registry_lock = threading.Lock()
+_writers: Dict[Hashable, ShadowWriter] = {}
+
+
+def get_shadow_writer(database: Hashable) -> ShadowWriter:
+    """Return the process-wide shadow writer of one database."""
+    with _registry_lock:
+        writer = _writers.get(database)
+        if writer is None:
+            writer = _writers[database] = ShadowWriter()
+        return writer
+
+
+# --- Migration steps ---
+
+def prepare(conn: Any) -> List[str]:
+    """Create empty BIGINT-keyed shadow tables for every table with a narrow id column."""
+    with conn.cursor() as cursor:
+        narrow = narrow_columns(cursor)
+        for table, columns in narrow.items():
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {shadow_name(table)} LIKE {table}")
+            cursor.execute(widen_sql(table, columns))
+            logger.info(f"🆕 {shadow_name(table)}: {', '.join(c['COLUMN_NAME'] for c in columns)} -> BIGINT UNSIGNED")
+    conn.commit()
+    if not narrow:
+        logger.info("All id columns are already BIGINT, nothing to migrate")
+    return list(narrow)
+
+
+def existing_shadows(conn: Any) -> List[str]:
+    with conn.cursor() as cursor:
+        return ShadowWriter(refresh_interval=0).tables(cursor)
+
+
+def copy_table(conn: Any, table: str, chunk_size: int = COPY_CHUNK_SIZE,
+               pause: float = COPY_PAUSE, from_key: Optional[int] = None) -> int:
+    """
+    Copy `table` into its shadow in key-range chunks, one short transaction each.
+
+    Only rows up to the key maximum at start are copied; anything newer is
+    mirrored by dual-writing clients. INSERT IGNORE makes chunks idempotent,
+    so an interrupted copy can simply be restarted (optionally `from_key`).
+
+    Returns:
+        Number of rows inserted into the shadow table.
+    """
+    key = MIGRATION_TABLES[table]
+    shadow = shadow_name(table)
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({key}) AS lo, MAX({key}) AS hi FROM {table}")
+        bounds = cursor.fetchone()
+    conn.commit()
+    if bounds['hi'] is None:
+        return 0
+
+    low = from_key if from_key is not None else bounds['lo'] - 1
+    copied = 0
+    while low < bounds['hi']:
+        with conn.cursor() as cursor:
+            # Upper edge of the next chunk; a non-unique key only makes a chunk a bit larger
+            cursor.execute(
+                f"SELECT {key} AS k FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT 1 OFFSET %s",
+                (low, chunk_size - 1)
+            )
+            row = cursor.fetchone()
+            high = min(row['k'], bounds['hi']) if row else bounds['hi']
+            copied += cursor.execute(
+                f"INSERT IGNORE INTO {shadow} SELECT * FROM {table} WHERE {key} > %s AND {key} <= %s",
+                (low, high)
+            )
+        conn.commit()
+        logger.info(f"📦 {table}: copied up to {key} {high} ({copied} rows)")
+        low = high
+        time.sleep(pause)
+    return copied
+
+
+def verify(conn: Any, tables: List[str]) -> bool:
+    """Compare live and shadow row counts on one consistent snapshot."""
+    ok = True
+    with conn.cursor() as cursor:
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        for table in tables:
+            cursor.execute(f"SELECT COUNT(*) AS n FROM {table}")
+            live = cursor.fetchone()['n']
+            cursor.execute(f"SELECT COUNT(*) AS n FROM {shadow_name(table)}")
+            shadow = cursor.fetchone()['n']
+            if live == shadow:
+                logger.info(f"✅ {table}: {live} rows in both")
+            else:
+                logger.error(f"❌ {table}: {live} live rows vs {shadow} in {shadow_name(table)}")
+                ok = False
+    conn.commit()
+    return ok
+
+
+def cutover(conn: Any, tables: List[str]):
+    with conn.cursor() as cursor:
+        cursor.execute(cutover_sql(tables))
+    logger.info(f"🔀 Cut over {', '.join(tables)}; previous tables kept as *{OLD_SUFFIX}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Online migration of snapshot/position ids to BIGINT via shadow tables.',
+        epilog='Order: prepare, restart monitors with --dual-write, copy, verify, cutover.'
+    )
+    parser.add_argument('step', choices=['plan', 'prepare', 'copy', 'verify', 'cutover'])
+    parser.add_argument('--table', choices=list(MIGRATION_TABLES), help='copy: only this table')
+    parser.add_argument('--chunk-size', type=int, default=COPY_CHUNK_SIZE,
+                        help=f'copy: rows per chunk (default: {COPY_CHUNK_SIZE})')
+    parser.add_argument('--pause', type=float, default=COPY_PAUSE,
+                        help=f'copy: seconds between chunks (default: {COPY_PAUSE})')
+    parser.add_argument('--from-key', type=int, default=None, help='copy: resume after this key')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    from data_inserter_env import load_env_config
+    from db_pool import get_pool, close_all
+
+    config = load_env_config()
+    try:
+        with get_pool(config['SSH_CONFIG'], config['DB_CONFIG']).connection() as conn:
+            if args.step == 'plan':
+                with conn.cursor() as cursor:
+                    for table, columns in narrow_columns(cursor).items():
+                        print(f"CREATE TABLE {shadow_name(table)} LIKE {table};")
+                        print(widen_sql(table, columns) + ";")
+                return
+            if args.step == 'prepare':
+                prepare(conn)
+                return
+
+            tables = existing_shadows(conn)
+            if not tables:
+                raise SystemExit("No shadow tables found; run the 'prepare' step first")
+            if args.step == 'copy':
+                for table in ([args.table] if args.table else tables):
+                    copy_table(conn, table, args.chunk_size, args.pause, args.from_key)
+            elif args.step == 'verify':
+                if not verify(conn, tables):
+                    raise SystemExit(1)
+            elif args.step == 'cutover':
+                if not verify(conn, tables):
+                    raise SystemExit("Row counts differ; not cutting over")
+                cutover(conn, tables)
+    finally:
+        close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping
+
+from intervals import IntervalTable, apply_intervals
+
+logger = logging.getLogger(__name__)
+
+# Storage modes for open orders
+ORDER_STORAGE_ROWS = 'rows'            # hyperliquid_open_orders: one row per order per snapshot
+ORDER_STORAGE_INTERVALS = 'intervals'  # hyperliquid_order_intervals: one row per order lifetime
+ORDER_STORAGE_BOTH = 'both'
+ORDER_STORAGE_MODES = (ORDER_STORAGE_ROWS, ORDER_STORAGE_INTERVALS, ORDER_STORAGE_BOTH)
+
+INTERVAL_COLUMNS = [
+    'order_id', 'wallet_id', 'coin_id', 'side', 'limit_price', 'quantity',
+    'timestamp_ms', 'order_type', 'reduce_only', 'time_in_force',
+    'first_seen_ms', 'last_seen_ms',
+]
+
+ORDER_INTERVALS = IntervalTable(
+    table='hyperliquid_order_intervals',
+    key='order_id',
+    state_columns=('limit_price', 'quantity'),
+    insert_columns=INTERVAL_COLUMNS,
+)
+
+# Orders of a wallet that were open at time T (ms), in readable form
+OPEN_ORDERS_AT_SQL = """
+    SELECT order_id, coin, side, limit_price, quantity, timestamp_ms,
+           order_type, reduce_only, time_in_force, first_seen_ms, last_seen_ms, closed_ms
+    FROM hyperliquid_order_intervals_v
+    WHERE wallet_address = %s
+      AND first_seen_ms <= %s
+      AND (closed_ms IS NULL OR closed_ms > %s)
+    ORDER BY order_id
+"""
+
+
+def _same_state(row: Dict, order: Dict) -> bool:
+    """True if a stored interval still describes the order (price/size unchanged)."""
+    return (Decimal(str(row['limit_price'])) == Decimal(str(order['limit_price']))
+            and Decimal(str(row['quantity'])) == Decimal(str(order['quantity'])))
+
+
+def apply_order_snapshot(cursor: Any, wallet_id: int, snapshot_time_ms: int,
+                         open_orders: List[Dict], coin_ids: Mapping[str, int]) -> Dict[str, int]:
+    """
+    Fold one snapshot's open orders into the wallet's order intervals.
+
+    Orders still open with the same price and size get `last_seen_ms`
+    extended; orders that disappeared (or were modified) are closed at this
+    snapshot's time; new (or modified) orders open a new interval. Wallet and
+    coins are dictionary ids (see id_dictionary). Must run inside the
+    snapshot's transaction. Snapshots not newer than the wallet's latest
+    applied one, closed intervals included, are ignored (see
+    intervals.apply_intervals), so replays are harmless.
+
+    Returns:
+        Counts of extended, closed and opened intervals.
+    """
+    def new_row(o: Dict) -> tuple:
+        return (
+            o['order_id'], wallet_id, coin_ids[o['coin']], o['side'], o['limit_price'],
+            o['quantity'], o['timestamp_ms'], o['order_type'], o['reduce_only'],
+            o['time_in_force'], snapshot_time_ms, snapshot_time_ms
+        )
+
+    current = {o['order_id']: o for o in open_orders}
+    return apply_intervals(cursor, ORDER_INTERVALS, wallet_id, snapshot_time_ms, current, _same_state, new_row)
+
+
+def open_orders_at(cursor: Any, wallet_address: str, time_ms: int) -> List[Dict]:
+    """Reconstruct a wallet's open orders at `time_ms` from the interval table."""
+    cursor.execute(OPEN_ORDERS_AT_SQL, (wallet_address, time_ms, time_ms))
+    return list(cursor.fetchall())
@@ -0,0 +1,464 @@
+import argparse
+import datetime
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sinks import EMBEDDED_COLUMNS, SnapshotItem, SnapshotSink, embedded_rows
+from snapshot_digest import SnapshotDigestCache
+
+logger = logging.getLogger(__name__)
+
+# Defaults
+ARCHIVE_ROOT = 'snapshot_archive'
+COMPRESSION = 'zstd'
+ROW_GROUP_SIZE = 100000               # Rows per row group: min/max statistics per group drive predicate pushdown
+FLUSH_SNAPSHOTS = 5000                # Live sink: buffered snapshots before files are written
+FLUSH_INTERVAL = 300.0                # Live sink: seconds between flushes at low volume
+TARGET_FILE_BYTES = 128 * 1024 ** 2   # Compaction merges smaller files up to about this size
+FETCH_SIZE = 10000                    # Export: rows per fetchmany from the streaming cursor
+
+DAY_MS = 86400 * 1000
+DECIMAL_PRECISION, DECIMAL_SCALE = 30, 18  # Same as the MySQL columns
+
+# Arrow type of each archive column (anything not listed is a decimal)
+COLUMN_TYPES = {
+    'snapshot_id': 'int64', 'snapshot_time_ms': 'int64', 'order_id': 'int64', 'timestamp_ms': 'int64',
+    'leverage_value': 'int32', 'snapshot_datetime': 'timestamp', 'reduce_only': 'bool',
+    'wallet_address': 'string', 'coin': 'string', 'type': 'string', 'leverage_type': 'string',
+    'side': 'string', 'order_type': 'string', 'time_in_force': 'string',
+}
+
+# Rows are sorted by these columns before writing, so row groups cover narrow key ranges
+SORT_KEYS = {
+    'hyperliquid_snapshots': ['wallet_address', 'snapshot_time_ms'],
+    'hyperliquid_positions': ['coin', 'snapshot_time_ms'],
+    'hyperliquid_open_orders': ['coin', 'snapshot_time_ms'],
+}
+
+# Export: MySQL source of each archive table (t = the table itself), in the readable shape
+EXPORT_SOURCES = {
+    'hyperliquid_snapshots': "hyperliquid_snapshots t JOIN wallets w ON w.id = t.wallet_id",
+    'hyperliquid_positions': "hyperliquid_positions t JOIN hyperliquid_coins c ON c.coin_id = t.coin_id",
+    'hyperliquid_open_orders': "hyperliquid_open_orders t JOIN hyperliquid_coins c ON c.coin_id = t.coin_id",
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("The Parquet archive needs the pyarrow package (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+
+def partition_date(snapshot_time_ms: int) -> str:
+    """UTC day of a snapshot, as used in the `date=YYYY-MM-DD` directory names."""
+    return datetime.datetime.fromtimestamp(snapshot_time_ms / 1000, datetime.timezone.utc).date().isoformat()
+
+
+def partition_dir(root: str, table: str, date: str) -> str:
+    return os.path.join(root, table, f"date={date}")
+
+
+def split_by_date(table: str, rows: List[Tuple]) -> Dict[str, List[Tuple]]:
+    time_index = EMBEDDED_COLUMNS[table].index('snapshot_time_ms')
+    groups: Dict[str, List[Tuple]] = {}
+    for row in rows:
+        groups.setdefault(partition_date(row[time_index]), []).append(row)
+    return groups
+
+
+def export_sql(table: str) -> str:
+    """One day of `table` from MySQL, columns in archive order (partition-pruned on snapshot_time_ms)."""
+    columns = []
+    for column in EMBEDDED_COLUMNS[table]:
+        if column == 'wallet_address':
+            columns.append('w.address')
+        elif column == 'coin':
+            columns.append('c.coin')
+        else:
+            columns.append(f't.{column}')
+    return (
+        f"SELECT {', '.join(columns)} FROM {EXPORT_SOURCES[table]} "
+        f"WHERE t.snapshot_time_ms >= %s AND t.snapshot_time_ms < %s"
+    )
+
+
+def plan_compaction(files: List[Tuple[str, int]], target_bytes: int = TARGET_FILE_BYTES) -> List[List[str]]:
+    """
+    Group small files (path, size) of one partition for merging.
+
+    Files are packed in name order (i.e. write order) into groups of at most
+    `target_bytes`; groups of a single file are left alone.
+    """
+    groups, current, current_bytes = [], [], 0
+    for path, size in sorted(files):
+        if size >= target_bytes:
+            continue
+        if current and current_bytes + size > target_bytes:
+            groups.append(current)
+            current, current_bytes = [], 0
+        current.append(path)
+        current_bytes += size
+    groups.append(current)
+    return [group for group in groups if len(group) > 1]
+
+
+# --- Arrow conversion and file writing ---
+
+def _arrow_type(pa: Any, column: str) -> Any:
+    kind = COLUMN_TYPES.get(column, 'decimal')
+    if kind == 'decimal':
+        return pa.decimal128(DECIMAL_PRECISION, DECIMAL_SCALE)
+    if kind == 'timestamp':
+        return pa.timestamp('ms', tz='UTC')
+    return getattr(pa, 'bool_' if kind == 'bool' else kind)()
+
+
+def arrow_schema(table: str) -> Any:
+    pa, _ = _pyarrow()
+    return pa.schema([(column, _arrow_type(pa, column)) for column in EMBEDDED_COLUMNS[table]])
+
+
+def to_arrow(table: str, rows: Sequence[Tuple]) -> Any:
+    """
+    Build an Arrow table from archive rows.
+
+    Decimals may be strings (parsed snapshots) or Decimal objects (MySQL);
+    snapshot_datetime is always derived from snapshot_time_ms (UTC).
+    """
+    pa, _ = _pyarrow()
+    columns = EMBEDDED_COLUMNS[table]
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    by_name = dict(zip(columns, values))
+    arrays = []
+    for column in columns:
+        arrow_type = _arrow_type(pa, column)
+        column_values = by_name[column]
+        if column == 'snapshot_datetime':
+            array = pa.array(by_name['snapshot_time_ms'], pa.int64()).cast(arrow_type)
+        elif COLUMN_TYPES.get(column) == 'bool':
+            array = pa.array([None if v is None else bool(v) for v in column_values], arrow_type)
+        elif column not in COLUMN_TYPES:
+            first = next((v for v in column_values if v is not None), None)
+            if isinstance(first, str):
+                array = pa.array(column_values, pa.string()).cast(arrow_type)
+            else:
+                array = pa.array(column_values, arrow_type)
+        else:
+            array = pa.array(column_values, arrow_type)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=arrow_schema(table))
+
+
+def data_files(directory: str) -> List[str]:
+    """Names of the Parquet files readers see in a partition (temporary dot files excluded)."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if name.endswith('.parquet') and not name.startswith('.'))
+
+
+def _new_file_path(directory: str, prefix: str = 'part') -> Tuple[str, str]:
+    """Final and temporary path of a new file; the dot prefix hides the temporary one from readers."""
+    name = f"{prefix}-{time.time_ns()}-{os.getpid()}.parquet"
+    return os.path.join(directory, name), os.path.join(directory, f".{name}.tmp")
+
+
+def write_file(arrow_table: Any, path: str, tmp_path: str,
+               row_group_size: int = ROW_GROUP_SIZE, compression: str = COMPRESSION):
+    """Write a whole Arrow table to `path` atomically (via `tmp_path` and rename)."""
+    _, pq = _pyarrow()
+    pq.write_table(arrow_table, tmp_path, row_group_size=row_group_size,
+                   compression=compression, write_statistics=True)
+    os.replace(tmp_path, path)
+
+
+def write_partition(root: str, table: str, date: str, rows: List[Tuple],
+                    row_group_size: int = ROW_GROUP_SIZE, compression: str = COMPRESSION) -> str:
+    """Write rows of one day as a new file in the table's date partition; returns its path."""
+    directory = partition_dir(root, table, date)
+    os.makedirs(directory, exist_ok=True)
+    arrow_table = to_arrow(table, rows).sort_by([(key, 'ascending') for key in SORT_KEYS[table]])
+    path, tmp_path = _new_file_path(directory)
+    write_file(arrow_table, path, tmp_path, row_group_size, compression)
+    return path
+
+
+# --- Live sink ---
+
+class ParquetArchiveSink(SnapshotSink):
+    """
+    Snapshot sink writing compressed Parquet files under `root`:
+
+        root/<table>/date=YYYY-MM-DD/part-*.parquet
+
+    The tables have the embedded-sink shape (sinks.EMBEDDED_COLUMNS). Rows
+    are buffered and written every `flush_snapshots` snapshots or
+    `flush_interval` seconds (checked on insert), one file per table and
+    day, sorted by SORT_KEYS. Snapshots are reported as stored once they
+    are buffered, and are only in memory until the next flush (close()
+    flushes them): a crash loses them, and there is no spool to fall back
+    on. Many small files accumulate over a day; run `parquet_archive.py
+    compact` to merge them.
+    """
+
+    def __init__(self, root: str = ARCHIVE_ROOT, digest_cache: Optional[SnapshotDigestCache] = None,
+                 flush_snapshots: int = FLUSH_SNAPSHOTS, flush_interval: float = FLUSH_INTERVAL,
+                 row_group_size: int = ROW_GROUP_SIZE, compression: str = COMPRESSION):
+        super().__init__(digest_cache)
+        _pyarrow()  # fail at startup, not at the first flush
+        self.root = root
+        self.flush_snapshots = max(1, flush_snapshots)
+        self.flush_interval = flush_interval
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self._buffers: Dict[str, List[Tuple]] = {table: [] for table in EMBEDDED_COLUMNS}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        logger.info(f"🗄️ Archiving snapshots as Parquet under {os.path.abspath(root)}")
+
+    def _insert_batch(self, items: List[SnapshotItem], max_retries: int) -> List[bool]:
+        try:
+            batches, results = [embedded_rows(items)], [True] * len(items)
+        except Exception:
+            batches, results = [], []
+            for item in items:
+                try:
+                    batches.append(embedded_rows([item]))
+                    results.append(True)
+                except Exception as e:
+                    logger.error(f"❌ Skipping snapshot for {item[0]} at {item[1]}: {e}")
+                    results.append(False)
+
+        with self._lock:
+            for rows in batches:
+                for table, table_rows in rows.items():
+                    self._buffers[table].extend(table_rows)
+            self._buffered += sum(results)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if self._buffered >= self.flush_snapshots or due:
+                try:
+                    self._flush()
+                except Exception as e:
+                    logger.error(f"Parquet flush failed, keeping {self._buffered} snapshots buffered: {e}")
+        return results
+
+    def _flush(self):
+        """Write all buffered rows; partitions that fail stay buffered for the next flush."""
+        failed: Optional[Exception] = None
+        files = 0
+        for table in EMBEDDED_COLUMNS:
+            pending = list(split_by_date(table, self._buffers[table]).items())
+            self._buffers[table] = []
+            for date, rows in pending:
+                try:
+                    write_partition(self.root, table, date, rows, self.row_group_size, self.compression)
+                    files += 1
+                except Exception as e:
+                    self._buffers[table].extend(rows)
+                    failed = e
+        if failed is not None:
+            raise failed
+        logger.info(f"📦 Archived {self._buffered} snapshots to {files} Parquet files")
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            if self._buffered:
+                self._flush()
+
+    def close(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"❌ Final Parquet flush failed, {self._buffered} snapshots lost: {e}")
+        super().close()
+
+
+# --- Export from MySQL ---
+
+def export_day(conn: Any, root: str, table: str, day_start_ms: int,
+               fetch_size: int = FETCH_SIZE, row_group_size: int = ROW_GROUP_SIZE,
+               compression: str = COMPRESSION, replace: bool = False) -> int:
+    """
+    Export one day of `table` to `<partition>/export.parquet` (replaced if present).
+
+    `conn` should hand out unbuffered cursors (SSCursor): rows are streamed
+    and written one row group at a time, so memory stays bounded. Rows keep
+    the server's primary-key order. Returns the number of rows exported.
+
+    The partition must not hold other files (live sink parts, or compacted
+    files that may contain an earlier export), which would duplicate rows.
+    With `replace`, they are removed once a non-empty export is in place,
+    so the export becomes the day's only file; a day MySQL no longer has
+    (e.g. dropped for retention) keeps its files.
+
+    Raises:
+        FileExistsError: The partition holds other files and `replace` is not set.
+    """
+    directory = partition_dir(root, table, partition_date(day_start_ms))
+    others = [name for name in data_files(directory) if name != 'export.parquet']
+    if others and not replace:
+        raise FileExistsError(
+            f"{directory} already holds {len(others)} other Parquet files ({others[0]}, ...); "
+            f"exporting would duplicate their rows (use --replace to make the export the day's only file)"
+        )
+    _, pq = _pyarrow()
+    path = os.path.join(directory, 'export.parquet')
+    tmp_path = os.path.join(directory, '.export.parquet.tmp')
+    writer = None
+    count = 0
+    buffered: List[Tuple] = []
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(export_sql(table), (day_start_ms, day_start_ms + DAY_MS))
+            while True:
+                chunk = cursor.fetchmany(fetch_size)
+                if chunk:
+                    buffered.extend(chunk)
+                if buffered and (len(buffered) >= row_group_size or not chunk):
+                    if writer is None:
+                        os.makedirs(directory, exist_ok=True)
+                        writer = pq.ParquetWriter(tmp_path, arrow_schema(table), compression=compression)
+                    writer.write_table(to_arrow(table, buffered), row_group_size=row_group_size)
+                    count += len(buffered)
+                    buffered = []
+                if not chunk:
+                    break
+        conn.commit()
+    except Exception:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+    if writer is None:
+        if replace and others:
+            # E.g. the day was dropped from MySQL for retention: the archive is the only copy
+            logger.warning(f"⚠️ {directory}: nothing to export, keeping its {len(others)} files")
+        return count
+    writer.close()
+    os.replace(tmp_path, path)
+    if replace:
+        for name in others:
+            os.remove(os.path.join(directory, name))
+    return count
+
+
+def export_range(conn: Any, root: str, since: datetime.date, until: datetime.date,
+                 tables: Sequence[str] = tuple(EMBEDDED_COLUMNS), fetch_size: int = FETCH_SIZE,
+                 row_group_size: int = ROW_GROUP_SIZE, compression: str = COMPRESSION,
+                 replace: bool = False) -> int:
+    """Export the UTC days [since, until) of `tables`, one file per table and day (see export_day)."""
+    day = datetime.datetime.combine(since, datetime.time(), tzinfo=datetime.timezone.utc)
+    end = datetime.datetime.combine(until, datetime.time(), tzinfo=datetime.timezone.utc)
+    total = 0
+    while day < end:
+        day_start_ms = int(day.timestamp() * 1000)
+        for table in tables:
+            count = export_day(conn, root, table, day_start_ms, fetch_size, row_group_size, compression, replace)
+            if count:
+                logger.info(f"📦 {table} {day.date()}: exported {count} rows")
+            total += count
+        day += datetime.timedelta(days=1)
+    return total
+
+
+# --- Compaction ---
+
+def compact_partition(directory: str, table: str, target_bytes: int = TARGET_FILE_BYTES,
+                      row_group_size: int = ROW_GROUP_SIZE, compression: str = COMPRESSION) -> int:
+    """
+    Merge small files of one date partition into sorted files of up to `target_bytes`.
+
+    The merged file is renamed into place before its inputs are removed, so
+    readers never miss rows (a crash in between leaves duplicates). Run one
+    compaction per archive at a time. Returns the number of files removed.
+    """
+    pa, pq = _pyarrow()
+    files = [
+        (os.path.join(directory, name), os.path.getsize(os.path.join(directory, name)))
+        for name in data_files(directory)
+    ]
+    removed = 0
+    for group in plan_compaction(files, target_bytes):
+        merged = pa.concat_tables([pq.read_table(path) for path in group])
+        merged = merged.sort_by([(key, 'ascending') for key in SORT_KEYS[table]])
+        path, tmp_path = _new_file_path(directory, prefix='compact')
+        write_file(merged, path, tmp_path, row_group_size, compression)
+        for old in group:
+            os.remove(old)
+        removed += len(group)
+        logger.info(f"🗜️ {directory}: merged {len(group)} files ({merged.num_rows} rows)")
+    return removed
+
+
+def compact(root: str, tables: Sequence[str] = tuple(EMBEDDED_COLUMNS),
+            target_bytes: int = TARGET_FILE_BYTES, row_group_size: int = ROW_GROUP_SIZE,
+            compression: str = COMPRESSION) -> int:
+    removed = 0
+    for table in tables:
+        table_dir = os.path.join(root, table)
+        if not os.path.isdir(table_dir):
+            continue
+        for name in sorted(os.listdir(table_dir)):
+            if name.startswith('date='):
+                removed += compact_partition(os.path.join(table_dir, name), table, target_bytes,
+                                             row_group_size, compression)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parquet archive of snapshots: export from MySQL, compact small files.')
+    parser.add_argument('step', choices=['export', 'compact'])
+    parser.add_argument('--root', default=ARCHIVE_ROOT, help=f'Archive directory (default: {ARCHIVE_ROOT})')
+    parser.add_argument('--table', choices=list(EMBEDDED_COLUMNS), help='Only this table')
+    parser.add_argument('--since', type=datetime.date.fromisoformat, default=None,
+                        help='export: first day (YYYY-MM-DD, UTC)')
+    parser.add_argument('--until', type=datetime.date.fromisoformat, default=None,
+                        help='export: day after the last one (default: today, i.e. up to yesterday)')
+    parser.add_argument('--replace', action='store_true',
+                        help='export: remove the other files of each exported day (live parts, compacted files); empty days are left alone')
+    parser.add_argument('--fetch-size', type=int, default=FETCH_SIZE,
+                        help=f'export: rows per fetch from the streaming cursor (default: {FETCH_SIZE})')
+    parser.add_argument('--row-group-size', type=int, default=ROW_GROUP_SIZE,
+                        help=f'Rows per Parquet row group (default: {ROW_GROUP_SIZE})')
+    parser.add_argument('--compression', default=COMPRESSION, help=f'Parquet codec (default: {COMPRESSION})')
+    parser.add_argument('--target-mb', type=int, default=TARGET_FILE_BYTES // 1024 ** 2,
+                        help='compact: merged file size (default: %(default)s)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    tables = [args.table] if args.table else list(EMBEDDED_COLUMNS)
+
+    if args.step == 'compact':
+        removed = compact(args.root, tables, args.target_mb * 1024 ** 2, args.row_group_size, args.compression)
+        logger.info(f"Compaction done, {removed} small files merged")
+        return
+
+    if args.since is None:
+        raise SystemExit("export needs --since")
+    until = args.until or datetime.datetime.now(datetime.timezone.utc).date()
+
+    from pymysql.cursors import SSCursor
+    from data_inserter_env import load_env_config
+    from db_pool import get_pool, close_all
+
+    config = load_env_config()
+    stream_pool = get_pool(config['SSH_CONFIG'], config['DB_CONFIG'], size=1, cursorclass=SSCursor)
+    try:
+        with stream_pool.connection() as conn:
+            total = export_range(conn, args.root, args.since, until, tables, args.fetch_size,
+                                 args.row_group_size, args.compression, args.replace)
+        logger.info(f"Export done, {total} rows")
+    finally:
+        close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import datetime
+import logging
+import time
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000
+MAXVALUE_PARTITION = 'pmax'
+
+# Defaults
+RETENTION_DAYS = 90
+AHEAD_DAYS = 7
+PURGE_CHUNK_SIZE = 5000
+PURGE_PAUSE = 0.05           # Seconds between purge chunks, to let replication and writers breathe
+
+# Tables RANGE-partitioned by day on snapshot_time_ms (all share the same boundaries).
+# Children first, so a drop never leaves children without their snapshot visible.
+PARTITIONED_TABLES = [
+    'hyperliquid_positions',
+    'hyperliquid_open_orders',
+    'hyperliquid_position_marks',
+    'hyperliquid_snapshots',
+]
+
+# Unpartitioned interval tables: closed rows past retention are purged in small chunks
+INTERVAL_TABLES = ['hyperliquid_order_intervals', 'hyperliquid_position_intervals']
+
+Partition = Tuple[str, Optional[int]]  # (name, VALUES LESS THAN bound in ms; None for MAXVALUE)
+
+
+def day_start_ms(time_ms: int) -> int:
+    return time_ms - time_ms % DAY_MS
+
+
+def partition_name(bound_ms: int) -> str:
+    """Name of the daily partition ending at `bound_ms`, after the (UTC) day it holds."""
+    day = datetime.datetime.fromtimestamp((bound_ms - DAY_MS) / 1000.0, tz=datetime.timezone.utc)
+    return day.strftime('p%Y%m%d')
+
+
+def plan_partitions(partitions: List[Partition], now_ms: int, ahead_days: int = AHEAD_DAYS,
+                    retention_days: int = RETENTION_DAYS,
+                    start_ms: Optional[int] = None) -> Tuple[List[int], List[str]]:
+    """
+    Decide which daily partitions to create and which to drop.
+
+    Partitions are created up to `ahead_days` past today, continuing after the
+    highest existing bound (or from `start_ms`/today when only the MAXVALUE
+    partition exists). A partition is dropped once its upper bound is older
+    than the retention cutoff, i.e. once every row in it has expired.
+
+    Returns:
+        (bounds of partitions to create, names of partitions to drop)
+    """
+    bounds = [bound for _, bound in partitions if bound is not None]
+    today = day_start_ms(now_ms)
+    last = max(bounds) if bounds else day_start_ms(start_ms if start_ms is not None else now_ms)
+    target = today + (ahead_days + 1) * DAY_MS
+    create = list(range(last + DAY_MS, target + 1, DAY_MS))
+
+    cutoff = today - retention_days * DAY_MS
+    drop = [name for name, bound in partitions if bound is not None and bound <= cutoff]
+    return create, drop
+
+
+def add_partitions_sql(table: str, bounds: List[int]) -> str:
+    """Split the (normally empty) MAXVALUE partition into new daily partitions."""
+    parts = [f"PARTITION {partition_name(bound)} VALUES LESS THAN ({bound})" for bound in bounds]
+    parts.append(f"PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN MAXVALUE")
+    return f"ALTER TABLE {table} REORGANIZE PARTITION {MAXVALUE_PARTITION} INTO ({', '.join(parts)})"
+
+
+def drop_partitions_sql(table: str, names: List[str]) -> str:
+    return f"ALTER TABLE {table} DROP PARTITION {', '.join(names)}"
+
+
+def list_partitions(cursor: Any, table: str) -> List[Partition]:
+    cursor.execute(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY PARTITION_ORDINAL_POSITION",
+        (table,)
+    )
+    partitions = []
+    for row in cursor.fetchall():
+        if row['PARTITION_NAME'] is None:
+            raise RuntimeError(f"{table} is not partitioned; apply migration_partitioning.sql first")
+        description = row['PARTITION_DESCRIPTION']
+        partitions.append((row['PARTITION_NAME'], None if description == 'MAXVALUE' else int(description)))
+    return partitions
+
+
+def maintain_partitions(conn: Any, now_ms: int, ahead_days: int = AHEAD_DAYS,
+                        retention_days: int = RETENTION_DAYS, start_ms: Optional[int] = None,
+                        dry_run: bool = False):
+    """Pre-create future partitions and drop expired ones on every partitioned table."""
+    for table in PARTITIONED_TABLES:
+        with conn.cursor() as cursor:
+            create, drop = plan_partitions(list_partitions(cursor, table), now_ms,
+                                           ahead_days, retention_days, start_ms)
+            statements = []
+            if create:
+                statements.append(add_partitions_sql(table, create))
+            if drop:
+                statements.append(drop_partitions_sql(table, drop))
+            for sql in statements:
+                if dry_run:
+                    print(sql + ";")
+                else:
+                    cursor.execute(sql)
+        if create:
+            logger.info(f"🗂️ {table}: {len(create)} partition(s) added up to {partition_name(create[-1])}")
+        if drop:
+            logger.info(f"🗑️ {table}: dropped {len(drop)} expired partition(s) ({drop[0]} .. {drop[-1]})")
+
+
+def purge_closed_intervals(conn: Any, table: str, cutoff_ms: int,
+                           chunk_size: int = PURGE_CHUNK_SIZE, pause: float = PURGE_PAUSE) -> int:
+    """
+    Delete intervals closed before `cutoff_ms`, one short transaction per chunk.
+
+    Open intervals are never touched, however old their first_seen_ms.
+    """
+    total = 0
+    while True:
+        with conn.cursor() as cursor:
+            deleted = cursor.execute(
+                f"DELETE FROM {table} WHERE closed_ms < %s LIMIT %s", (cutoff_ms, chunk_size)
+            )
+        conn.commit()
+        total += deleted
+        if deleted < chunk_size:
+            break
+        time.sleep(pause)
+    if total:
+        logger.info(f"🗑️ {table}: purged {total} interval(s) closed before {cutoff_ms}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create upcoming snapshot partitions and drop expired ones.')
+    parser.add_argument('--retention-days', type=int, default=RETENTION_DAYS,
+                        help=f'Days of snapshots to keep (default: {RETENTION_DAYS})')
+    parser.add_argument('--ahead-days', type=int, default=AHEAD_DAYS,
+                        help=f'Days of partitions to pre-create (default: {AHEAD_DAYS})')
+    parser.add_argument('--start', type=datetime.date.fromisoformat, default=None,
+                        help='First daily partition (YYYY-MM-DD) when a table has only its MAXVALUE '
+                             'partition, e.g. right after migration_partitioning.sql')
+    parser.add_argument('--dry-run', action='store_true', help='Print the partition DDL instead of running it')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    from data_inserter_env import load_env_config
+    from db_pool import get_pool, close_all
+
+    config = load_env_config()
+    now_ms = int(time.time() * 1000)
+    start_ms = None
+    if args.start is not None:
+        start = datetime.datetime.combine(args.start, datetime.time(), tzinfo=datetime.timezone.utc)
+        start_ms = int(start.timestamp() * 1000)
+
+    try:
+        with get_pool(config['SSH_CONFIG'], config['DB_CONFIG']).connection() as conn:
+            maintain_partitions(conn, now_ms, args.ahead_days, args.retention_days, start_ms, args.dry_run)
+            if not args.dry_run:
+                cutoff_ms = day_start_ms(now_ms) - args.retention_days * DAY_MS
+                for table in INTERVAL_TABLES:
+                    purge_closed_intervals(conn, table, cutoff_ms)
+    finally:
+        close_all()
+
+
+if __name__ == '__main__':
+    main()
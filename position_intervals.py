@@ -0,0 +1,91 @@
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from intervals import IntervalTable, apply_intervals
+
+logger = logging.getLogger(__name__)
+
+# Storage modes for positions
+POSITION_STORAGE_ROWS = 'rows'            # hyperliquid_positions: one full row per position per snapshot
+POSITION_STORAGE_INTERVALS = 'intervals'  # hyperliquid_position_intervals + hyperliquid_position_marks
+POSITION_STORAGE_BOTH = 'both'
+POSITION_STORAGE_MODES = (POSITION_STORAGE_ROWS, POSITION_STORAGE_INTERVALS, POSITION_STORAGE_BOTH)
+
+INTERVAL_COLUMNS = [
+    'wallet_id', 'coin_id', 'type', 'size', 'leverage_type', 'leverage_value',
+    'entry_price', 'first_seen_ms', 'last_seen_ms',
+]
+MARK_COLUMNS = ['snapshot_id', 'snapshot_time_ms', 'coin_id', 'position_value', 'unrealized_pnl', 'return_on_equity']
+
+POSITION_INTERVALS = IntervalTable(
+    table='hyperliquid_position_intervals',
+    key='coin_id',
+    state_columns=('type', 'size', 'leverage_type', 'leverage_value', 'entry_price'),
+    insert_columns=INTERVAL_COLUMNS,
+)
+
+# Position legs of a wallet that were open at time T (ms), in readable form
+POSITIONS_AT_SQL = """
+    SELECT coin, type, size, leverage_type, leverage_value, entry_price,
+           first_seen_ms, last_seen_ms, closed_ms
+    FROM hyperliquid_position_intervals_v
+    WHERE wallet_address = %s
+      AND first_seen_ms <= %s
+      AND (closed_ms IS NULL OR closed_ms > %s)
+    ORDER BY coin
+"""
+
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    return None if value is None else Decimal(str(value))
+
+
+def _same_leg(row: Dict, position: Dict) -> bool:
+    """True if a stored leg still describes the position (size, entry and leverage unchanged)."""
+    return (_decimal(row['size']) == _decimal(position['size'])
+            and _decimal(row['entry_price']) == _decimal(position['entry_price'])
+            and row['leverage_type'] == position['leverage_type']
+            and int(row['leverage_value']) == int(position['leverage_value'])
+            and row['type'] == position['type'])
+
+
+def mark_rows(snapshot_id: int, snapshot_time_ms: int, asset_positions: List[Dict],
+              coin_ids: Mapping[str, int]) -> List[Tuple]:
+    """Per-snapshot mark-dependent metrics for hyperliquid_position_marks."""
+    return [
+        (snapshot_id, snapshot_time_ms, coin_ids[p['coin']], p['position_value'], p['unrealized_pnl'],
+         p['return_on_equity'])
+        for p in asset_positions
+    ]
+
+
+def apply_position_snapshot(cursor: Any, wallet_id: int, snapshot_time_ms: int,
+                            asset_positions: List[Dict], coin_ids: Mapping[str, int]) -> Dict[str, int]:
+    """
+    Fold one snapshot's positions into the wallet's position legs.
+
+    A leg is extended while size, entry price and leverage are unchanged, is
+    closed at this snapshot's time when the position is gone or changed, and a
+    new leg is opened for new or changed positions. Wallet and coins are
+    dictionary ids (see id_dictionary). Must run inside the snapshot's
+    transaction; snapshots not newer than the wallet's latest applied one,
+    closed legs included, are ignored (see intervals.apply_intervals).
+
+    Returns:
+        Counts of extended, closed and opened legs.
+    """
+    def new_row(p: Dict) -> tuple:
+        return (
+            wallet_id, coin_ids[p['coin']], p['type'], p['size'], p['leverage_type'],
+            p['leverage_value'], p['entry_price'], snapshot_time_ms, snapshot_time_ms
+        )
+
+    current = {coin_ids[p['coin']]: p for p in asset_positions}
+    return apply_intervals(cursor, POSITION_INTERVALS, wallet_id, snapshot_time_ms, current, _same_leg, new_row)
+
+
+def positions_at(cursor: Any, wallet_address: str, time_ms: int) -> List[Dict]:
+    """Reconstruct a wallet's position legs at `time_ms` from the interval table."""
+    cursor.execute(POSITIONS_AT_SQL, (wallet_address, time_ms, time_ms))
+    return list(cursor.fetchall())
@@ -0,0 +1,291 @@
+import argparse
+import datetime
+import logging
+import threading
+from decimal import Decimal
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bucket sizes (ms) by resolution name
+RESOLUTIONS = {'1m': 60_000, '1h': 3_600_000, '1d': 86_400_000}
+WALLET_METRICS = ('account_value', 'total_ntl_pos', 'total_margin_used')
+
+# Defaults
+FLUSH_ROWS = 5000            # Backfill: rollup rows held in memory before an upsert + commit
+FETCH_SIZE = 1000            # Backfill: rows per fetchmany from the streaming cursor
+
+HeldCoins = Dict[int, Tuple[int, Set[int]]]  # wallet_id -> (snapshot_time_ms, coin_ids with a position)
+
+
+def _ohlc_columns(prefix: str) -> List[str]:
+    return [f"{prefix}_open", f"{prefix}_high", f"{prefix}_low", f"{prefix}_close"]
+
+
+def _ohlc_updates(prefix: str) -> List[str]:
+    # Compares against the stored first_ms/last_ms, so those must be assigned last
+    return [
+        f"{prefix}_open = IF(VALUES(first_ms) < first_ms, VALUES({prefix}_open), {prefix}_open)",
+        f"{prefix}_high = GREATEST({prefix}_high, VALUES({prefix}_high))",
+        f"{prefix}_low = LEAST({prefix}_low, VALUES({prefix}_low))",
+        f"{prefix}_close = IF(VALUES(last_ms) >= last_ms, VALUES({prefix}_close), {prefix}_close)",
+    ]
+
+
+def _upsert_sql(table: str, key_columns: List[str], prefixes: List[str]) -> str:
+    columns = key_columns + ['first_ms', 'last_ms', 'samples']
+    updates = []
+    for prefix in prefixes:
+        columns += _ohlc_columns(prefix)
+        updates += _ohlc_updates(prefix)
+    # MySQL applies assignments left to right: bounds go after the IF()s that read them
+    updates += [
+        "samples = samples + VALUES(samples)",
+        "first_ms = LEAST(first_ms, VALUES(first_ms))",
+        "last_ms = GREATEST(last_ms, VALUES(last_ms))",
+    ]
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON DUPLICATE KEY UPDATE {', '.join(updates)}"
+    )
+
+
+WALLET_UPSERT_SQL = _upsert_sql('hyperliquid_wallet_rollups', ['wallet_id', 'resolution', 'bucket_ms'],
+                                list(WALLET_METRICS))
+COIN_UPSERT_SQL = _upsert_sql('hyperliquid_coin_rollups', ['wallet_id', 'coin_id', 'resolution', 'bucket_ms'],
+                              ['size'])
+
+
+class Ohlc:
+    """Open/high/low/close of one metric over a bucket; open/close by sample time."""
+
+    __slots__ = ('first_ms', 'last_ms', 'samples', 'open', 'high', 'low', 'close')
+
+    def __init__(self, time_ms: int, value: Decimal):
+        self.first_ms = self.last_ms = time_ms
+        self.samples = 1
+        self.open = self.high = self.low = self.close = value
+
+    def add(self, time_ms: int, value: Decimal):
+        if time_ms < self.first_ms:
+            self.first_ms, self.open = time_ms, value
+        if time_ms >= self.last_ms:
+            self.last_ms, self.close = time_ms, value
+        self.high = max(self.high, value)
+        self.low = min(self.low, value)
+        self.samples += 1
+
+    def values(self) -> Tuple:
+        return (self.open, self.high, self.low, self.close)
+
+
+class RollupBatch:
+    """
+    Accumulates snapshots into per-bucket OHLC rows and upserts them in one go.
+
+    Rows merge with what is already stored (GREATEST/LEAST for high/low,
+    open/close by first/last sample time), so a bucket can be written by any
+    number of batches, in any order. A coin the wallet held in its previous
+    snapshot but not in this one is recorded with size 0, so a closed
+    position shows up in the bucket's close. `held` remembers those coins
+    across batches.
+    """
+
+    def __init__(self, held: Optional[HeldCoins] = None):
+        self.held: HeldCoins = held if held is not None else {}
+        self.wallet_rows: Dict[Tuple[int, str, int], Dict[str, Ohlc]] = {}
+        self.coin_rows: Dict[Tuple[int, int, str, int], Ohlc] = {}
+
+    def __len__(self) -> int:
+        return len(self.wallet_rows) + len(self.coin_rows)
+
+    def add(self, wallet_id: int, snapshot_time_ms: int, summary: Dict, sizes: Dict[int, Any]):
+        """Add one snapshot: its summary and net position size per coin id."""
+        sizes = {coin_id: Decimal(str(size)) for coin_id, size in sizes.items()}
+        previous = self.held.get(wallet_id)
+        if previous is None or snapshot_time_ms >= previous[0]:
+            if previous is not None:
+                for coin_id in previous[1] - sizes.keys():
+                    sizes[coin_id] = Decimal(0)
+            self.held[wallet_id] = (snapshot_time_ms, {c for c, size in sizes.items() if size != 0})
+
+        metrics = {
+            name: Decimal(str(summary[name])) for name in WALLET_METRICS if summary.get(name) is not None
+        }
+        for resolution, width in RESOLUTIONS.items():
+            bucket = snapshot_time_ms - snapshot_time_ms % width
+            row = self.wallet_rows.setdefault((wallet_id, resolution, bucket), {})
+            for name, value in metrics.items():
+                if name in row:
+                    row[name].add(snapshot_time_ms, value)
+                else:
+                    row[name] = Ohlc(snapshot_time_ms, value)
+            for coin_id, size in sizes.items():
+                key = (wallet_id, coin_id, resolution, bucket)
+                if key in self.coin_rows:
+                    self.coin_rows[key].add(snapshot_time_ms, size)
+                else:
+                    self.coin_rows[key] = Ohlc(snapshot_time_ms, size)
+
+    def flush(self, cursor: Any):
+        """Upsert the accumulated rows (on the caller's transaction) and start over."""
+        wallet_rows = []
+        for key, row in sorted(self.wallet_rows.items()):
+            if len(row) < len(WALLET_METRICS):
+                continue  # incomplete summary (e.g. a NULL metric); nothing sensible to merge
+            first = min(o.first_ms for o in row.values())
+            last = max(o.last_ms for o in row.values())
+            samples = max(o.samples for o in row.values())
+            values = key + (first, last, samples)
+            for name in WALLET_METRICS:
+                values += row[name].values()
+            wallet_rows.append(values)
+        coin_rows = [
+            key + (o.first_ms, o.last_ms, o.samples) + o.values()
+            for key, o in sorted(self.coin_rows.items())
+        ]
+        if wallet_rows:
+            cursor.executemany(WALLET_UPSERT_SQL, wallet_rows)
+        if coin_rows:
+            cursor.executemany(COIN_UPSERT_SQL, coin_rows)
+        self.wallet_rows.clear()
+        self.coin_rows.clear()
+
+
+_registry_lock = threading.Lock()
+_held: Dict[Hashable, HeldCoins] = {}
+
+
+def get_held_coins(database: Hashable) -> HeldCoins:
+    """Process-wide record of each wallet's last held coins, per database."""
+    with _registry_lock:
+        return _held.setdefault(database, {})
+
+
+# --- Backfill ---
+
+BACKFILL_WALLETS_SQL = "SELECT DISTINCT wallet_id FROM hyperliquid_snapshots WHERE snapshot_time_ms >= %s"
+
+# One wallet's snapshots with their positions, oldest first (one row per position)
+BACKFILL_ROWS_SQL = {
+    'rows': """
+        SELECT s.snapshot_id, s.snapshot_time_ms, s.account_value, s.total_ntl_pos, s.total_margin_used,
+               p.coin_id, p.size
+        FROM hyperliquid_snapshots s
+        LEFT JOIN hyperliquid_positions p
+            ON p.snapshot_id = s.snapshot_id AND p.snapshot_time_ms = s.snapshot_time_ms
+        WHERE s.wallet_id = %s AND s.snapshot_time_ms >= %s
+        ORDER BY s.snapshot_time_ms, s.snapshot_id
+    """,
+    'intervals': """
+        SELECT s.snapshot_id, s.snapshot_time_ms, s.account_value, s.total_ntl_pos, s.total_margin_used,
+               l.coin_id, l.size
+        FROM hyperliquid_snapshots s
+        LEFT JOIN hyperliquid_position_intervals l
+            ON l.wallet_id = s.wallet_id
+           AND l.first_seen_ms <= s.snapshot_time_ms
+           AND (l.closed_ms IS NULL OR l.closed_ms > s.snapshot_time_ms)
+        WHERE s.wallet_id = %s AND s.snapshot_time_ms >= %s
+        ORDER BY s.snapshot_time_ms, s.snapshot_id
+    """,
+}
+
+
+def stream_snapshots(cursor: Any, fetch_size: int = FETCH_SIZE) -> Iterator[Tuple[int, Dict, Dict[int, Any]]]:
+    """Group an executed BACKFILL_ROWS_SQL result into (snapshot_time_ms, summary, sizes), fetching in chunks."""
+    current_id, current = None, None
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        for row in rows:
+            if row['snapshot_id'] != current_id:
+                if current is not None:
+                    yield current
+                current_id = row['snapshot_id']
+                current = (row['snapshot_time_ms'], {name: row[name] for name in WALLET_METRICS}, {})
+            if row['coin_id'] is not None:
+                current[2][row['coin_id']] = row['size']
+    if current is not None:
+        yield current
+
+
+def backfill_wallet(read_conn: Any, write_conn: Any, wallet_id: int, since_ms: int,
+                    position_source: str = 'rows', flush_rows: int = FLUSH_ROWS) -> int:
+    """
+    Rebuild one wallet's rollups from `since_ms` (aligned to a day) onward.
+
+    `read_conn` should hand out unbuffered cursors (SSDictCursor): snapshots
+    are streamed from it, and rollups are flushed to `write_conn` every
+    `flush_rows` rows, so memory stays bounded however long the history is.
+    Returns the number of snapshots read.
+    """
+    with write_conn.cursor() as cursor:
+        cursor.execute("DELETE FROM hyperliquid_wallet_rollups WHERE wallet_id = %s AND bucket_ms >= %s",
+                       (wallet_id, since_ms))
+        cursor.execute("DELETE FROM hyperliquid_coin_rollups WHERE wallet_id = %s AND bucket_ms >= %s",
+                       (wallet_id, since_ms))
+    write_conn.commit()
+
+    batch = RollupBatch()
+    count = 0
+    with read_conn.cursor() as reader:
+        reader.execute(BACKFILL_ROWS_SQL[position_source], (wallet_id, since_ms))
+        for snapshot_time_ms, summary, sizes in stream_snapshots(reader):
+            batch.add(wallet_id, snapshot_time_ms, summary, sizes)
+            count += 1
+            if len(batch) >= flush_rows:
+                with write_conn.cursor() as cursor:
+                    batch.flush(cursor)
+                write_conn.commit()
+    with write_conn.cursor() as cursor:
+        batch.flush(cursor)
+    write_conn.commit()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild account value / exposure rollups from snapshot history.')
+    parser.add_argument('--since', type=datetime.date.fromisoformat, default=None,
+                        help='Rebuild buckets from this day (YYYY-MM-DD, UTC); default: all history')
+    parser.add_argument('--wallet', default=None, help='Only this wallet address')
+    parser.add_argument('--position-source', choices=sorted(BACKFILL_ROWS_SQL), default='rows',
+                        help='Read positions from per-snapshot rows or from position legs (default: rows)')
+    parser.add_argument('--flush-rows', type=int, default=FLUSH_ROWS,
+                        help=f'Rollup rows kept in memory between upserts (default: {FLUSH_ROWS})')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    from pymysql.cursors import SSDictCursor
+    from data_inserter_env import load_env_config
+    from db_pool import get_pool, close_all
+
+    since_ms = 0
+    if args.since is not None:
+        since = datetime.datetime.combine(args.since, datetime.time(), tzinfo=datetime.timezone.utc)
+        since_ms = int(since.timestamp() * 1000)
+
+    config = load_env_config()
+    pool = get_pool(config['SSH_CONFIG'], config['DB_CONFIG'])
+    stream_pool = get_pool(config['SSH_CONFIG'], config['DB_CONFIG'], size=1, cursorclass=SSDictCursor)
+    try:
+        with stream_pool.connection() as read_conn, pool.connection() as write_conn:
+            with write_conn.cursor() as cursor:
+                if args.wallet:
+                    cursor.execute("SELECT id AS wallet_id FROM wallets WHERE address = %s", (args.wallet,))
+                else:
+                    cursor.execute(BACKFILL_WALLETS_SQL, (since_ms,))
+                wallet_ids = [row['wallet_id'] for row in cursor.fetchall()]
+            write_conn.commit()
+
+            for i, wallet_id in enumerate(wallet_ids, 1):
+                count = backfill_wallet(read_conn, write_conn, wallet_id, since_ms,
+                                        args.position_source, args.flush_rows)
+                logger.info(f"📊 [{i}/{len(wallet_ids)}] wallet {wallet_id}: rolled up {count} snapshots")
+    finally:
+        close_all()
+
+
+if __name__ == '__main__':
+    main()
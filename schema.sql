@@ -29,6 +29,33 @@ CREATE TABLE IF NOT EXISTS wallet_snapshots (
 -- Target: MySQL / MariaDB
 -- ===================================================================
 
+-- -------------------------------------------------------------------
+-- Dictionary tables
+-- Wallet addresses reuse the `wallets` table above; coins get their own
+-- small dictionary. Writers cache both in-process (id_dictionary.py), so
+-- the fact tables below store integer ids only. The *_v views at the end
+-- give back the readable (wallet_address, coin) shape.
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_coins` (
+    `coin_id` SMALLINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    `coin` VARCHAR(16) COLLATE utf8mb4_bin NOT NULL COMMENT 'Case-sensitive: kPEPE and KPEPE are different coins',
+
+    PRIMARY KEY (`coin_id`),
+    UNIQUE KEY `uq_coin` (`coin`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -------------------------------------------------------------------
+-- Partitioning
+-- hyperliquid_snapshots and its per-snapshot children are RANGE
+-- partitioned by day on snapshot_time_ms, with identical boundaries.
+-- They are created with only the catch-all `pmax` partition;
+-- partition_maintenance.py (run daily) splits future days off `pmax`
+-- and drops expired days in O(1) instead of deleting rows.
+-- MySQL does not allow foreign keys on partitioned tables, and every
+-- unique key must include snapshot_time_ms, so children carry the
+-- snapshot time and are no longer FK-linked to their snapshot.
+-- -------------------------------------------------------------------
+
 -- -------------------------------------------------------------------
 -- Table: hyperliquid_snapshots
 -- Stores account-level summary data captured at a specific time.
@@ -36,10 +63,11 @@ CREATE TABLE IF NOT EXISTS wallet_snapshots (
 -- -------------------------------------------------------------------
 CREATE TABLE IF NOT EXISTS `hyperliquid_snapshots` (
     -- Primary Key: Unique ID for this specific data capture event
-    `snapshot_id` INT UNSIGNED NOT NULL AUTO_INCREMENT,
+    -- AUTO_INCREMENT by default; 64-bit client-generated ids (snapshot_ids.py) when enabled
+    `snapshot_id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
 
     -- Identifying the target wallet
-    `wallet_address` CHAR(42) NOT NULL COMMENT 'Ethereum wallet address that was monitored (e.g., 0x...)',
+    `wallet_id` BIGINT UNSIGNED NOT NULL COMMENT 'Monitored wallet (wallets.id)',
 
     -- Timestamp from the Hyperliquid system (in milliseconds)
     `snapshot_time_ms` BIGINT UNSIGNED NOT NULL,
@@ -58,23 +86,27 @@ CREATE TABLE IF NOT EXISTS `hyperliquid_snapshots` (
     -- Audit/Debugging Field: Stores the complete raw JSON message
     -- raw_json column removed as per new requirement
 
-    PRIMARY KEY (`snapshot_id`),
+    PRIMARY KEY (`snapshot_id`, `snapshot_time_ms`),
     -- Indexing for quick lookups by wallet and time
-    INDEX `idx_wallet_time` (`wallet_address`, `snapshot_datetime`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    INDEX `idx_wallet_time` (`wallet_id`, `snapshot_datetime`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (`snapshot_time_ms`) (
+    PARTITION `pmax` VALUES LESS THAN MAXVALUE
+);
 
 -- -------------------------------------------------------------------
 -- Table: hyperliquid_positions
 -- Stores individual asset positions linked back to a hyperliquid_snapshot.
 -- -------------------------------------------------------------------
 CREATE TABLE IF NOT EXISTS `hyperliquid_positions` (
-    `position_id` INT UNSIGNED NOT NULL AUTO_INCREMENT,
+    `position_id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
 
-    -- Foreign Key linking back to the account snapshot
-    `snapshot_id` INT UNSIGNED NOT NULL,
+    -- Link back to the account snapshot (and its partition key)
+    `snapshot_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_time_ms` BIGINT UNSIGNED NOT NULL,
 
     -- Position Details (from assetPositions array)
-    `coin` VARCHAR(16) NOT NULL,
+    `coin_id` SMALLINT UNSIGNED NOT NULL COMMENT 'hyperliquid_coins.coin_id',
     `type` VARCHAR(16) NOT NULL COMMENT 'Position type: e.g., oneWay',
     `size` DECIMAL(30, 18) NOT NULL COMMENT 'Position size (szi)',
     
@@ -88,16 +120,12 @@ CREATE TABLE IF NOT EXISTS `hyperliquid_positions` (
     `unrealized_pnl` DECIMAL(30, 18) NOT NULL,
     `return_on_equity` DECIMAL(30, 18) NOT NULL,
 
-    PRIMARY KEY (`position_id`),
-    
-    -- Foreign Key constraint
-    CONSTRAINT `fk_position_snapshot_id`
-        FOREIGN KEY (`snapshot_id`)
-        REFERENCES `hyperliquid_snapshots` (`snapshot_id`)
-        ON DELETE CASCADE,
-        
+    PRIMARY KEY (`position_id`, `snapshot_time_ms`),
     INDEX `idx_position_snapshot_id` (`snapshot_id`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (`snapshot_time_ms`) (
+    PARTITION `pmax` VALUES LESS THAN MAXVALUE
+);
 
 -- -------------------------------------------------------------------
 -- Table: hyperliquid_open_orders
@@ -108,11 +136,12 @@ CREATE TABLE IF NOT EXISTS `hyperliquid_open_orders` (
     -- Unique Order ID from Hyperliquid (oid)
     `order_id` BIGINT UNSIGNED NOT NULL,
     
-    -- Foreign Key linking back to the account snapshot
-    `snapshot_id` INT UNSIGNED NOT NULL,
+    -- Link back to the account snapshot (and its partition key)
+    `snapshot_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_time_ms` BIGINT UNSIGNED NOT NULL,
 
     -- Order Details
-    `coin` VARCHAR(16) NOT NULL,
+    `coin_id` SMALLINT UNSIGNED NOT NULL COMMENT 'hyperliquid_coins.coin_id',
     `side` CHAR(1) NOT NULL COMMENT 'Order side (e.g., A for Ask/Sell, B for Bid/Buy)',
     `limit_price` DECIMAL(30, 18) NOT NULL COMMENT 'Price at which the order is placed (limitPx)',
     `quantity` DECIMAL(30, 18) NOT NULL COMMENT 'Order size (sz)',
@@ -122,14 +151,297 @@ CREATE TABLE IF NOT EXISTS `hyperliquid_open_orders` (
     `time_in_force` VARCHAR(16) NOT NULL COMMENT 'Time In Force (tif)',
     
     -- We use a composite key since the 'oid' is the unique identifier for the order itself
-    PRIMARY KEY (`order_id`, `snapshot_id`),
-    
-    -- Foreign Key constraint
-    CONSTRAINT `fk_order_snapshot_id`
-        FOREIGN KEY (`snapshot_id`)
-        REFERENCES `hyperliquid_snapshots` (`snapshot_id`)
-        ON DELETE CASCADE,
-        
+    PRIMARY KEY (`order_id`, `snapshot_id`, `snapshot_time_ms`),
     INDEX `idx_order_snapshot_id` (`snapshot_id`),
-    INDEX `idx_order_coin` (`coin`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
\ No newline at end of file
+    INDEX `idx_order_coin` (`coin_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (`snapshot_time_ms`) (
+    PARTITION `pmax` VALUES LESS THAN MAXVALUE
+);
+
+-- -------------------------------------------------------------------
+-- Table: hyperliquid_order_intervals
+-- Interval-encoded open orders (--order-storage intervals|both): one row
+-- per order lifetime instead of one row per order per snapshot.
+-- A row is (re)opened when an order appears or its price/size changes,
+-- `last_seen_ms` is extended while it stays unchanged, and `closed_ms`
+-- is set to the first snapshot time at which it was gone or modified.
+--
+-- Open orders of a wallet at time T:
+--   SELECT * FROM hyperliquid_order_intervals_v
+--   WHERE wallet_address = ? AND first_seen_ms <= T
+--     AND (closed_ms IS NULL OR closed_ms > T);
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_order_intervals` (
+    `order_id` BIGINT UNSIGNED NOT NULL,
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+
+    -- Order Details (as in hyperliquid_open_orders)
+    `coin_id` SMALLINT UNSIGNED NOT NULL,
+    `side` CHAR(1) NOT NULL,
+    `limit_price` DECIMAL(30, 18) NOT NULL,
+    `quantity` DECIMAL(30, 18) NOT NULL,
+    `timestamp_ms` BIGINT UNSIGNED NOT NULL,
+    `order_type` VARCHAR(16) NOT NULL,
+    `reduce_only` BOOLEAN NOT NULL,
+    `time_in_force` VARCHAR(16) NOT NULL,
+
+    -- Lifetime (snapshot times, ms)
+    `first_seen_ms` BIGINT UNSIGNED NOT NULL,
+    `last_seen_ms` BIGINT UNSIGNED NOT NULL,
+    `closed_ms` BIGINT UNSIGNED NULL COMMENT 'NULL while the order is still open',
+
+    PRIMARY KEY (`order_id`, `first_seen_ms`),
+    -- Open intervals of a wallet (incremental updates) and point-in-time lookups
+    INDEX `idx_interval_wallet_open` (`wallet_id`, `closed_ms`),
+    INDEX `idx_interval_wallet_time` (`wallet_id`, `first_seen_ms`),
+    INDEX `idx_interval_coin` (`coin_id`),
+    -- Retention purge (partition_maintenance.py)
+    INDEX `idx_interval_closed` (`closed_ms`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+
+-- -------------------------------------------------------------------
+-- Table: hyperliquid_position_intervals
+-- Run-length encoded positions (--position-storage intervals|both): one
+-- row per position leg, i.e. per stretch of snapshots in which size,
+-- entry price and leverage stay the same. `closed_ms` is the first
+-- snapshot time at which the position was gone or changed.
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_position_intervals` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `coin_id` SMALLINT UNSIGNED NOT NULL,
+
+    -- Leg Details (as in hyperliquid_positions)
+    `type` VARCHAR(16) NOT NULL,
+    `size` DECIMAL(30, 18) NOT NULL,
+    `leverage_type` VARCHAR(16) NOT NULL,
+    `leverage_value` INT NOT NULL,
+    `entry_price` DECIMAL(30, 18) NULL,
+
+    -- Lifetime (snapshot times, ms)
+    `first_seen_ms` BIGINT UNSIGNED NOT NULL,
+    `last_seen_ms` BIGINT UNSIGNED NOT NULL,
+    `closed_ms` BIGINT UNSIGNED NULL COMMENT 'NULL while the leg is still open',
+
+    PRIMARY KEY (`wallet_id`, `coin_id`, `first_seen_ms`),
+    -- Open legs of a wallet (incremental updates)
+    INDEX `idx_leg_wallet_open` (`wallet_id`, `closed_ms`),
+    INDEX `idx_leg_coin` (`coin_id`),
+    -- Retention purge (partition_maintenance.py)
+    INDEX `idx_leg_closed` (`closed_ms`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -------------------------------------------------------------------
+-- Table: hyperliquid_position_marks
+-- Mark-dependent position metrics per snapshot (interval storage only);
+-- everything else about the position lives in its leg.
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_position_marks` (
+    `snapshot_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_time_ms` BIGINT UNSIGNED NOT NULL,
+    `coin_id` SMALLINT UNSIGNED NOT NULL,
+    `position_value` DECIMAL(30, 18) NOT NULL,
+    `unrealized_pnl` DECIMAL(30, 18) NOT NULL,
+    `return_on_equity` DECIMAL(30, 18) NOT NULL,
+
+    PRIMARY KEY (`snapshot_id`, `coin_id`, `snapshot_time_ms`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (`snapshot_time_ms`) (
+    PARTITION `pmax` VALUES LESS THAN MAXVALUE
+);
+
+-- -------------------------------------------------------------------
+-- Latest state (--latest-state): each wallet's newest snapshot, kept
+-- up to date by the writer in the snapshot's transaction (see
+-- latest_state.py), so "what does wallet X hold now" is a primary-key
+-- lookup however much history there is.
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_wallet_latest` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_time_ms` BIGINT UNSIGNED NOT NULL,
+    `snapshot_datetime` DATETIME NOT NULL,
+    `account_value` DECIMAL(30, 18) NOT NULL,
+    `total_ntl_pos` DECIMAL(30, 18) NOT NULL,
+    `total_raw_usd` DECIMAL(30, 18) NOT NULL,
+    `total_margin_used` DECIMAL(30, 18) NOT NULL,
+    `withdrawable` DECIMAL(30, 18) NOT NULL,
+    `cross_maintenance_margin_used` DECIMAL(30, 18) NULL,
+
+    PRIMARY KEY (`wallet_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `hyperliquid_latest_positions` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `coin_id` SMALLINT UNSIGNED NOT NULL,
+    `snapshot_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_time_ms` BIGINT UNSIGNED NOT NULL,
+    `type` VARCHAR(16) NOT NULL,
+    `size` DECIMAL(30, 18) NOT NULL,
+    `leverage_type` VARCHAR(16) NOT NULL,
+    `leverage_value` INT NOT NULL,
+    `entry_price` DECIMAL(30, 18) NULL,
+    `position_value` DECIMAL(30, 18) NOT NULL,
+    `unrealized_pnl` DECIMAL(30, 18) NOT NULL,
+    `return_on_equity` DECIMAL(30, 18) NOT NULL,
+
+    PRIMARY KEY (`wallet_id`, `coin_id`),
+    INDEX `idx_latest_position_coin` (`coin_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `hyperliquid_latest_orders` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `order_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_id` BIGINT UNSIGNED NOT NULL,
+    `snapshot_time_ms` BIGINT UNSIGNED NOT NULL,
+    `coin_id` SMALLINT UNSIGNED NOT NULL,
+    `side` CHAR(1) NOT NULL,
+    `limit_price` DECIMAL(30, 18) NOT NULL,
+    `quantity` DECIMAL(30, 18) NOT NULL,
+    `timestamp_ms` BIGINT UNSIGNED NOT NULL,
+    `order_type` VARCHAR(16) NOT NULL,
+    `reduce_only` BOOLEAN NOT NULL,
+    `time_in_force` VARCHAR(16) NOT NULL,
+
+    PRIMARY KEY (`wallet_id`, `order_id`),
+    INDEX `idx_latest_order_coin` (`coin_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -------------------------------------------------------------------
+-- Rollups (--rollups): 1m / 1h / 1d OHLC per wallet (account value,
+-- notional, margin used) and per wallet and coin (net position size),
+-- merged in by every write (see rollups.py). `bucket_ms` is the bucket
+-- start; open/close are the values of the first/last snapshot in it.
+-- Rebuild from history with `python rollups.py --since YYYY-MM-DD`.
+-- -------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `hyperliquid_wallet_rollups` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `resolution` CHAR(2) NOT NULL COMMENT '1m, 1h or 1d',
+    `bucket_ms` BIGINT UNSIGNED NOT NULL,
+    `first_ms` BIGINT UNSIGNED NOT NULL,
+    `last_ms` BIGINT UNSIGNED NOT NULL,
+    `samples` INT UNSIGNED NOT NULL,
+    `account_value_open` DECIMAL(30, 18) NOT NULL,
+    `account_value_high` DECIMAL(30, 18) NOT NULL,
+    `account_value_low` DECIMAL(30, 18) NOT NULL,
+    `account_value_close` DECIMAL(30, 18) NOT NULL,
+    `total_ntl_pos_open` DECIMAL(30, 18) NOT NULL,
+    `total_ntl_pos_high` DECIMAL(30, 18) NOT NULL,
+    `total_ntl_pos_low` DECIMAL(30, 18) NOT NULL,
+    `total_ntl_pos_close` DECIMAL(30, 18) NOT NULL,
+    `total_margin_used_open` DECIMAL(30, 18) NOT NULL,
+    `total_margin_used_high` DECIMAL(30, 18) NOT NULL,
+    `total_margin_used_low` DECIMAL(30, 18) NOT NULL,
+    `total_margin_used_close` DECIMAL(30, 18) NOT NULL,
+
+    PRIMARY KEY (`wallet_id`, `resolution`, `bucket_ms`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `hyperliquid_coin_rollups` (
+    `wallet_id` BIGINT UNSIGNED NOT NULL,
+    `coin_id` SMALLINT UNSIGNED NOT NULL,
+    `resolution` CHAR(2) NOT NULL COMMENT '1m, 1h or 1d',
+    `bucket_ms` BIGINT UNSIGNED NOT NULL,
+    `first_ms` BIGINT UNSIGNED NOT NULL,
+    `last_ms` BIGINT UNSIGNED NOT NULL,
+    `samples` INT UNSIGNED NOT NULL,
+    `size_open` DECIMAL(30, 18) NOT NULL,
+    `size_high` DECIMAL(30, 18) NOT NULL,
+    `size_low` DECIMAL(30, 18) NOT NULL,
+    `size_close` DECIMAL(30, 18) NOT NULL,
+
+    PRIMARY KEY (`wallet_id`, `coin_id`, `resolution`, `bucket_ms`),
+    INDEX `idx_coin_rollup_coin` (`coin_id`, `resolution`, `bucket_ms`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- -------------------------------------------------------------------
+-- Readable views: the fact tables with wallet_address / coin joined
+-- back in from the dictionaries.
+-- -------------------------------------------------------------------
+CREATE OR REPLACE VIEW `hyperliquid_snapshots_v` AS
+SELECT
+    s.`snapshot_id`, w.`address` AS `wallet_address`, s.`snapshot_time_ms`, s.`snapshot_datetime`,
+    s.`account_value`, s.`total_ntl_pos`, s.`total_raw_usd`, s.`total_margin_used`,
+    s.`withdrawable`, s.`cross_maintenance_margin_used`
+FROM `hyperliquid_snapshots` s
+JOIN `wallets` w ON w.`id` = s.`wallet_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_positions_v` AS
+SELECT
+    p.`position_id`, p.`snapshot_id`, c.`coin`, p.`type`, p.`size`,
+    p.`leverage_type`, p.`leverage_value`, p.`entry_price`,
+    p.`position_value`, p.`unrealized_pnl`, p.`return_on_equity`
+FROM `hyperliquid_positions` p
+JOIN `hyperliquid_coins` c ON c.`coin_id` = p.`coin_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_open_orders_v` AS
+SELECT
+    o.`order_id`, o.`snapshot_id`, c.`coin`, o.`side`, o.`limit_price`, o.`quantity`,
+    o.`timestamp_ms`, o.`order_type`, o.`reduce_only`, o.`time_in_force`
+FROM `hyperliquid_open_orders` o
+JOIN `hyperliquid_coins` c ON c.`coin_id` = o.`coin_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_order_intervals_v` AS
+SELECT
+    i.`order_id`, w.`address` AS `wallet_address`, c.`coin`, i.`side`, i.`limit_price`, i.`quantity`,
+    i.`timestamp_ms`, i.`order_type`, i.`reduce_only`, i.`time_in_force`,
+    i.`first_seen_ms`, i.`last_seen_ms`, i.`closed_ms`
+FROM `hyperliquid_order_intervals` i
+JOIN `wallets` w ON w.`id` = i.`wallet_id`
+JOIN `hyperliquid_coins` c ON c.`coin_id` = i.`coin_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_position_intervals_v` AS
+SELECT
+    w.`address` AS `wallet_address`, c.`coin`, l.`type`, l.`size`,
+    l.`leverage_type`, l.`leverage_value`, l.`entry_price`,
+    l.`first_seen_ms`, l.`last_seen_ms`, l.`closed_ms`
+FROM `hyperliquid_position_intervals` l
+JOIN `wallets` w ON w.`id` = l.`wallet_id`
+JOIN `hyperliquid_coins` c ON c.`coin_id` = l.`coin_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_wallet_latest_v` AS
+SELECT
+    w.`address` AS `wallet_address`, l.`snapshot_id`, l.`snapshot_time_ms`, l.`snapshot_datetime`,
+    l.`account_value`, l.`total_ntl_pos`, l.`total_raw_usd`, l.`total_margin_used`,
+    l.`withdrawable`, l.`cross_maintenance_margin_used`
+FROM `hyperliquid_wallet_latest` l
+JOIN `wallets` w ON w.`id` = l.`wallet_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_latest_positions_v` AS
+SELECT
+    w.`address` AS `wallet_address`, c.`coin`, p.`snapshot_id`, p.`snapshot_time_ms`, p.`type`, p.`size`,
+    p.`leverage_type`, p.`leverage_value`, p.`entry_price`,
+    p.`position_value`, p.`unrealized_pnl`, p.`return_on_equity`
+FROM `hyperliquid_latest_positions` p
+JOIN `wallets` w ON w.`id` = p.`wallet_id`
+JOIN `hyperliquid_coins` c ON c.`coin_id` = p.`coin_id`;
+
+CREATE OR REPLACE VIEW `hyperliquid_latest_orders_v` AS
+SELECT
+    w.`address` AS `wallet_address`, o.`order_id`, o.`snapshot_id`, o.`snapshot_time_ms`, c.`coin`, o.`side`,
+    o.`limit_price`, o.`quantity`, o.`timestamp_ms`, o.`order_type`, o.`reduce_only`, o.`time_in_force`
+FROM `hyperliquid_latest_orders` o
+JOIN `wallets` w ON w.`id` = o.`wallet_id`
+JOIN `hyperliquid_coins` c ON c.`coin_id` = o.`coin_id`;
+
+-- -------------------------------------------------------------------
+-- View: hyperliquid_position_history
+-- Per-snapshot positions rebuilt from legs + marks, in the shape of
+-- hyperliquid_positions_v.
+-- -------------------------------------------------------------------
+CREATE OR REPLACE VIEW `hyperliquid_position_history` AS
+SELECT
+    s.`snapshot_id`, w.`address` AS `wallet_address`, s.`snapshot_time_ms`,
+    c.`coin`, l.`type`, l.`size`, l.`leverage_type`, l.`leverage_value`, l.`entry_price`,
+    m.`position_value`, m.`unrealized_pnl`, m.`return_on_equity`
+FROM `hyperliquid_snapshots` s
+JOIN `wallets` w ON w.`id` = s.`wallet_id`
+JOIN `hyperliquid_position_intervals` l
+    ON l.`wallet_id` = s.`wallet_id`
+   AND l.`first_seen_ms` <= s.`snapshot_time_ms`
+   AND (l.`closed_ms` IS NULL OR l.`closed_ms` > s.`snapshot_time_ms`)
+JOIN `hyperliquid_coins` c ON c.`coin_id` = l.`coin_id`
+LEFT JOIN `hyperliquid_position_marks` m
+    ON m.`snapshot_id` = s.`snapshot_id` AND m.`coin_id` = l.`coin_id`
+   AND m.`snapshot_time_ms` = s.`snapshot_time_ms`;
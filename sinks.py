@@ -0,0 +1,320 @@
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from order_intervals import ORDER_STORAGE_ROWS
+from position_intervals import POSITION_STORAGE_ROWS
+from snapshot_digest import SnapshotDigestCache, snapshot_digest
+from snapshot_ids import next_snapshot_id
+
+logger = logging.getLogger(__name__)
+
+SINK_MYSQL = 'mysql'
+SINK_SQLITE = 'sqlite'
+SINK_DUCKDB = 'duckdb'
+SINK_PARQUET = 'parquet'
+SINKS = (SINK_MYSQL, SINK_SQLITE, SINK_DUCKDB, SINK_PARQUET)
+
+DEFAULT_PATHS = {SINK_SQLITE: 'hyperliquid.sqlite', SINK_DUCKDB: 'hyperliquid.duckdb', SINK_PARQUET: 'snapshot_archive'}
+
+SnapshotItem = Tuple[str, int, Dict]  # (wallet_address, snapshot_time_ms, parsed_data)
+
+
+class SnapshotSink(ABC):
+    """
+    Destination for parsed snapshots.
+
+    `insert` / `insert_batch` report per-snapshot success; with a
+    `digest_cache` (snapshot_digest) unchanged snapshots are skipped and
+    reported as stored. Subclasses implement `_insert` and `_insert_batch`.
+    """
+
+    def __init__(self, digest_cache: Optional[SnapshotDigestCache] = None):
+        self.digest_cache = digest_cache
+
+    def insert(self, wallet: str, snapshot_time: int,
+               parsed_data: Dict, max_retries: int = 3) -> bool:
+        if self.digest_cache is None:
+            return self._insert(wallet, snapshot_time, parsed_data, max_retries)
+
+        digest = snapshot_digest(parsed_data)
+        if not self.digest_cache.should_write(wallet, snapshot_time, digest):
+            return True
+        success = self._insert(wallet, snapshot_time, parsed_data, max_retries)
+        if success:
+            self.digest_cache.record(wallet, snapshot_time, digest)
+        return success
+
+    def insert_batch(self, items: List[SnapshotItem], max_retries: int = 3) -> List[bool]:
+        if self.digest_cache is None:
+            return self._insert_batch(items, max_retries)
+
+        keep, digests = self.digest_cache.filter_batch(items)
+        results = [True] * len(items)
+        if keep:
+            written = self._insert_batch([items[i] for i in keep], max_retries)
+            for i, ok in zip(keep, written):
+                results[i] = ok
+                if ok:
+                    self.digest_cache.record(items[i][0], items[i][1], digests[i])
+        return results
+
+    def _insert(self, wallet: str, snapshot_time: int, parsed_data: Dict, max_retries: int) -> bool:
+        return self._insert_batch([(wallet, snapshot_time, parsed_data)], max_retries)[0]
+
+    @abstractmethod
+    def _insert_batch(self, items: List[SnapshotItem], max_retries: int) -> List[bool]:
+        """Write items; per-item success flags, in input order."""
+
+    def close(self):
+        if self.digest_cache is not None:
+            self.digest_cache.save()
+            logger.info(f"Digest cache stats: {self.digest_cache.stats()}")
+
+
+# --- Embedded backends ---
+
+# Same tables and columns as the readable (*_v) MySQL shape; snapshot ids are client-generated.
+EMBEDDED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hyperliquid_snapshots (
+    snapshot_id BIGINT NOT NULL PRIMARY KEY,
+    wallet_address VARCHAR(128) NOT NULL,
+    snapshot_time_ms BIGINT NOT NULL,
+    snapshot_datetime TIMESTAMP NOT NULL,
+    account_value {decimal} NOT NULL,
+    total_ntl_pos {decimal} NOT NULL,
+    total_raw_usd {decimal} NOT NULL,
+    total_margin_used {decimal} NOT NULL,
+    withdrawable {decimal} NOT NULL,
+    cross_maintenance_margin_used {decimal}
+);
+CREATE INDEX IF NOT EXISTS idx_wallet_time ON hyperliquid_snapshots (wallet_address, snapshot_time_ms);
+CREATE TABLE IF NOT EXISTS hyperliquid_positions (
+    snapshot_id BIGINT NOT NULL,
+    snapshot_time_ms BIGINT NOT NULL,
+    coin VARCHAR(16) NOT NULL,
+    type VARCHAR(16) NOT NULL,
+    size {decimal} NOT NULL,
+    leverage_type VARCHAR(16) NOT NULL,
+    leverage_value INTEGER NOT NULL,
+    entry_price {decimal},
+    position_value {decimal} NOT NULL,
+    unrealized_pnl {decimal} NOT NULL,
+    return_on_equity {decimal} NOT NULL,
+    PRIMARY KEY (snapshot_id, coin)
+);
+CREATE TABLE IF NOT EXISTS hyperliquid_open_orders (
+    order_id BIGINT NOT NULL,
+    snapshot_id BIGINT NOT NULL,
+    snapshot_time_ms BIGINT NOT NULL,
+    coin VARCHAR(16) NOT NULL,
+    side CHAR(1) NOT NULL,
+    limit_price {decimal} NOT NULL,
+    quantity {decimal} NOT NULL,
+    timestamp_ms BIGINT NOT NULL,
+    order_type VARCHAR(16) NOT NULL,
+    reduce_only BOOLEAN NOT NULL,
+    time_in_force VARCHAR(16) NOT NULL,
+    PRIMARY KEY (order_id, snapshot_id)
+);
+"""
+
+STORED_SQL = "SELECT 1 FROM hyperliquid_snapshots WHERE wallet_address = ? AND snapshot_time_ms = ? LIMIT 1"
+
+EMBEDDED_COLUMNS = {
+    'hyperliquid_snapshots': [
+        'snapshot_id', 'wallet_address', 'snapshot_time_ms', 'snapshot_datetime',
+        'account_value', 'total_ntl_pos', 'total_raw_usd', 'total_margin_used',
+        'withdrawable', 'cross_maintenance_margin_used',
+    ],
+    'hyperliquid_positions': [
+        'snapshot_id', 'snapshot_time_ms', 'coin', 'type', 'size', 'leverage_type',
+        'leverage_value', 'entry_price', 'position_value', 'unrealized_pnl', 'return_on_equity',
+    ],
+    'hyperliquid_open_orders': [
+        'order_id', 'snapshot_id', 'snapshot_time_ms', 'coin', 'side', 'limit_price',
+        'quantity', 'timestamp_ms', 'order_type', 'reduce_only', 'time_in_force',
+    ],
+}
+
+
+def embedded_rows(items: List[SnapshotItem]) -> Dict[str, List[Tuple]]:
+    """Rows of a batch by table; snapshot ids are assigned once and kept in parsed_data."""
+    rows: Dict[str, List[Tuple]] = {table: [] for table in EMBEDDED_COLUMNS}
+    for wallet_address, snapshot_time_ms, parsed_data in items:
+        if parsed_data.get('snapshot_id') is None:
+            parsed_data['snapshot_id'] = next_snapshot_id()
+        snapshot_id = parsed_data['snapshot_id']
+        summary = parsed_data['summary']
+        rows['hyperliquid_snapshots'].append((
+            snapshot_id, wallet_address, snapshot_time_ms,
+            datetime.datetime.fromtimestamp(snapshot_time_ms / 1000.0).isoformat(sep=' '),
+            summary['account_value'], summary['total_ntl_pos'], summary['total_raw_usd'],
+            summary['total_margin_used'], summary['withdrawable'], summary['cross_maintenance_margin_used'],
+        ))
+        rows['hyperliquid_positions'].extend(
+            (
+                snapshot_id, snapshot_time_ms, p['coin'], p['type'], p['size'], p['leverage_type'],
+                p['leverage_value'], p['entry_price'], p['position_value'], p['unrealized_pnl'],
+                p['return_on_equity']
+            )
+            for p in parsed_data['asset_positions']
+        )
+        rows['hyperliquid_open_orders'].extend(
+            (
+                o['order_id'], snapshot_id, snapshot_time_ms, o['coin'], o['side'], o['limit_price'],
+                o['quantity'], o['timestamp_ms'], o['order_type'], o['reduce_only'], o['time_in_force']
+            )
+            for o in parsed_data['open_orders']
+        )
+    return rows
+
+
+class EmbeddedSink(SnapshotSink):
+    """
+    Snapshot sink backed by an embedded database file (no server, no tunnel).
+
+    A batch is one transaction with one executemany per table, issued on the
+    connection itself (a DuckDB cursor is a separate connection). Snapshots
+    whose (wallet, snapshot time) is already stored are skipped and rows are
+    written with INSERT OR IGNORE, so a retried batch or a frame parsed again
+    is harmless. If a batch fails, its snapshots are retried one by one and
+    only the failing ones are reported as failed.
+    """
+
+    DECIMAL_TYPE = 'NUMERIC'
+
+    def __init__(self, path: str, digest_cache: Optional[SnapshotDigestCache] = None):
+        super().__init__(digest_cache)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = self._connect()
+        self._create_schema()
+        logger.info(f"🗄️ {type(self).__name__} writing to {os.path.abspath(path)}")
+
+    @abstractmethod
+    def _connect(self) -> Any:
+        """Open the database file (called once, from __init__)."""
+
+    def _create_schema(self):
+        for statement in EMBEDDED_SCHEMA.format(decimal=self.DECIMAL_TYPE).split(';'):
+            if statement.strip():
+                self.conn.execute(statement)
+        self.conn.commit()
+
+    @staticmethod
+    def _insert_sql(table: str) -> str:
+        columns = EMBEDDED_COLUMNS[table]
+        return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+
+    def _unstored(self, items: List[SnapshotItem]) -> List[SnapshotItem]:
+        """Items whose (wallet, snapshot time) is not stored yet, once each (idx_wallet_time lookups)."""
+        pending: Dict[Tuple[str, int], SnapshotItem] = {}
+        for item in items:
+            key = (item[0], item[1])
+            if key not in pending and self.conn.execute(STORED_SQL, key).fetchone() is None:
+                pending[key] = item
+        return list(pending.values())
+
+    def _write(self, items: List[SnapshotItem]):
+        try:
+            for table, rows in embedded_rows(self._unstored(items)).items():
+                if rows:
+                    self.conn.executemany(self._insert_sql(table), rows)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def _insert_batch(self, items: List[SnapshotItem], max_retries: int) -> List[bool]:
+        with self._lock:
+            try:
+                self._write(items)
+                return [True] * len(items)
+            except Exception as e:
+                if len(items) == 1:
+                    logger.error(f"❌ Skipping snapshot for {items[0][0]} at {items[0][1]}: {e}")
+                    return [False]
+                logger.warning(f"Batch of {len(items)} failed ({e}); retrying per snapshot")
+
+            results = []
+            for item in items:
+                try:
+                    self._write([item])
+                    results.append(True)
+                except Exception as e:
+                    logger.error(f"❌ Skipping snapshot for {item[0]} at {item[1]}: {e}")
+                    results.append(False)
+            return results
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self.conn.close()
+
+
+class SQLiteSink(EmbeddedSink):
+    """SQLite file (WAL journal). Decimals are stored with NUMERIC affinity, i.e. as doubles."""
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+class DuckDBSink(EmbeddedSink):
+    """DuckDB file: columnar storage, fast analytical scans over the snapshot history."""
+
+    DECIMAL_TYPE = 'DECIMAL(30, 18)'
+
+    def _connect(self) -> Any:
+        try:
+            import duckdb
+        except ImportError:
+            raise RuntimeError("The duckdb sink needs the duckdb package (pip install duckdb)")
+        return duckdb.connect(self.path)
+
+    def _create_schema(self):
+        self.conn.begin()
+        super()._create_schema()
+
+    def _write(self, items: List[SnapshotItem]):
+        self.conn.begin()  # DuckDB autocommits each statement outside an explicit transaction
+        super()._write(items)
+
+
+def create_sink(kind: str, path: Optional[str] = None, db_config: Optional[Dict] = None,
+                ssh_config: Optional[Dict] = None, **options) -> SnapshotSink:
+    """
+    Build a sink by name.
+
+    'mysql' returns a DatabaseManager (all `options` apply); the embedded
+    sinks and the Parquet archive (parquet_archive, `path` is its root
+    directory) only take `digest_cache` and ignore MySQL-only options.
+    """
+    if kind == SINK_MYSQL:
+        from data_inserter_env import DatabaseManager
+        return DatabaseManager(db_config, ssh_config, **options)
+    if kind not in DEFAULT_PATHS:
+        raise ValueError(f"sink must be one of {SINKS}")
+
+    digest_cache = options.pop('digest_cache', None)
+    ignored = sorted(
+        name for name, value in options.items()
+        if value and value not in (ORDER_STORAGE_ROWS, POSITION_STORAGE_ROWS)
+    )
+    if ignored:
+        logger.warning(f"{kind} sink ignores MySQL-only options: {', '.join(ignored)}")
+    if kind == SINK_PARQUET:
+        if options.get('spool_dir'):
+            logger.warning("⚠️ The parquet sink reports snapshots as stored while they are only buffered in "
+                           "memory, and has no spool: a crash loses everything since the last flush")
+        from parquet_archive import ParquetArchiveSink
+        return ParquetArchiveSink(path or DEFAULT_PATHS[kind], digest_cache=digest_cache)
+    sink_class = SQLiteSink if kind == SINK_SQLITE else DuckDBSink
+    return sink_class(path or DEFAULT_PATHS[kind], digest_cache=digest_cache)
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Defaults
+MAX_WALLETS = 10000
+HEARTBEAT_INTERVAL = 900     # Seconds (snapshot time) between full writes of an unchanged wallet
+
+# Fields that move with mark prices on every push; a change in these alone is not material
+VOLATILE_SUMMARY_FIELDS = {
+    'snapshot_time_ms', 'account_value', 'total_ntl_pos', 'total_margin_used',
+    'withdrawable', 'cross_maintenance_margin_used',
+}
+VOLATILE_POSITION_FIELDS = {'position_value', 'unrealized_pnl', 'return_on_equity'}
+VOLATILE_ORDER_FIELDS = set()
+
+
+def _material(record: Dict, volatile: set) -> Dict:
+    return {k: v for k, v in record.items() if k not in volatile}
+
+
+def snapshot_digest(parsed_data: Dict) -> str:
+    """
+    Digest of the material state of a parsed snapshot.
+
+    Volatile (mark-price driven) fields and the snapshot time are ignored;
+    positions and orders are order-insensitive.
+    """
+    positions = sorted(
+        json.dumps(_material(p, VOLATILE_POSITION_FIELDS), sort_keys=True, default=str)
+        for p in parsed_data.get('asset_positions', [])
+    )
+    orders = sorted(
+        json.dumps(_material(o, VOLATILE_ORDER_FIELDS), sort_keys=True, default=str)
+        for o in parsed_data.get('open_orders', [])
+    )
+    state = {
+        'summary': _material(parsed_data.get('summary', {}), VOLATILE_SUMMARY_FIELDS),
+        'positions': positions,
+        'orders': orders,
+    }
+    encoded = json.dumps(state, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class SnapshotDigestCache:
+    """
+    Bounded LRU cache of each wallet's last written state digest.
+
+    `should_write` returns False for a snapshot whose material state equals
+    the last written one, unless `heartbeat_interval` seconds (of snapshot
+    time) have passed since that write. Callers `record` only after a write
+    succeeded, so a failed write is retried on the next snapshot.
+
+    With `state_file` the cache is loaded at start and saved on `save()`, so a
+    restart does not rewrite every wallet.
+    """
+
+    def __init__(
+        self,
+        max_wallets: int = MAX_WALLETS,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        state_file: Optional[str] = None,
+    ):
+        self.max_wallets = max(1, max_wallets)
+        self.heartbeat_ms = int(heartbeat_interval * 1000)
+        self.state_file = state_file
+        self._entries: 'OrderedDict[str, Tuple[str, int]]' = OrderedDict()  # wallet -> (digest, written_ms)
+        self._lock = threading.Lock()
+
+        # Stats
+        self.unchanged = 0
+        self.changed = 0
+        self.heartbeats = 0
+
+        if state_file:
+            self.load()
+
+    def should_write(self, wallet: str, snapshot_time_ms: int, digest: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(wallet)
+            if entry is None or entry[0] != digest:
+                self.changed += 1
+                return True
+            if snapshot_time_ms - entry[1] >= self.heartbeat_ms:
+                self.heartbeats += 1
+                return True
+            self.unchanged += 1
+            return False
+
+    def record(self, wallet: str, snapshot_time_ms: int, digest: str):
+        with self._lock:
+            self._entries[wallet] = (digest, snapshot_time_ms)
+            self._entries.move_to_end(wallet)
+            while len(self._entries) > self.max_wallets:
+                self._entries.popitem(last=False)
+
+    def filter_batch(self, items: List[Tuple[str, int, Dict]]) -> Tuple[List[int], List[str]]:
+        """
+        Indices of batch items that must be written, plus every item's digest.
+
+        A wallet that appears several times in one batch is compared against
+        its previous item in the batch, not only against the cache.
+        """
+        digests = [snapshot_digest(parsed) for _, _, parsed in items]
+        pending: Dict[str, Tuple[str, int]] = {}
+        keep = []
+        for i, (wallet, snapshot_time_ms, _) in enumerate(items):
+            previous = pending.get(wallet)
+            if previous is not None and previous[0] == digests[i] and snapshot_time_ms - previous[1] < self.heartbeat_ms:
+                with self._lock:
+                    self.unchanged += 1
+                continue
+            if previous is not None or self.should_write(wallet, snapshot_time_ms, digests[i]):
+                keep.append(i)
+                pending[wallet] = (digests[i], snapshot_time_ms)
+        return keep, digests
+
+    def load(self):
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable digest state {self.state_file}: {e}")
+            return
+        with self._lock:
+            for wallet, (digest, written_ms) in state.items():
+                self._entries[wallet] = (digest, written_ms)
+            while len(self._entries) > self.max_wallets:
+                self._entries.popitem(last=False)
+        logger.info(f"Loaded digest state for {len(self._entries)} wallets")
+
+    def save(self):
+        if not self.state_file:
+            return
+        with self._lock:
+            state = {wallet: list(entry) for wallet, entry in self._entries.items()}
+        tmp = self.state_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_file)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'wallets': len(self._entries),
+            'changed': self.changed,
+            'unchanged': self.unchanged,
+            'heartbeats': self.heartbeats,
+        }
@@ -0,0 +1,148 @@
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from typing import Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 64-bit layout (Snowflake-style), most significant bit always 0:
+#   41 bits  milliseconds since EPOCH_MS  (~69 years)
+#   10 bits  node id                      (1024 writers)
+#   12 bits  per-millisecond sequence     (4096 ids/ms/node)
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+TIMESTAMP_BITS = 41
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# Derived ids (snapshot_id_for) put the wallet's dictionary id in the node + sequence bits
+WALLET_ID_BITS = NODE_BITS + SEQUENCE_BITS
+MAX_WALLET_ID = (1 << WALLET_ID_BITS) - 1
+
+
+def default_node_id() -> int:
+    """
+    Node id from SNAPSHOT_NODE_ID, or derived from hostname + pid.
+
+    SNAPSHOT_NODE_ID is required when more than one writer generates ids for
+    the same database: the derived value is a 10-bit hash, so two processes
+    can get the same node id and then issue the same ids.
+    """
+    env = os.environ.get('SNAPSHOT_NODE_ID')
+    if env:
+        node_id = int(env)
+        if not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f"SNAPSHOT_NODE_ID must be between 0 and {MAX_NODE_ID}")
+        return node_id
+    seed = f"{socket.gethostname()}:{os.getpid()}".encode()
+    return zlib.crc32(seed) & MAX_NODE_ID
+
+
+class SnapshotIdGenerator:
+    """
+    Thread-safe generator of collision-free, time-ordered 64-bit snapshot ids.
+
+    Ids from one node are strictly increasing. If the clock moves backwards
+    the generator keeps using the last timestamp instead of issuing ids that
+    could collide with earlier ones.
+    """
+
+    def __init__(self, node_id: Optional[int] = None):
+        self.node_id = default_node_id() if node_id is None else node_id
+        if not 0 <= self.node_id <= MAX_NODE_ID:
+            raise ValueError(f"node_id must be between 0 and {MAX_NODE_ID}")
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            now_ms = max(int(time.time() * 1000), self._last_ms)
+
+            if now_ms == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # Sequence exhausted for this millisecond: borrow the next one
+                    now_ms += 1
+            else:
+                self._sequence = 0
+
+            self._last_ms = now_ms
+            return (
+                ((now_ms - EPOCH_MS) << (NODE_BITS + SEQUENCE_BITS))
+                | (self.node_id << SEQUENCE_BITS)
+                | self._sequence
+            )
+
+
+def snapshot_id_for(wallet_id: int, snapshot_time_ms: int) -> int:
+    """
+    Deterministic id of a wallet's snapshot: snapshot time in the timestamp
+    bits, the wallet's dictionary id (id_dictionary) in the low 22 bits.
+
+    The same snapshot always gets the same id, whichever writer or replay
+    produces it, so re-parsing a frame can never store it twice; ids stay
+    time-ordered.
+
+    Raises:
+        ValueError: wallet_id does not fit in 22 bits, or the snapshot is
+            older than EPOCH_MS.
+    """
+    if not 0 <= wallet_id <= MAX_WALLET_ID:
+        raise ValueError(f"wallet_id must be between 0 and {MAX_WALLET_ID} for derived snapshot ids")
+    if snapshot_time_ms < EPOCH_MS:
+        raise ValueError(f"snapshot_time_ms {snapshot_time_ms} is before EPOCH_MS")
+    return ((snapshot_time_ms - EPOCH_MS) << WALLET_ID_BITS) | wallet_id
+
+
+def id_timestamp_ms(snapshot_id: int) -> int:
+    """Time (ms since Unix epoch) encoded in an id: generation time, or snapshot time for derived ids."""
+    return (snapshot_id >> (NODE_BITS + SEQUENCE_BITS)) + EPOCH_MS
+
+
+def id_node(snapshot_id: int) -> int:
+    """Node id embedded in a snapshot id."""
+    return (snapshot_id >> SEQUENCE_BITS) & MAX_NODE_ID
+
+
+_default_generator: Optional[SnapshotIdGenerator] = None
+_default_lock = threading.Lock()
+
+
+def next_snapshot_id() -> int:
+    """Next id from the process-wide generator."""
+    global _default_generator
+    if _default_generator is None:
+        with _default_lock:
+            if _default_generator is None:
+                _default_generator = SnapshotIdGenerator()
+    return _default_generator.next_id()
+
+
+_oversized_wallets: Set[int] = set()
+
+
+def client_snapshot_id(wallet_id: int, snapshot_time_ms: int) -> int:
+    """
+    Derived id (snapshot_id_for) of a wallet's snapshot, or the next generated
+    id if wallet_id does not fit in 22 bits.
+
+    wallets.id is a shared AUTO_INCREMENT (other importers use up values too),
+    so large ids are expected eventually. Their snapshots are still stored,
+    but a frame parsed twice is then stored twice; this is logged once per
+    wallet.
+    """
+    if wallet_id <= MAX_WALLET_ID:
+        return snapshot_id_for(wallet_id, snapshot_time_ms)
+    if wallet_id not in _oversized_wallets:
+        _oversized_wallets.add(wallet_id)
+        logger.error(
+            f"❗ wallet id {wallet_id} exceeds {MAX_WALLET_ID}: its snapshots get generated ids, "
+            f"so re-parsed frames are no longer deduplicated (set SNAPSHOT_NODE_ID per writer)"
+        )
+    return next_snapshot_id()
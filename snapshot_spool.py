@@ -0,0 +1,369 @@
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import json_codec
+from hyperliquid_structs import to_json
+
+logger = logging.getLogger(__name__)
+
+# Frame: [payload length: uint32][crc32 of payload: uint32][payload: compact JSON]
+FRAME_HEADER = struct.Struct('>II')
+
+# Defaults
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+FSYNC_EVERY = 100            # Frames between fsyncs
+FSYNC_INTERVAL = 1.0         # Max seconds an appended frame stays un-fsynced
+REPLAY_BATCH_SIZE = 500
+REPLAY_INTERVAL = 5.0        # Seconds between replay attempts
+
+SEGMENT_PATTERN = re.compile(r'^spool-(\d{10})\.(open|seg)$')
+
+SpoolItem = Tuple[str, int, Dict]  # (wallet_address, snapshot_time_ms, parsed_data)
+
+
+def encode_frame(wallet: str, snapshot_time_ms: int, parsed_data: Dict) -> bytes:
+    payload = json.dumps(
+        [wallet, snapshot_time_ms, parsed_data], separators=(',', ':'), default=to_json
+    ).encode('utf-8')
+    return FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_frames(path: str, offset: int = 0) -> Iterator[Tuple[int, SpoolItem]]:
+    """
+    Yield (end_offset, item) for every intact frame in a segment, from `offset`.
+
+    Stops at the first torn or corrupt frame (e.g. a crash mid-append), so
+    everything that was fully written is still recovered.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if not header:
+                return
+            if len(header) < FRAME_HEADER.size:
+                logger.warning(f"Spool {os.path.basename(path)}: torn frame header at {offset}, ignoring tail")
+                return
+            length, crc = FRAME_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                logger.warning(f"Spool {os.path.basename(path)}: corrupt frame at {offset}, ignoring tail")
+                return
+            offset += FRAME_HEADER.size + length
+            wallet, snapshot_time_ms, parsed_data = json_codec.loads(payload)
+            yield offset, (wallet, snapshot_time_ms, parsed_data)
+
+
+class SnapshotSpool:
+    """
+    Append-only, crash-safe local spool of parsed snapshots.
+
+    Frames are appended to the active segment (`spool-N.open`) and fsynced in
+    batches: after `fsync_every` frames or `fsync_interval` seconds, whichever
+    comes first. Full segments are sealed (renamed to `spool-N.seg`); only
+    sealed segments are replayed. Replay progress is checkpointed per segment
+    (`spool-N.seg.offset`) after each batch, so a restart resumes after the
+    last checkpoint. A batch that was committed but not yet checkpointed when
+    the process died is replayed again: the writer must make that a no-op
+    (DatabaseManager turns on client ids whenever it spools).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = SEGMENT_MAX_BYTES,
+        fsync_every: int = FSYNC_EVERY,
+        fsync_interval: float = FSYNC_INTERVAL,
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._size = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        # Stats
+        self.appended = 0
+        self.replayed = 0
+        self.discarded = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    # --- Segment bookkeeping ---
+
+    def _path(self, seq: int, state: str) -> str:
+        return os.path.join(self.directory, f"spool-{seq:010d}.{state}")
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        found = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                found.append((int(match.group(1)), match.group(2)))
+        return sorted(found)
+
+    def _fsync_dir(self):
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _recover(self):
+        """Seal segments left open by a previous run and continue numbering after them."""
+        segments = self._segments()
+        for seq, state in segments:
+            if state == 'open':
+                os.replace(self._path(seq, 'open'), self._path(seq, 'seg'))
+                logger.info(f"Recovered unsealed spool segment {seq}")
+        if segments:
+            self._seq = segments[-1][0]
+            self._fsync_dir()
+        pending = self.sealed_segments()
+        if pending:
+            logger.warning(f"💾 Spool has {len(pending)} segment(s) from a previous run awaiting replay")
+
+    def _open_segment(self):
+        self._seq += 1
+        self._file = open(self._path(self._seq, 'open'), 'ab')
+        self._size = 0
+        self._fsync_dir()
+
+    def _sync(self):
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _seal(self):
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        self._file = None
+        os.replace(self._path(self._seq, 'open'), self._path(self._seq, 'seg'))
+        self._fsync_dir()
+
+    # --- Writer side ---
+
+    def append(self, wallet: str, snapshot_time_ms: int, parsed_data: Dict):
+        """Append one snapshot; durable after the next batched fsync."""
+        frame = encode_frame(wallet, snapshot_time_ms, parsed_data)
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            self._file.write(frame)
+            self._size += len(frame)
+            self._unsynced += 1
+            self.appended += 1
+
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+            if self._size >= self.segment_max_bytes:
+                self._seal()
+
+    def append_many(self, items: List[SpoolItem]):
+        for wallet, snapshot_time_ms, parsed_data in items:
+            self.append(wallet, snapshot_time_ms, parsed_data)
+
+    def sync(self):
+        """Force pending frames to disk."""
+        with self._lock:
+            self._sync()
+
+    def seal(self):
+        """Seal the active segment so it becomes eligible for replay."""
+        with self._lock:
+            self._seal()
+
+    def close(self):
+        """fsync and seal the active segment."""
+        self.seal()
+
+    # --- Replay side ---
+
+    def sealed_segments(self) -> List[str]:
+        return [self._path(seq, 'seg') for seq, state in self._segments() if state == 'seg']
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            if self._size and self._file is not None:
+                return True
+        return bool(self.sealed_segments())
+
+    @staticmethod
+    def _read_offset(segment: str) -> int:
+        try:
+            with open(segment + '.offset') as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _write_offset(segment: str, offset: int):
+        tmp = segment + '.offset.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, segment + '.offset')
+
+    def _remove_segment(self, segment: str):
+        for path in (segment, segment + '.offset'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def replay(self, write_batch: Callable[[List[SpoolItem]], List[bool]],
+               batch_size: int = REPLAY_BATCH_SIZE) -> int:
+        """
+        Drain sealed segments through `write_batch` (oldest first).
+
+        `write_batch` must raise on connection errors; items it reports as
+        failed are data errors and are discarded. Stops at the first raise and
+        resumes from the checkpoint next time.
+
+        Returns:
+            Number of snapshots written.
+        """
+        written = 0
+        for segment in self.sealed_segments():
+            offset = self._read_offset(segment)
+            batch: List[SpoolItem] = []
+            batch_end = offset
+
+            for end, item in read_frames(segment, offset):
+                batch.append(item)
+                batch_end = end
+                if len(batch) >= batch_size:
+                    written += self._replay_batch(write_batch, batch)
+                    self._write_offset(segment, batch_end)
+                    batch = []
+            if batch:
+                written += self._replay_batch(write_batch, batch)
+
+            self._remove_segment(segment)
+            logger.info(f"💾 Spool segment {os.path.basename(segment)} replayed")
+        return written
+
+    def _replay_batch(self, write_batch, batch: List[SpoolItem]) -> int:
+        results = write_batch(batch)
+        ok = sum(1 for r in results if r)
+        self.replayed += ok
+        self.discarded += len(batch) - ok
+        if ok < len(batch):
+            logger.error(f"❌ Discarded {len(batch) - ok} spooled snapshots rejected by the database")
+        return ok
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'appended': self.appended,
+            'replayed': self.replayed,
+            'discarded': self.discarded,
+            'pending_segments': len(self.sealed_segments()) + (1 if self._file is not None else 0),
+        }
+
+
+class SpoolReplayer:
+    """
+    Background thread that drains the spool once the database is reachable.
+
+    Every `interval` seconds it seals the active segment (if it has frames)
+    and replays sealed segments in bulk. `on_drained` is called after a
+    replay pass that emptied the spool; `on_error` after a failed one.
+
+    The replayer writes on its own connection, concurrently with the caller's
+    writer. The backlog is replayed without holding `lock`; then, holding it,
+    the frames appended meanwhile are replayed and `on_drained` is called.
+    A writer that holds `lock` while it decides between the spool and the
+    database therefore never writes a snapshot directly before the spooled
+    ones are written.
+    """
+
+    def __init__(
+        self,
+        spool: SnapshotSpool,
+        write_batch: Callable[[List[SpoolItem]], List[bool]],
+        batch_size: int = REPLAY_BATCH_SIZE,
+        interval: float = REPLAY_INTERVAL,
+        on_drained: Optional[Callable[[], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        lock: Optional[threading.Lock] = None,
+    ):
+        self.spool = spool
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.interval = interval
+        self.on_drained = on_drained
+        self.on_error = on_error
+        self.lock = lock or threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="spool-replayer", daemon=True)
+            self._thread.start()
+
+    def run_once(self) -> int:
+        """One replay pass; returns the number of snapshots written."""
+        self.spool.sync()
+        if not self.spool.has_pending():
+            return 0
+        written = self._replay()
+        if written is None:
+            return 0
+        # Frames appended during the replay, then hand over with the writer held off
+        with self.lock:
+            tail = self._replay()
+            if tail is None:
+                return written
+            written += tail
+            if written:
+                logger.info(f"💾 Replayed {written} spooled snapshots")
+            if self.on_drained:
+                self.on_drained()
+        return written
+
+    def _replay(self) -> Optional[int]:
+        """Seal and replay everything pending; None if the database is still unavailable."""
+        self.spool.sync()
+        if not self.spool.has_pending():
+            return 0
+        self.spool.seal()
+        try:
+            return self.spool.replay(self.write_batch, self.batch_size)
+        except Exception as e:
+            logger.warning(f"Spool replay paused: {e}")
+            if self.on_error:
+                self.on_error(e)
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,6 @@
+from typing import Any, Sequence
+
+
+def in_clause(values: Sequence[Any]) -> str:
+    """`%s` placeholders for an IN (...) list or a VALUES (...) row of `values`."""
+    return ", ".join(["%s"] * len(values))
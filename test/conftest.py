@@ -0,0 +1,108 @@
+import datetime
+import re
+import sqlite3
+
+import pytest
+
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(' '))
+
+# MySQL-only syntax used by the modules under test, and its SQLite spelling
+_DIALECT = [
+    (re.compile(r'\bINSERT IGNORE\b'), 'INSERT OR IGNORE'),
+    (re.compile(r'\s+FOR UPDATE\b'), ''),
+    (re.compile(r'\bGREATEST\('), 'MAX('),
+    (re.compile(r'%s'), '?'),
+]
+_UPSERT = re.compile(r'ON DUPLICATE KEY UPDATE (.*)$', re.S)
+
+
+def to_sqlite(sql: str) -> str:
+    for pattern, replacement in _DIALECT:
+        sql = pattern.sub(replacement, sql)
+    return _UPSERT.sub(
+        lambda m: 'ON CONFLICT DO UPDATE SET ' + re.sub(r'VALUES\((\w+)\)', r'excluded.\1', m.group(1)), sql)
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteMySQL:
+    """
+    In-memory SQLite behind the pymysql surface the modules use (connection
+    with cursor() context, DictCursor rows, execute() returning the row count).
+
+    The tests' own DDL supplies the primary and unique keys, so duplicate
+    keys fail as they would in MySQL (sqlite3.IntegrityError).
+    """
+
+    def __init__(self, ddl: str):
+        self.db = sqlite3.connect(':memory:')
+        self.db.row_factory = _dict_row
+        self.db.executescript(ddl)
+        self.statements = 0
+        self.commits = 0
+        self._cursor = None
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        self.commits += 1
+        self.db.commit()
+
+    def execute(self, sql, args=()):
+        self.statements += 1
+        self._cursor = self.db.execute(to_sqlite(sql), tuple(args))
+        return self._cursor.rowcount
+
+    def executemany(self, sql, rows):
+        self.statements += 1
+        self._cursor = self.db.executemany(to_sqlite(sql), [tuple(row) for row in rows])
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def rows(self, table: str, order_by: str = 'rowid'):
+        return self.db.execute(f"SELECT * FROM {table} ORDER BY {order_by}").fetchall()
+
+
+@pytest.fixture
+def mysql():
+    """Factory: mysql(ddl) -> SQLiteMySQL with those tables."""
+    return SQLiteMySQL
+
+
+SUMMARY = {"account_value": "1", "total_ntl_pos": "0", "total_raw_usd": "1", "total_margin_used": "0",
+           "withdrawable": "1", "cross_maintenance_margin_used": None}
+
+
+def _snapshot(coins=(), order_ids=()):
+    return {
+        "summary": dict(SUMMARY),
+        "asset_positions": [{"coin": c, "type": "oneWay", "size": "1", "leverage_type": "cross",
+                             "leverage_value": 5, "entry_price": "10", "position_value": "10",
+                             "unrealized_pnl": "0", "return_on_equity": "0"} for c in coins],
+        "open_orders": [{"order_id": oid, "coin": "BTC", "side": "B", "limit_price": "9", "quantity": "1",
+                         "timestamp_ms": 1, "order_type": "Limit", "reduce_only": False,
+                         "time_in_force": "Gtc"} for oid in order_ids],
+    }
+
+
+@pytest.fixture
+def snapshot():
+    """Factory: snapshot(coins, order_ids) -> a fresh parsed snapshot with those positions and orders."""
+    return _snapshot
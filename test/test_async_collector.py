@@ -0,0 +1,164 @@
+import asyncio
+import json
+
+import json_codec
+from async_collector import AsyncCollector, WriteThrottle, frame_user
+
+
+class FakeWebSocket:
+    """Replays a webData2 frame for whichever wallet subscribes."""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.frames = asyncio.Queue()
+
+    async def send(self, msg):
+        user = json.loads(msg)["subscription"]["user"]
+        await asyncio.sleep(0.01)
+        await self.frames.put(json.dumps({"channel": "webData2", "data": {"user": user}}))
+
+    async def recv(self):
+        return await self.frames.get()
+
+    async def close(self):
+        self.tracker["open"] -= 1
+
+
+def test_run_rotation_bounds_concurrency_and_records_stats():
+    tracker = {"open": 0, "peak": 0}
+    handled = []
+
+    async def connect():
+        tracker["open"] += 1
+        tracker["peak"] = max(tracker["peak"], tracker["open"])
+        return FakeWebSocket(tracker)
+
+    async def on_snapshot(wallet, msg):
+        handled.append(json.loads(msg)["data"]["user"])
+        return wallet != "0xbad"
+
+    async def run():
+        collector = AsyncCollector(connect, on_snapshot, concurrency=3, timeout_seconds=5)
+        results = await collector.run_rotation(["0xa", "0xb", "0xbad", "0xc", "0xd"])
+        return collector, results
+
+    collector, results = asyncio.run(run())
+
+    assert tracker["peak"] == 3
+    assert tracker["open"] == 0
+    assert sorted(handled) == ["0xa", "0xb", "0xbad", "0xc", "0xd"]
+    assert results["0xbad"] is False and results["0xa"] is True
+    assert (collector.successful, collector.failed) == (4, 1)
+    assert collector.wallet_stats["0xbad"].failed == 1
+
+
+def test_connection_errors_are_counted_per_wallet():
+    async def connect():
+        raise ConnectionRefusedError("proxy down")
+
+    async def on_snapshot(wallet, msg):
+        return True
+
+    async def run():
+        collector = AsyncCollector(connect, on_snapshot, concurrency=2, timeout_seconds=1)
+        await collector.run_rotation(["0xa", "0xb"])
+        return collector
+
+    collector = asyncio.run(run())
+
+    assert collector.connection_errors == 2
+    assert collector.failed == 2
+    assert collector.wallet_stats["0xa"].last_error == "proxy down"
+
+
+def test_write_throttle_caps_per_wallet_frequency():
+    throttle = WriteThrottle(min_interval=10)
+
+    assert throttle.allow("0xa", now=100.0)
+    assert not throttle.allow("0xa", now=105.0)
+    assert throttle.allow("0xb", now=105.0)
+    assert throttle.allow("0xa", now=110.0)
+    assert throttle.skipped == 1
+
+
+def test_stream_routes_every_push_by_user_field():
+    stored = []
+
+    class PushingWebSocket(FakeWebSocket):
+        async def send(self, msg):
+            user = json.loads(msg)["subscription"]["user"]
+            for _ in range(3):
+                await self.frames.put(json.dumps({"channel": "webData2", "data": {"user": user.lower()}}))
+
+        async def close(self):
+            pass
+
+    async def connect():
+        return PushingWebSocket({})
+
+    async def on_snapshot(wallet, msg):
+        stored.append(wallet)
+        return True
+
+    async def run():
+        collector = AsyncCollector(connect, on_snapshot, concurrency=1, timeout_seconds=5)
+        task = asyncio.ensure_future(
+            collector.stream(["0xAA", "0xBB"], subscriptions_per_connection=2, min_write_interval=0)
+        )
+        await asyncio.sleep(0.05)
+        task.cancel()
+        return collector
+
+    collector = asyncio.run(run())
+
+    assert sorted(stored) == ["0xAA"] * 3 + ["0xBB"] * 3
+    assert collector.updates_received == 6
+
+
+def test_stream_routes_by_data_user_not_a_nested_user():
+    stored = []
+
+    class PushingWebSocket(FakeWebSocket):
+        async def send(self, msg):
+            user = json.loads(msg)["subscription"]["user"]
+            other = "0xbb" if user == "0xAA" else "0xaa"
+            # A nested "user" (e.g. a vault) comes before the frame's own data.user
+            data = {"leadingVaults": [{"user": other}], "user": user}
+            await self.frames.put(json.dumps({"channel": "webData2", "data": data}))
+
+        async def close(self):
+            pass
+
+    async def connect():
+        return PushingWebSocket({})
+
+    async def on_snapshot(wallet, msg):
+        stored.append((wallet, json.loads(msg)["data"]["user"]))
+        return True
+
+    async def run():
+        collector = AsyncCollector(connect, on_snapshot, concurrency=1, timeout_seconds=5)
+        task = asyncio.ensure_future(
+            collector.stream(["0xAA", "0xBB"], subscriptions_per_connection=2, min_write_interval=0)
+        )
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(run())
+
+    assert sorted(stored) == [("0xAA", "0xAA"), ("0xBB", "0xBB")]
+
+
+def test_frame_user_decodes_the_whole_frame_only_when_users_disagree(monkeypatch):
+    decoded = []
+    loads = json_codec.loads
+    monkeypatch.setattr(json_codec, "loads", lambda msg: decoded.append(msg) or loads(msg))
+
+    twap = json.dumps({"channel": "webData2", "data": {"twapStates": [[1, {"user": "0xaa"}]], "user": "0xAA"}})
+    assert frame_user(twap) == "0xaa"
+    assert frame_user(json.dumps({"channel": "pong"})) is None
+    assert decoded == []
+
+    vault = json.dumps({"channel": "webData2", "data": {"vault": {"user": "0xbb"}, "user": "0xaa"}})
+    assert frame_user(vault) == "0xaa"
+    assert decoded == [vault]
@@ -0,0 +1,53 @@
+import datetime
+import os
+
+from bulk_loader import LoadDataError, encode_rows, load_rows
+
+
+class FakeCursor:
+    def __init__(self, loaded=None):
+        self.loaded = loaded
+        self.sent = None
+        self.path = None
+        self.queries = []
+
+    def execute(self, sql, args=None):
+        self.queries.append(sql)
+        if sql.strip().startswith("LOAD DATA"):
+            self.path = args[0]
+            with open(self.path, 'rb') as f:
+                self.sent = f.read()
+            return self.loaded if self.loaded is not None else self.sent.count(b'\n')
+        return 0
+
+    def fetchall(self):
+        return [{'Level': 'Warning', 'Code': 1062, 'Message': 'Duplicate entry'}]
+
+
+def test_encode_rows_escapes_and_nulls():
+    rows = [
+        (1, 'BTC', None, True, datetime.datetime(2025, 1, 2, 3, 4, 5, 6000)),
+        (2, 'a\tb\nc\\d', '0.5', False, '1.0'),
+    ]
+    assert encode_rows(rows) == (
+        b'1\tBTC\t\\N\t1\t2025-01-02 03:04:05.006000\n'
+        b'2\ta\\tb\\nc\\\\d\t0.5\t0\t1.0\n'
+    )
+
+
+def test_load_rows_streams_buffer_and_removes_temp_file():
+    cursor = FakeCursor()
+    assert load_rows(cursor, 'hyperliquid_positions', ['snapshot_id', 'coin'], [(1, 'BTC'), (1, 'ETH')]) == 2
+    assert cursor.sent == b'1\tBTC\n1\tETH\n'
+    assert 'INTO TABLE `hyperliquid_positions`' in cursor.queries[0]
+    assert not os.path.exists(cursor.path)
+
+
+def test_load_rows_raises_when_rows_are_skipped():
+    cursor = FakeCursor(loaded=1)
+    try:
+        load_rows(cursor, 'hyperliquid_snapshots', ['snapshot_id'], [(1,), (2,)])
+    except LoadDataError as e:
+        assert '1/2' in str(e)
+    else:
+        raise AssertionError("expected LoadDataError")
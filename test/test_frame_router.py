@@ -0,0 +1,32 @@
+from frame_router import (CHANNEL_ERROR, CHANNEL_PONG, CHANNEL_SUBSCRIPTION_RESPONSE, CHANNEL_WEBDATA2,
+                          PREFIX_SIZE, FrameRouter, classify)
+
+WEBDATA2 = '{"channel":"webData2","data":{"user":"0xa"}}'
+
+
+def test_classify_reads_str_and_bytes_frames():
+    assert classify(WEBDATA2) == CHANNEL_WEBDATA2
+    assert classify(WEBDATA2.encode("utf-8")) == CHANNEL_WEBDATA2
+    assert classify('{ "channel" : "pong" }') == CHANNEL_PONG
+    assert classify(b'{"channel": "error", "data": "Invalid subscription"}') == CHANNEL_ERROR
+    assert classify('{"id": 1, "channel": "subscriptionResponse", "data": {}}') == CHANNEL_SUBSCRIPTION_RESPONSE
+    assert classify('not json') is None
+
+
+def test_classify_only_inspects_the_prefix():
+    late = '{"data": "' + "x" * PREFIX_SIZE + '", "channel": "webData2"}'
+    assert classify(late) is None
+    assert classify('{"channel":"allMids","data":{"note":"webData2"}}') == "allMids"
+
+
+def test_router_dispatches_by_channel():
+    seen = []
+    router = FrameRouter({CHANNEL_WEBDATA2: lambda msg: "snapshot"}, default=seen.append)
+    router.on(CHANNEL_PONG, lambda msg: "pong")
+
+    assert router.route(WEBDATA2) == "snapshot"
+    assert router.route('{"channel":"pong"}') == "pong"
+    assert router.route('{"channel":"error","data":"bad"}') is None
+    assert seen == ['{"channel":"error","data":"bad"}']
+    assert router.counts == {CHANNEL_WEBDATA2: 1, CHANNEL_PONG: 1, CHANNEL_ERROR: 1}
+    assert FrameRouter().route(WEBDATA2) is None
@@ -0,0 +1,83 @@
+from array import array
+
+from bench_json import synthetic_frame
+from hyperliquid_batch import (ORDER_COLUMNS, POSITION_COLUMNS, SNAPSHOT_COLUMNS, parse_hyperliquid_data_batch,
+                               rows)
+from hyperliquid_parser import parse_hyperliquid_data
+from hyperliquid_structs import parse_hyperliquid_structs
+import json_codec
+
+
+def test_batch_matches_the_per_frame_parser():
+    frames = [synthetic_frame(positions=3, orders=2, asset_ctxs=2, seed=i) for i in range(3)]
+    # A real subscription ack: its data is a dict, but it is not a snapshot
+    frames.insert(1, '{"channel":"subscriptionResponse","data":{"method":"subscribe",'
+                     '"subscription":{"type":"webData2","user":"0x0000000000000000000000000000000000000001"}}}')
+    batch = parse_hyperliquid_data_batch(frames)
+    snapshots, positions, orders = batch["snapshots"], batch["positions"], batch["orders"]
+
+    assert list(snapshots["frame"]) == [0, 2, 3]
+    assert isinstance(positions["snapshot"], array)
+    for row, frame in enumerate(frames[:1] + frames[2:]):
+        data = json_codec.loads(frame)["data"]
+        parsed = parse_hyperliquid_data(data)
+        assert snapshots["user"][row] == data["user"]
+        assert rows(snapshots, SNAPSHOT_COLUMNS[1:])[row] == tuple(parsed["summary"].values())
+        assert [r[1:] for r in rows(positions, ("snapshot",) + POSITION_COLUMNS) if r[0] == row] == \
+            [tuple(p.values()) for p in parsed["asset_positions"]]
+        assert [r[1:] for r in rows(orders, ("snapshot",) + ORDER_COLUMNS) if r[0] == row] == \
+            [tuple(o.values()) for o in parsed["open_orders"]]
+
+
+def test_batch_applies_not_null_defaults():
+    data = {
+        "clearinghouseState": {
+            "time": 1000,
+            "assetPositions": [{"position": {"coin": "BTC", "szi": "1"}}, {"position": {"coin": "ETH", "szi": "0"}}],
+        },
+        "openOrders": [{"oid": 7}, {"coin": "BTC"}],
+    }
+    batch = parse_hyperliquid_data_batch([data])
+    assert batch["snapshots"]["account_value"] == ["0.0"] and batch["snapshots"]["user"] == [None]
+    assert rows(batch["positions"], POSITION_COLUMNS) == [
+        ("BTC", "oneWay", "1", "cross", 1, None, "0.0", "0.0", "0.0")]
+    assert rows(batch["orders"], ORDER_COLUMNS) == [(7, "", "", "0.0", "0.0", 0, "Limit", False, "Gtc")]
+
+
+def test_batch_skips_data_without_a_snapshot_time():
+    batch = parse_hyperliquid_data_batch([{"clearinghouseState": {}}, {"openOrders": [{"oid": 1}]}])
+    assert len(batch["snapshots"]["frame"]) == 0 and len(batch["orders"]["order_id"]) == 0
+
+
+def test_all_parsers_agree_on_a_frame_with_missing_fields():
+    data = {
+        "clearinghouseState": {
+            "time": 1000,
+            "marginSummary": {"accountValue": "5.0", "totalNtlPos": None},
+            "withdrawable": None,
+            "assetPositions": [
+                {"position": {"coin": "BTC", "szi": "1", "leverage": {"type": None}, "positionValue": None}},
+                {"type": "oneWay", "position": {"coin": "ETH", "szi": None}},
+                {"position": {"szi": "2"}},
+            ],
+        },
+        "openOrders": [{"oid": 7, "coin": "BTC", "sz": None}, {"oid": 8, "tif": None, "reduceOnly": None}, {}],
+    }
+    expected = parse_hyperliquid_data(data)
+
+    structs = parse_hyperliquid_structs(data)
+    assert {
+        "summary": structs["summary"].as_dict(),
+        "asset_positions": [p.as_dict() for p in structs["asset_positions"]],
+        "open_orders": [o.as_dict() for o in structs["open_orders"]],
+        "snapshot_time_ms": structs["snapshot_time_ms"],
+    } == expected
+
+    batch = parse_hyperliquid_data_batch([data])
+    assert {
+        "summary": {c: batch["snapshots"][c][0] for c in SNAPSHOT_COLUMNS[1:]},
+        "asset_positions": [dict(zip(POSITION_COLUMNS, r)) for r in rows(batch["positions"], POSITION_COLUMNS)],
+        "open_orders": [dict(zip(ORDER_COLUMNS, r)) for r in rows(batch["orders"], ORDER_COLUMNS)],
+        "snapshot_time_ms": batch["snapshots"]["snapshot_time_ms"][0],
+    } == expected
+    assert len(expected["asset_positions"]) == 1 and len(expected["open_orders"]) == 2
@@ -0,0 +1,52 @@
+import json
+import pickle
+
+from bench_json import synthetic_frame
+from hyperliquid_parser import parse_hyperliquid_data
+from hyperliquid_structs import Position, parse_hyperliquid_structs, to_json
+from snapshot_digest import snapshot_digest
+
+
+def as_plain(parsed):
+    return {
+        "summary": parsed["summary"].as_dict(),
+        "asset_positions": [p.as_dict() for p in parsed["asset_positions"]],
+        "open_orders": [o.as_dict() for o in parsed["open_orders"]],
+        "snapshot_time_ms": parsed["snapshot_time_ms"],
+    }
+
+
+def test_structs_match_the_dict_parser():
+    data = json.loads(synthetic_frame(positions=5, orders=4, asset_ctxs=3))["data"]
+    data["clearinghouseState"]["assetPositions"][0]["position"]["szi"] = "0"  # skipped by both
+    parsed = parse_hyperliquid_structs(data)
+
+    assert as_plain(parsed) == parse_hyperliquid_data(data)
+    assert len(parsed["asset_positions"]) == 4
+    assert snapshot_digest(parsed) == snapshot_digest(parse_hyperliquid_data(data))
+
+
+def test_missing_and_null_fields_get_the_not_null_defaults():
+    data = {
+        "clearinghouseState": {
+            "marginSummary": {"accountValue": None},
+            "time": 5,
+            "assetPositions": [{"position": {"coin": "BTC", "szi": "1", "leverage": {}}}],
+        },
+        "openOrders": [{"oid": 7, "coin": None}, {"coin": "ETH"}],
+    }
+    parsed = parse_hyperliquid_structs(data)
+
+    assert as_plain(parsed) == parse_hyperliquid_data(data)
+    position = parsed["asset_positions"][0]
+    assert (position.type, position.leverage_type, position.leverage_value, position.entry_price) == \
+        ("oneWay", "cross", 1, None)
+    assert parsed["summary"]["account_value"] == "0.0" and parsed["summary"].get("nope", 3) == 3
+
+
+def test_structs_pickle_and_serialize_like_dicts():
+    position = Position("BTC", "oneWay", "1", "cross", 5, None, "10", "0", "0")
+
+    assert pickle.loads(pickle.dumps(position)) == position
+    assert json.loads(json.dumps([position], default=to_json)) == [position.as_dict()]
+    assert dict(position.items())["coin"] == "BTC" and "size" in position and len(position) == 9
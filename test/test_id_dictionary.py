@@ -0,0 +1,32 @@
+from id_dictionary import IdDictionary
+
+DDL = "CREATE TABLE wallets (id INTEGER PRIMARY KEY AUTOINCREMENT, address TEXT NOT NULL UNIQUE COLLATE NOCASE);"
+
+
+def test_known_keys_are_served_from_memory(mysql):
+    db = mysql(DDL)
+    wallets = IdDictionary("wallets", "id", "address", str.lower)
+
+    assert wallets.resolve(db, ["0xAB", "0xcd"]) is True
+    assert db.statements == 3
+    assert wallets["0xab"] == wallets["0xAB"] == 1
+    assert wallets["0xCD"] == 2
+
+    assert wallets.resolve(db, ["0xab", "0xCD"]) is False
+    assert db.statements == 3
+    assert len(wallets) == 2
+
+
+def test_stored_keys_are_not_reinserted_after_a_restart(mysql):
+    db = mysql(DDL)
+    IdDictionary("wallets", "id", "address", str.lower).resolve(db, ["0xab", "0xcd"])
+
+    restarted = IdDictionary("wallets", "id", "address", str.lower)
+    assert restarted.resolve(db, ["0xAB", "0xcd", "0xef"]) is True
+    assert restarted["0xab"] == 1 and restarted["0xcd"] == 2
+    assert restarted["0xef"] == 3
+
+    # Stored keys only: looked up, no INSERT IGNORE (which would burn AUTO_INCREMENT values)
+    statements = db.statements
+    assert IdDictionary("wallets", "id", "address", str.lower).resolve(db, ["0xab"]) is False
+    assert db.statements == statements + 1
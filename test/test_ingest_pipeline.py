@@ -0,0 +1,101 @@
+import asyncio
+import json
+import threading
+import time
+
+from ingest_pipeline import IngestPipeline
+
+
+def frame(wallet, snapshot_time=1764506145684):
+    return json.dumps({
+        "channel": "webData2",
+        "data": {
+            "user": wallet,
+            "clearinghouseState": {
+                "marginSummary": {"accountValue": "1.0"},
+                "assetPositions": [],
+                "time": snapshot_time,
+            },
+            "openOrders": [],
+        },
+    })
+
+
+def test_frames_are_parsed_and_written_off_the_event_loop():
+    written = []
+    writer_threads = set()
+
+    def write(wallet, snapshot_time_ms, parsed_data):
+        writer_threads.add(threading.current_thread().name)
+        written.append((wallet, snapshot_time_ms, parsed_data["summary"]["account_value"]))
+        return True
+
+    async def run():
+        pipeline = IngestPipeline(write, parse_workers=2, stats_interval=0)
+        await pipeline.start()
+        for i in range(5):
+            await pipeline.submit(f"0x{i}", frame(f"0x{i}"))
+        await pipeline.submit("0xnodata", json.dumps({"channel": "webData2"}))
+        await pipeline.stop()
+        return pipeline.stats()
+
+    stats = asyncio.run(run())
+
+    assert sorted(w for w, _, _ in written) == [f"0x{i}" for i in range(5)]
+    assert all(value == "1.0" for _, _, value in written)
+    assert len(writer_threads) == 1 and threading.main_thread().name not in writer_threads
+    assert stats["write"]["processed"] == 5
+    assert stats["parse"]["processed"] == 6
+    assert stats["skipped"] == 1
+
+
+def test_full_queues_push_back_on_the_receive_stage():
+    release = threading.Event()
+
+    def slow_write(wallet, snapshot_time_ms, parsed_data):
+        release.wait(timeout=5)
+        return True
+
+    async def run():
+        pipeline = IngestPipeline(slow_write, parse_workers=1, frame_queue_size=1,
+                                  snapshot_queue_size=1, stats_interval=0)
+        await pipeline.start()
+        accepted = []
+        for _ in range(5):
+            accepted += [pipeline.try_submit("0xa", frame("0xa")) for _ in range(5)]
+            await asyncio.sleep(0.05)
+        depths = pipeline.stats()
+        release.set()
+        await pipeline.stop()
+        return accepted, depths, pipeline
+
+    accepted, depths, pipeline = asyncio.run(run())
+
+    assert not all(accepted)
+    assert pipeline.dropped == accepted.count(False)
+    assert depths["frame_queue"]["depth"] == 1
+    assert depths["snapshot_queue"]["depth"] == 1
+
+
+def test_batch_writer_group_commits_by_size_and_age():
+    batches = []
+
+    def write_batch(items):
+        batches.append([wallet for wallet, _, _ in items])
+        return [True] * len(items)
+
+    async def run():
+        pipeline = IngestPipeline(lambda *a: True, write_batch=write_batch, batch_size=3,
+                                  batch_max_age=0.05, stats_interval=0)
+        await pipeline.start()
+        for i in range(4):
+            await pipeline.submit(f"0x{i}", frame(f"0x{i}"))
+        await pipeline.stop()
+        return pipeline.stats()
+
+    stats = asyncio.run(run())
+
+    assert sorted(w for batch in batches for w in batch) == ["0x0", "0x1", "0x2", "0x3"]
+    assert max(len(batch) for batch in batches) == 3
+    assert stats["batches"] == len(batches) == 2
+    assert stats["write"]["processed"] == 4
@@ -0,0 +1,61 @@
+import pytest
+
+import json_codec
+from bench_json import synthetic_frame
+from ingest_pipeline import decode_frame
+
+
+def installed_backends():
+    names = []
+    for name in json_codec.BACKENDS:
+        try:
+            json_codec.load_backend(name)
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+@pytest.mark.parametrize("name", installed_backends())
+def test_backends_decode_alike_and_raise_decode_error(name):
+    _, loads = json_codec.load_backend(name)
+    frame = synthetic_frame(positions=3, orders=2, asset_ctxs=2)
+    assert loads(frame) == json_codec.load_backend("json")[1](frame)
+    assert loads(frame.encode("utf-8"))["channel"] == "webData2"
+    with pytest.raises(json_codec.DecodeError):
+        loads('{"channel": "webData2", "data": ')
+
+
+def test_use_backend_switches_the_process_decoder():
+    selected = json_codec.BACKEND
+    try:
+        assert json_codec.use_backend("json") == "json"
+        snapshot_time, parsed = decode_frame(synthetic_frame(positions=3, orders=2, asset_ctxs=2))
+        assert snapshot_time == 1735689600000 and len(parsed["open_orders"]) == 2
+    finally:
+        json_codec.use_backend(selected)
+
+    with pytest.raises(ValueError):
+        json_codec.load_backend("simplejson")
+
+
+def test_loads_fields_matches_the_full_decode():
+    frame = synthetic_frame(positions=3, orders=2, asset_ctxs=2)
+    data = json_codec.loads(frame)["data"]
+    assert json_codec.loads_fields(frame) == {field: data[field] for field in json_codec.WEBDATA2_FIELDS}
+    assert json_codec.loads_fields(frame.encode("utf-8"))["user"] == data["user"]
+    assert json_codec.loads_fields('{"channel": "subscriptionResponse", "data": {}}') == {}
+    assert decode_frame(frame, partial=True) == decode_frame(frame)
+
+
+def test_loads_fields_falls_back_when_a_key_matches_elsewhere():
+    # "user" first appears as a string value, not as the key
+    frame = '{"channel": "webData2", "data": {"note": "user", "user": "0xa", "openOrders": []}}'
+    assert json_codec.loads_fields('{"data": {"user": 1}}') is None
+    assert json_codec.webdata2_data(frame, partial=True)["user"] == "0xa"
+
+
+def test_field_values_finds_every_key_at_any_depth():
+    msg = '{"data": {"a": {"user": "0x1"}, "name": "user", "user" : "0x2", "n": {"user": 3}}}'
+    assert json_codec.field_values(msg, "user") == ["0x1", "0x2", 3]
+    assert json_codec.field_values(msg.encode(), "missing") == []
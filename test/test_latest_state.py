@@ -0,0 +1,39 @@
+from latest_state import apply_latest_state, latest_items
+
+DDL = """
+CREATE TABLE hyperliquid_wallet_latest (
+    wallet_id INTEGER PRIMARY KEY, snapshot_id INTEGER NOT NULL, snapshot_time_ms INTEGER NOT NULL,
+    snapshot_datetime TEXT NOT NULL, account_value TEXT NOT NULL, total_ntl_pos TEXT NOT NULL,
+    total_raw_usd TEXT NOT NULL, total_margin_used TEXT NOT NULL, withdrawable TEXT NOT NULL,
+    cross_maintenance_margin_used TEXT
+);
+CREATE TABLE hyperliquid_latest_positions (
+    wallet_id INTEGER NOT NULL, coin_id INTEGER NOT NULL, snapshot_id INTEGER NOT NULL,
+    snapshot_time_ms INTEGER NOT NULL, type TEXT, size TEXT, leverage_type TEXT, leverage_value INTEGER,
+    entry_price TEXT, position_value TEXT, unrealized_pnl TEXT, return_on_equity TEXT,
+    PRIMARY KEY (wallet_id, coin_id)
+);
+CREATE TABLE hyperliquid_latest_orders (
+    wallet_id INTEGER NOT NULL, order_id INTEGER NOT NULL, snapshot_id INTEGER NOT NULL,
+    snapshot_time_ms INTEGER NOT NULL, coin_id INTEGER, side TEXT, limit_price TEXT, quantity TEXT,
+    timestamp_ms INTEGER, order_type TEXT, reduce_only INTEGER, time_in_force TEXT,
+    PRIMARY KEY (wallet_id, order_id)
+);
+"""
+COINS = {"BTC": 1, "ETH": 2}
+
+
+def test_latest_state_replaces_positions_and_ignores_older_snapshots(mysql, snapshot):
+    db = mysql(DDL)
+    assert apply_latest_state(db, 7, 100, 1000, snapshot(["BTC", "ETH"], [1, 2]), COINS)
+    assert apply_latest_state(db, 7, 101, 2000, snapshot(["ETH"], [2]), COINS)
+    assert not apply_latest_state(db, 7, 99, 1500, snapshot([], []), COINS)
+
+    assert [r["snapshot_id"] for r in db.rows("hyperliquid_wallet_latest")] == [101]
+    assert [(r["wallet_id"], r["coin_id"]) for r in db.rows("hyperliquid_latest_positions")] == [(7, 2)]
+    assert [(r["wallet_id"], r["order_id"]) for r in db.rows("hyperliquid_latest_orders")] == [(7, 2)]
+
+
+def test_latest_items_keeps_newest_snapshot_per_wallet():
+    items = [("0xa", 1000, {}), ("0xb", 1500, {}), ("0xa", 3000, {}), ("0xa", 2000, {})]
+    assert sorted((w, t) for w, t, _ in latest_items(items)) == [("0xa", 3000), ("0xb", 1500)]
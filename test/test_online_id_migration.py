@@ -0,0 +1,24 @@
+from online_id_migration import copy_table, cutover_sql, widen_sql
+
+DDL = """
+CREATE TABLE hyperliquid_open_orders (order_id INTEGER NOT NULL, n INTEGER NOT NULL, PRIMARY KEY (order_id, n));
+CREATE TABLE hyperliquid_open_orders_new (order_id INTEGER NOT NULL, n INTEGER NOT NULL, PRIMARY KEY (order_id, n));
+"""
+
+
+def test_copy_walks_key_ranges_in_chunks_and_is_idempotent(mysql):
+    # Key 2 is not unique (e.g. order_id): both rows land in the same chunk
+    db = mysql(DDL)
+    rows = [(1, 0), (2, 0), (2, 1), (5, 0), (8, 0), (9, 0), (13, 0)]
+    db.executemany("INSERT INTO hyperliquid_open_orders VALUES (%s, %s)", rows)
+    assert copy_table(db, "hyperliquid_open_orders", chunk_size=3, pause=0) == 7
+    assert [(r["order_id"], r["n"]) for r in db.rows("hyperliquid_open_orders_new", "order_id, n")] == rows
+    assert db.commits >= 4  # bounds, then one short transaction per chunk
+    assert copy_table(db, "hyperliquid_open_orders", chunk_size=3, pause=0) == 0
+
+
+def test_shadow_ddl_and_atomic_cutover():
+    columns = [{"COLUMN_NAME": "position_id", "IS_NULLABLE": "NO", "EXTRA": "auto_increment"}]
+    assert widen_sql("hyperliquid_positions", columns) == \
+        "ALTER TABLE hyperliquid_positions_new MODIFY position_id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT"
+    assert cutover_sql(["a", "b"]) == "RENAME TABLE a TO a_old, a_new TO a, b TO b_old, b_new TO b"
@@ -0,0 +1,69 @@
+import pytest
+
+from order_intervals import apply_order_snapshot, open_orders_at
+
+COINS = {"BTC": 1}
+DDL = """
+CREATE TABLE wallets (id INTEGER PRIMARY KEY, address TEXT UNIQUE);
+CREATE TABLE hyperliquid_coins (coin_id INTEGER PRIMARY KEY, coin TEXT UNIQUE);
+CREATE TABLE hyperliquid_order_intervals (
+    order_id INTEGER NOT NULL, wallet_id INTEGER NOT NULL, coin_id INTEGER NOT NULL, side TEXT NOT NULL,
+    limit_price TEXT NOT NULL, quantity TEXT NOT NULL, timestamp_ms INTEGER NOT NULL, order_type TEXT NOT NULL,
+    reduce_only INTEGER NOT NULL, time_in_force TEXT NOT NULL,
+    first_seen_ms INTEGER NOT NULL, last_seen_ms INTEGER NOT NULL, closed_ms INTEGER,
+    PRIMARY KEY (order_id, first_seen_ms)
+);
+CREATE VIEW hyperliquid_order_intervals_v AS
+SELECT i.*, w.address AS wallet_address, c.coin
+FROM hyperliquid_order_intervals i
+JOIN wallets w ON w.id = i.wallet_id
+JOIN hyperliquid_coins c ON c.coin_id = i.coin_id;
+INSERT INTO wallets VALUES (1, '0xa');
+INSERT INTO hyperliquid_coins VALUES (1, 'BTC');
+"""
+
+
+@pytest.fixture
+def db(mysql):
+    return mysql(DDL)
+
+
+def order(oid, px="100.0", sz="1.0"):
+    return {"order_id": oid, "coin": "BTC", "side": "B", "limit_price": px, "quantity": sz,
+            "timestamp_ms": 1, "order_type": "Limit", "reduce_only": False, "time_in_force": "Gtc"}
+
+
+def open_at(db, t):
+    return [row["order_id"] for row in open_orders_at(db, "0xa", t)]
+
+
+def test_orders_are_stored_once_per_lifetime_and_reconstructable(db):
+    apply_order_snapshot(db, 1, 1000, [order(1), order(2)], COINS)
+    counts = apply_order_snapshot(db, 1, 2000, [order(1), order(2, sz="0.5")], COINS)
+    assert counts == {"extended": 1, "closed": 1, "opened": 1}
+    apply_order_snapshot(db, 1, 3000, [order(1)], COINS)
+    apply_order_snapshot(db, 1, 4000, [order(1)], COINS)
+
+    rows = db.rows("hyperliquid_order_intervals")
+    assert len(rows) == 3  # order 1 once, order 2 twice (size changed)
+    assert [r["last_seen_ms"] for r in rows if r["order_id"] == 1] == [4000]
+    assert open_at(db, 1500) == [1, 2]
+    assert open_at(db, 2500) == [1, 2]
+    assert open_at(db, 3000) == [1]
+    assert open_at(db, 500) == []
+
+
+def test_out_of_order_snapshot_is_ignored(db):
+    apply_order_snapshot(db, 1, 2000, [order(1)], COINS)
+    assert apply_order_snapshot(db, 1, 1000, [], COINS) == {"extended": 0, "closed": 0, "opened": 0}
+    assert open_at(db, 2500) == [1]
+
+
+def test_late_snapshot_after_close_and_exact_replay_are_ignored(db):
+    apply_order_snapshot(db, 1, 1000, [order(1)], COINS)
+    apply_order_snapshot(db, 1, 2000, [], COINS)  # order 1 closed, nothing open
+
+    assert apply_order_snapshot(db, 1, 1500, [order(1)], COINS) == {"extended": 0, "closed": 0, "opened": 0}
+    assert apply_order_snapshot(db, 1, 1000, [order(1)], COINS) == {"extended": 0, "closed": 0, "opened": 0}
+    assert [(r["first_seen_ms"], r["closed_ms"]) for r in db.rows("hyperliquid_order_intervals")] == [(1000, 2000)]
+    assert open_at(db, 2500) == []
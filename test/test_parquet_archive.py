@@ -0,0 +1,88 @@
+import pytest
+
+from parquet_archive import export_day, export_sql, partition_date, plan_compaction, split_by_date
+from sinks import embedded_rows
+
+DAY_MS = 86400 * 1000
+
+
+def test_rows_are_split_by_utc_day(snapshot):
+    assert partition_date(0) == "1970-01-01"
+    assert partition_date(DAY_MS - 1) == "1970-01-01"
+
+    rows = embedded_rows([("0xa", DAY_MS - 1, snapshot(["BTC"])), ("0xa", DAY_MS, snapshot(["BTC", "ETH"]))])
+    groups = split_by_date("hyperliquid_positions", rows["hyperliquid_positions"])
+    assert {date: len(g) for date, g in groups.items()} == {"1970-01-01": 1, "1970-01-02": 2}
+
+
+def test_export_sql_selects_archive_columns_in_order():
+    sql = export_sql("hyperliquid_open_orders")
+    assert sql.startswith("SELECT t.order_id, t.snapshot_id, t.snapshot_time_ms, c.coin, t.side,")
+    assert "JOIN hyperliquid_coins c" in sql and sql.endswith("t.snapshot_time_ms < %s")
+
+
+def test_plan_compaction_packs_small_files_only():
+    files = [("a", 40), ("b", 40), ("c", 40), ("d", 500), ("e", 10)]
+    assert plan_compaction(files, target_bytes=100) == [["a", "b"], ["c", "e"]]
+    assert plan_compaction([("a", 40)], target_bytes=100) == []
+
+
+def test_sink_writes_partitioned_parquet(tmp_path, snapshot):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from parquet_archive import ParquetArchiveSink
+
+    sink = ParquetArchiveSink(str(tmp_path), flush_snapshots=10)
+    assert sink.insert_batch([("0xa", DAY_MS, snapshot(["BTC", "ETH"])), ("0xb", DAY_MS + 1, snapshot([]))])
+    sink.close()
+
+    table = pq.read_table(str(tmp_path / "hyperliquid_positions" / "date=1970-01-02"))
+    assert table.num_rows == 2 and table.column("coin").to_pylist() == ["BTC", "ETH"]
+
+
+EXPORT_DDL = """
+CREATE TABLE wallets (id INTEGER PRIMARY KEY, address TEXT NOT NULL);
+CREATE TABLE hyperliquid_snapshots (
+    snapshot_id INTEGER PRIMARY KEY, wallet_id INTEGER NOT NULL, snapshot_time_ms INTEGER NOT NULL,
+    snapshot_datetime TEXT, account_value TEXT, total_ntl_pos TEXT, total_raw_usd TEXT,
+    total_margin_used TEXT, withdrawable TEXT, cross_maintenance_margin_used TEXT
+);
+INSERT INTO wallets VALUES (1, '0xa');
+INSERT INTO hyperliquid_snapshots VALUES (7, 1, 86400001, NULL, '1', '0', '1', '0', '1', NULL);
+"""
+
+
+def test_export_refuses_a_partition_with_other_files(tmp_path, mysql):
+    partition = tmp_path / "hyperliquid_snapshots" / "date=1970-01-02"
+    partition.mkdir(parents=True)
+    (partition / "compact-1-1.parquet").write_bytes(b"")  # holds an earlier export after compaction
+
+    with pytest.raises(FileExistsError):
+        export_day(mysql(EXPORT_DDL), str(tmp_path), "hyperliquid_snapshots", DAY_MS)
+    assert sorted(p.name for p in partition.iterdir()) == ["compact-1-1.parquet"]
+
+
+def test_export_with_replace_leaves_only_the_export(tmp_path, mysql):
+    pq = pytest.importorskip("pyarrow.parquet")
+    partition = tmp_path / "hyperliquid_snapshots" / "date=1970-01-02"
+    partition.mkdir(parents=True)
+    for name in ("part-1-1.parquet", "compact-2-1.parquet"):
+        (partition / name).write_bytes(b"")
+
+    db = mysql(EXPORT_DDL)
+    assert export_day(db, str(tmp_path), "hyperliquid_snapshots", DAY_MS, replace=True) == 1
+    assert export_day(db, str(tmp_path), "hyperliquid_snapshots", DAY_MS) == 1  # re-export replaces it
+    assert sorted(p.name for p in partition.iterdir()) == ["export.parquet"]
+    assert pq.read_table(str(partition)).column("snapshot_id").to_pylist() == [7]
+
+
+def test_export_of_an_empty_day_with_replace_keeps_the_archived_files(tmp_path, mysql):
+    pytest.importorskip("pyarrow.parquet")
+    partition = tmp_path / "hyperliquid_snapshots" / "date=1970-01-03"
+    partition.mkdir(parents=True)
+    names = ["compact-1-1.parquet", "export.parquet", "part-2-1.parquet"]
+    for name in names:
+        (partition / name).write_bytes(b"")
+
+    # The day was dropped from MySQL (retention): nothing to export
+    assert export_day(mysql(EXPORT_DDL), str(tmp_path), "hyperliquid_snapshots", 2 * DAY_MS, replace=True) == 0
+    assert sorted(p.name for p in partition.iterdir()) == names
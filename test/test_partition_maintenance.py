@@ -0,0 +1,28 @@
+from partition_maintenance import DAY_MS, add_partitions_sql, partition_name, plan_partitions
+
+JAN_10 = 1736467200000  # 2025-01-10T00:00:00Z
+
+
+def test_plan_creates_days_ahead_and_drops_only_fully_expired_partitions():
+    partitions = [
+        ("p20250101", JAN_10 - 8 * DAY_MS),
+        ("p20250102", JAN_10 - 7 * DAY_MS),
+        ("p20250103", JAN_10 - 6 * DAY_MS),
+        ("p20250110", JAN_10 + DAY_MS),
+        ("pmax", None),
+    ]
+    create, drop = plan_partitions(partitions, JAN_10 + 3600_000, ahead_days=2, retention_days=7)
+
+    assert create == [JAN_10 + 2 * DAY_MS, JAN_10 + 3 * DAY_MS]
+    assert [partition_name(b) for b in create] == ["p20250111", "p20250112"]
+    assert drop == ["p20250101", "p20250102"]  # p20250103 still holds Jan 3, inside the 7-day window
+
+
+def test_fresh_table_is_split_from_start_date():
+    create, drop = plan_partitions([("pmax", None)], JAN_10, ahead_days=0, retention_days=30,
+                                   start_ms=JAN_10 - 2 * DAY_MS)
+    assert create == [JAN_10 - DAY_MS, JAN_10, JAN_10 + DAY_MS]
+    assert drop == []
+    assert add_partitions_sql("t", create[:1]).endswith(
+        "INTO (PARTITION p20250108 VALUES LESS THAN (1736380800000), PARTITION pmax VALUES LESS THAN MAXVALUE)"
+    )
@@ -0,0 +1,55 @@
+import pytest
+
+from position_intervals import apply_position_snapshot, mark_rows
+
+COINS = {"BTC": 1, "ETH": 2}
+DDL = """
+CREATE TABLE hyperliquid_position_intervals (
+    wallet_id INTEGER NOT NULL, coin_id INTEGER NOT NULL, type TEXT NOT NULL, size TEXT NOT NULL,
+    leverage_type TEXT NOT NULL, leverage_value INTEGER NOT NULL, entry_price TEXT,
+    first_seen_ms INTEGER NOT NULL, last_seen_ms INTEGER NOT NULL, closed_ms INTEGER,
+    PRIMARY KEY (wallet_id, coin_id, first_seen_ms)
+);
+"""
+
+
+@pytest.fixture
+def db(mysql):
+    return mysql(DDL)
+
+
+def position(coin, size="1.0", entry="100.0", pnl="0.0"):
+    return {"coin": coin, "type": "oneWay", "size": size, "leverage_type": "cross", "leverage_value": 10,
+            "entry_price": entry, "position_value": "100.0", "unrealized_pnl": pnl, "return_on_equity": "0.0"}
+
+
+def legs(db):
+    return [(r["coin_id"], r["size"], r["first_seen_ms"], r["last_seen_ms"], r["closed_ms"])
+            for r in db.rows("hyperliquid_position_intervals")]
+
+
+def test_price_drift_extends_leg_and_size_change_starts_a_new_one(db):
+    apply_position_snapshot(db, 1, 1000, [position("BTC"), position("ETH")], COINS)
+    assert apply_position_snapshot(db, 1, 2000, [position("BTC", pnl="5.0"), position("ETH", pnl="-1")], COINS) == \
+        {"extended": 2, "closed": 0, "opened": 0}
+    assert apply_position_snapshot(db, 1, 3000, [position("BTC", size="2.0", entry="110.0")], COINS) == \
+        {"extended": 0, "closed": 2, "opened": 1}
+
+    assert legs(db) == [
+        (1, "1.0", 1000, 2000, 3000),
+        (2, "1.0", 1000, 2000, 3000),
+        (1, "2.0", 3000, 3000, None),
+    ]
+
+
+def test_mark_rows_keep_only_mark_dependent_metrics():
+    assert mark_rows(7, 1000, [position("BTC", pnl="3.5")], COINS) == [(7, 1000, 1, "100.0", "3.5", "0.0")]
+
+
+def test_closed_legs_are_not_reopened_by_late_or_replayed_snapshots(db):
+    apply_position_snapshot(db, 1, 1000, [position("BTC")], COINS)
+    apply_position_snapshot(db, 1, 2000, [], COINS)  # BTC closed, no open legs
+
+    assert apply_position_snapshot(db, 1, 1500, [position("BTC")], COINS) == {"extended": 0, "closed": 0, "opened": 0}
+    assert apply_position_snapshot(db, 1, 1000, [position("BTC")], COINS) == {"extended": 0, "closed": 0, "opened": 0}
+    assert legs(db) == [(1, "1.0", 1000, 1000, 2000)]
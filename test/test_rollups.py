@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+from rollups import COIN_UPSERT_SQL, RollupBatch, WALLET_UPSERT_SQL
+
+
+class Recorder:
+    def __init__(self):
+        self.rows = {}
+
+    def executemany(self, sql, rows):
+        self.rows[sql] = rows
+
+
+def summary(value):
+    return {"account_value": value, "total_ntl_pos": "0", "total_margin_used": "0"}
+
+
+def test_batch_builds_ohlc_by_sample_time_and_zero_fills_closed_coins():
+    batch = RollupBatch()
+    batch.add(1, 61_000, summary("10"), {5: "2"})
+    batch.add(1, 60_000, summary("12"), {5: "1"})  # out of order: becomes the open
+    batch.add(1, 62_000, summary("8"), {})         # coin 5 closed
+    recorder = Recorder()
+    batch.flush(recorder)
+
+    minute = [r for r in recorder.rows[WALLET_UPSERT_SQL] if r[1] == "1m"]
+    assert minute == [(1, "1m", 60_000, 60_000, 62_000, 3,
+                       Decimal("12"), Decimal("12"), Decimal("8"), Decimal("8"),
+                       Decimal("0"), Decimal("0"), Decimal("0"), Decimal("0"),
+                       Decimal("0"), Decimal("0"), Decimal("0"), Decimal("0"))]
+    coin_minute = [r for r in recorder.rows[COIN_UPSERT_SQL] if r[2] == "1m"]
+    assert coin_minute == [(1, 5, "1m", 60_000, 60_000, 62_000, 3,
+                            Decimal("1"), Decimal("2"), Decimal("0"), Decimal("0"))]
+    assert len(batch) == 0
+
+
+def test_upsert_updates_bucket_bounds_after_open_and_close():
+    updates = WALLET_UPSERT_SQL.split("ON DUPLICATE KEY UPDATE")[1]
+    assert updates.index("account_value_close =") < updates.index("first_ms = LEAST")
+    assert updates.rstrip().endswith("last_ms = GREATEST(last_ms, VALUES(last_ms))")
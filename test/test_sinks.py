@@ -0,0 +1,52 @@
+import pytest
+
+from sinks import SINK_SQLITE, EmbeddedSink, SnapshotSink, SQLiteSink, create_sink
+from snapshot_digest import SnapshotDigestCache
+
+
+def counts(sink):
+    return [
+        sink.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("hyperliquid_snapshots", "hyperliquid_positions", "hyperliquid_open_orders")
+    ]
+
+
+def test_sqlite_sink_writes_batches_and_replays_idempotently(tmp_path, snapshot):
+    sink = SQLiteSink(str(tmp_path / "hl.sqlite"))
+    items = [("0xa", 1000, snapshot(["BTC", "ETH"], [1, 2])), ("0xb", 1000, snapshot([], []))]
+
+    assert sink.insert_batch(items) == [True, True]
+    assert sink.insert_batch(items) == [True, True]  # same snapshot ids, ignored
+    assert counts(sink) == [2, 2, 2]
+    # The same frames parsed again (no snapshot ids yet), twice in one batch
+    reparsed = [("0xa", 1000, snapshot(["BTC", "ETH"], [1, 2])) for _ in range(2)]
+    assert sink.insert_batch(reparsed) == [True, True]
+    assert counts(sink) == [2, 2, 2]
+
+    bad = snapshot(["BTC"], [])
+    del bad["summary"]["withdrawable"]
+    assert sink.insert_batch([("0xa", 2000, snapshot(["BTC"], [3])), ("0xc", 2000, bad)]) == [True, False]
+    assert counts(sink) == [3, 3, 3]
+    sink.close()
+
+
+def test_digest_cache_skips_unchanged_snapshots(tmp_path, snapshot):
+    sink = create_sink(SINK_SQLITE, str(tmp_path / "hl.sqlite"), digest_cache=SnapshotDigestCache(),
+                       dual_write=False, order_storage="rows")
+
+    assert sink.insert("0xa", 1000, snapshot(["BTC"], [1]))
+    assert sink.insert("0xa", 2000, snapshot(["BTC"], [1]))
+    assert counts(sink) == [1, 1, 1]
+    sink.close()
+
+
+def test_create_sink_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        create_sink("csv")
+
+
+def test_sinks_must_implement_their_backend(tmp_path):
+    with pytest.raises(TypeError):
+        SnapshotSink()
+    with pytest.raises(TypeError):
+        EmbeddedSink(str(tmp_path / "hl.db"))
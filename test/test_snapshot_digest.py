@@ -0,0 +1,56 @@
+import copy
+
+from snapshot_digest import SnapshotDigestCache, snapshot_digest
+
+BASE = {
+    "summary": {"snapshot_time_ms": 1, "account_value": "100.0", "total_raw_usd": "50.0",
+                "withdrawable": "10.0", "total_ntl_pos": "5", "total_margin_used": "1",
+                "cross_maintenance_margin_used": None},
+    "asset_positions": [
+        {"coin": "BTC", "type": "oneWay", "size": "0.5", "leverage_type": "cross", "leverage_value": 10,
+         "entry_price": "90000", "position_value": "45000", "unrealized_pnl": "12", "return_on_equity": "0.1"},
+        {"coin": "ETH", "type": "oneWay", "size": "-2", "leverage_type": "cross", "leverage_value": 5,
+         "entry_price": "3000", "position_value": "6000", "unrealized_pnl": "-3", "return_on_equity": "-0.01"},
+    ],
+    "open_orders": [{"order_id": 1, "coin": "BTC", "side": "B", "limit_price": "80000", "quantity": "0.1"}],
+}
+
+
+def test_digest_ignores_volatile_fields_and_ordering():
+    moved = copy.deepcopy(BASE)
+    moved["summary"]["account_value"] = "101.5"
+    moved["asset_positions"][0]["unrealized_pnl"] = "99"
+    moved["asset_positions"].reverse()
+    moved["snapshot_id"] = 123
+    assert snapshot_digest(moved) == snapshot_digest(BASE)
+
+    traded = copy.deepcopy(BASE)
+    traded["asset_positions"][0]["size"] = "0.6"
+    assert snapshot_digest(traded) != snapshot_digest(BASE)
+
+
+def test_cache_skips_unchanged_until_heartbeat_and_warm_starts(tmp_path):
+    state = str(tmp_path / "digests.json")
+    cache = SnapshotDigestCache(heartbeat_interval=60, state_file=state)
+    digest = snapshot_digest(BASE)
+
+    assert cache.should_write("0xa", 0, digest)
+    cache.record("0xa", 0, digest)
+    assert not cache.should_write("0xa", 30_000, digest)
+    assert cache.should_write("0xa", 60_000, digest)
+    cache.save()
+
+    restarted = SnapshotDigestCache(heartbeat_interval=60, state_file=state)
+    assert not restarted.should_write("0xa", 30_000, digest)
+
+
+def test_filter_batch_dedupes_within_batch_and_evicts_lru():
+    cache = SnapshotDigestCache(max_wallets=1, heartbeat_interval=60)
+    items = [("0xa", 0, BASE), ("0xa", 1_000, copy.deepcopy(BASE)), ("0xb", 0, BASE)]
+    keep, digests = cache.filter_batch(items)
+    assert keep == [0, 2]
+
+    for i in keep:
+        cache.record(items[i][0], items[i][1], digests[i])
+    assert cache.stats()["wallets"] == 1
+    assert cache.should_write("0xa", 2_000, digests[0])  # evicted
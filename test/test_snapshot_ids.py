@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from snapshot_ids import (
+    MAX_WALLET_ID, SnapshotIdGenerator, client_snapshot_id, id_node, id_timestamp_ms, snapshot_id_for,
+)
+
+
+def test_ids_are_unique_and_increasing_across_threads():
+    gen = SnapshotIdGenerator(node_id=7)
+    ids = []
+    lock = threading.Lock()
+
+    def worker():
+        local = [gen.next_id() for _ in range(5000)]
+        with lock:
+            ids.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(ids)) == len(ids)
+    assert all(0 < i < 2 ** 63 for i in ids)
+    assert all(id_node(i) == 7 for i in ids)
+
+    single = [gen.next_id() for _ in range(10000)]
+    assert single == sorted(single)
+
+
+def test_id_encodes_generation_time_and_survives_clock_going_back(monkeypatch):
+    import snapshot_ids
+    now = [1_760_000_000.0]
+    monkeypatch.setattr(snapshot_ids.time, "time", lambda: now[0])
+
+    gen = SnapshotIdGenerator(node_id=1)
+    first = gen.next_id()
+    assert id_timestamp_ms(first) == 1_760_000_000_000
+
+    now[0] -= 5  # clock steps backwards
+    second = gen.next_id()
+    assert second > first
+
+
+def test_node_id_is_validated():
+    with pytest.raises(ValueError):
+        SnapshotIdGenerator(node_id=1024)
+
+
+def test_derived_ids_are_deterministic_and_time_ordered():
+    first = snapshot_id_for(42, 1_760_000_000_000)
+    assert snapshot_id_for(42, 1_760_000_000_000) == first
+    assert id_timestamp_ms(first) == 1_760_000_000_000
+    assert first & MAX_WALLET_ID == 42
+
+    same_ms = {snapshot_id_for(wallet_id, 1_760_000_000_000) for wallet_id in range(1000)}
+    assert len(same_ms) == 1000
+    assert snapshot_id_for(0, 1_760_000_000_001) > max(same_ms)
+
+    with pytest.raises(ValueError):
+        snapshot_id_for(MAX_WALLET_ID + 1, 1_760_000_000_000)
+
+
+def test_wallet_ids_beyond_22_bits_fall_back_to_generated_ids(caplog):
+    assert client_snapshot_id(42, 1_760_000_000_000) == snapshot_id_for(42, 1_760_000_000_000)
+
+    first = client_snapshot_id(MAX_WALLET_ID + 1, 1_760_000_000_000)
+    second = client_snapshot_id(MAX_WALLET_ID + 1, 1_760_000_000_000)
+    assert first != second and 0 < first < 2 ** 63
+    assert sum("exceeds" in r.getMessage() for r in caplog.records) == 1  # logged once per wallet
@@ -6,10 +6,11 @@ from datetime import datetime, timezone
 from decimal import Decimal
 
 import pandas as pd
-from sshtunnel import SSHTunnelForwarder
 import pymysql
 from dotenv import load_dotenv
 
+from db_pool import get_pool, close_all
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
@@ -84,51 +85,43 @@ def prepare_row(row):
         'wallet_type': normalize_wallet_type(row.get('wallet_type'))
     }
 
+# importer connections: tuple rows and short timeouts
+CONNECT_KWARGS = dict(connect_timeout=8, read_timeout=15, write_timeout=15,
+                      cursorclass=pymysql.cursors.Cursor)
+
+def _pool_db_config(db_config):
+    return {'database': db_config.get('DB_NAME'), 'user': db_config.get('DB_USER'),
+            'password': db_config.get('DB_PASSWORD')}
+
 def get_db_connection_via_ssh(ssh_config, db_config):
+    """Borrow a connection through the process-wide SSH tunnel (see db_pool)."""
     ssh_host = ssh_config.get('SSH_HOST')
     if not ssh_host:
         raise ValueError('SSH_HOST not provided for SSH tunnel')
-    ssh_port = int(ssh_config.get('SSH_PORT', 22))
-    ssh_user = ssh_config.get('SSH_USER')
-    ssh_pkey = ssh_config.get('SSH_KEY_PATH') or None
 
     remote_db_host = ssh_config.get('REMOTE_DB_HOST') or db_config.get('DB_HOST', '127.0.0.1')
     remote_db_port = int(ssh_config.get('REMOTE_DB_PORT') or db_config.get('DB_PORT', 3306))
-    remote_bind_address = (remote_db_host, remote_db_port)
-
-    t_kwargs = dict(
-        ssh_address_or_host=(ssh_host, ssh_port),
-        ssh_username=ssh_user,
-        ssh_pkey=ssh_pkey,
-        remote_bind_address=remote_bind_address,
-    )
-    if ssh_config.get('LOCAL_BIND_PORT'):
-        t_kwargs['local_bind_address'] = ('127.0.0.1', int(ssh_config['LOCAL_BIND_PORT']))
-
-    t = SSHTunnelForwarder(**t_kwargs)
-    t.start()
-    local_port = t.local_bind_port
-    logger.info('SSH tunnel established: localhost:%s -> %s:%s via %s', local_port, remote_bind_address[0], remote_bind_address[1], ssh_host)
 
-    try:
-        conn = pymysql.connect(host='127.0.0.1', port=local_port, user=db_config.get('DB_USER'),
-                               password=db_config.get('DB_PASSWORD'), db=db_config.get('DB_NAME'),
-                               connect_timeout=8, read_timeout=15, write_timeout=15,
-                               cursorclass=pymysql.cursors.Cursor)
-    except Exception:
-        t.stop()
-        raise
-    return conn, t
+    pool_ssh_config = {
+        'use_tunnel': True,
+        'ssh_address_or_host': ssh_host,
+        'ssh_port': int(ssh_config.get('SSH_PORT', 22)),
+        'ssh_username': ssh_config.get('SSH_USER'),
+        'ssh_pkey': ssh_config.get('SSH_KEY_PATH') or None,
+        'remote_bind_address': (remote_db_host, remote_db_port),
+        'local_bind_address': ('127.0.0.1', int(ssh_config['LOCAL_BIND_PORT'])) if ssh_config.get('LOCAL_BIND_PORT') else None,
+    }
+
+    pool = get_pool(pool_ssh_config, _pool_db_config(db_config), **CONNECT_KWARGS)
+    conn = pool.acquire()
+    return conn, pool.tunnel
 
 def get_db_connection_direct(db_config):
     host = db_config.get('DB_HOST', '127.0.0.1')
     port = int(db_config.get('DB_PORT', 3306))
     logger.info('Attempting direct MySQL connection to %s:%s', host, port)
-    conn = pymysql.connect(host=host, port=port, user=db_config.get('DB_USER'),
-                           password=db_config.get('DB_PASSWORD'), db=db_config.get('DB_NAME'),
-                           connect_timeout=8, read_timeout=15, write_timeout=15,
-                           cursorclass=pymysql.cursors.Cursor)
-    return conn
+    pool_ssh_config = {'use_tunnel': False, 'remote_bind_address': (host, port)}
+    return get_pool(pool_ssh_config, _pool_db_config(db_config), **CONNECT_KWARGS).acquire()
 
 
 # removed threaded connector logic and mysql-connector; using PyMySQL only for simplicity and reliability
@@ -262,9 +255,8 @@ def run_import(file_path, create_schema=False, use_ssh=False):
         raise
     finally:
         if conn:
-            conn.close()
-        if tunnel:
-            tunnel.stop()
+            conn.close()  # returns it to the pool
+        close_all()
 
 def main():
     parser = argparse.ArgumentParser(description='Import and normalize wallet_pnl.xlsx into MySQL.')